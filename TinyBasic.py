@@ -251,36 +251,22 @@ def GetFreeMemory():
 
 def CaptainOnTheBridge():
 
-    while True:
-        if subroutine == "Report":
-            Report()
-
-        if subroutine == "Command":
-            Command()
-
-        if subroutine == "MakeItSo":
-            MakeItSo()
-
-        if subroutine == "Engage":
-            Engage()
-
-        if subroutine == "RunCommandInterpreter":
-            RunCommandInterpreter()
-
-        if subroutine == "FinishStatement":
-            FinishStatement()
+    # state -> handler jump table, one lookup and one call per step
+    stateHandlers = {
+        "Report": Report,
+        "Command": Command,
+        "MakeItSo": MakeItSo,
+        "Engage": Engage,
+        "RunCommandInterpreter": RunCommandInterpreter,
+        "FinishStatement": FinishStatement,
+        "FinishStatement2": FinishStatement2,
+        "Print": TB_Print,
+        "NextChar": NextChar,
+        "EndPrint": EndPrint
+    }
 
-        if subroutine == "FinishStatement2":
-            FinishStatement2()
-
-        if subroutine == "Print":
-            TB_Print()
-
-        if subroutine == "NextChar":
-            NextChar()
-
-        if subroutine == "EndPrint":
-            EndPrint()
+    while True:
+        stateHandlers[subroutine]()
 
 
 def Report():
@@ -1692,4 +1678,6 @@ def ErrorHandler():
         errorMessage = EMPTY_STRING
 
 
-Start()
+if __name__ == "__main__":
+
+    Start()
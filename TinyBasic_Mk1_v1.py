@@ -47,6 +47,12 @@
 # Z$=A$(26)  statement input
 
 
+import os
+import stat
+
+from bisect import bisect_left
+
+
 EMPTY_STRING = ""
 
 # print formatting characters
@@ -155,6 +161,9 @@ PROGRAM_CODE_MEMORY = 125
 PROGRAM_CODE_MEMORY_START = 27
 PROGRAM_CODE_MEMORY_WORKSPACE = 26
 
+# sorts after any line number
+PROGRAM_LINE_NUMBER_LAST = float("inf")
+
 # [27-52] = 26 variables
 # [53-82] = 30 items math stack
 VARIABLE_STACK_MEMORY = 26
@@ -168,7 +177,6 @@ GOSUB_STACK_MEMORY = 26
 COMMAND_HELP_MEMORY = 10
 
 # file i/o
-FILE_NOT_FOUND = 0
 FILE_EXTENSION = ".txt"
 
 # carriage return / line feed
@@ -216,6 +224,11 @@ totalMemoryMessage = ""
 freeMemoryMessage = ""
 fileName = ""
 subroutine = ""
+stateHandlers = {}
+statementHandlers = {}
+
+# parsed numbers keyed by (program line, character pointer)
+numberCache = {}
 
 dataInput = False
 savingFile = False
@@ -238,6 +251,21 @@ def Start():
 
 def ProgramLoop():
 
+    global stateHandlers
+
+    # state -> handler jump table, one lookup and one call per step
+    stateHandlers = {
+        "Ready": Ready,
+        "GetInput": GetInput,
+        "AutoRun": AutoRun,
+        "Exec": Exec,
+        "NextStatement": NextStatement,
+        "FinishStatement": FinishStatement,
+        "FinishStatement2": FinishStatement2,
+        "NextChar": NextChar,
+        "EndPrint": EndPrint
+    }
+
     while programRunning:
 
         ControlLoop()
@@ -245,41 +273,7 @@ def ProgramLoop():
 
 def ControlLoop():
 
-    if subroutine == "Ready":
-
-        Ready()
-
-    if subroutine == "GetInput":
-
-        GetInput()
-
-    if subroutine == "AutoRun":
-
-        AutoRun()
-
-    if subroutine == "Exec":
-
-        Exec()
-
-    if subroutine == "NextStatement":
-
-        NextStatement()
-
-    if subroutine == "FinishStatement":
-
-        FinishStatement()
-
-    if subroutine == "FinishStatement2":
-
-        FinishStatement2()
-
-    if subroutine == "NextChar":
-
-        NextChar()
-
-    if subroutine == "EndPrint":
-
-        EndPrint()
+    stateHandlers[subroutine]()
 
 
 def PowerOn():
@@ -292,6 +286,8 @@ def PowerOn():
 
     InitialiseCommandHelp()
 
+    InitialiseStatementHandlers()
+
     WriteTextToConsole(EMPTY_STRING, CRLF)
 
     WriteTextToConsole(welcomeMessage, CRLF)
@@ -418,6 +414,35 @@ def InitialiseCommandHelp():
     commandHelp.insert(9, "REM <any>")
 
 
+def InitialiseStatementHandlers():
+
+    # keywords are accepted in upper or lower case
+    for keyword, handler in (
+            ("IF", TinyBasic_If),
+            ("REM", TinyBasic_Rem),
+            ("INPUT", TinyBasic_Input),
+            ("PRINT", TinyBasic_Print),
+            ("CLEAR", TinyBasic_Clear),
+            ("RUN", TinyBasic_Run),
+            ("GOTO", TinyBasic_Goto),
+            ("GOSUB", TinyBasic_Gosub),
+            ("RETURN", TinyBasic_Return),
+            ("NEW", TinyBasic_New),
+            ("CLS", TinyBasic_Cls),
+            ("HELP", TinyBasic_Help),
+            ("MEM", TinyBasic_Mem),
+            ("END", TinyBasic_End),
+            ("STOP", TinyBasic_Stop),
+            ("LIST", TinyBasic_List),
+            ("SAVE", TinyBasic_Save),
+            ("LOAD", TinyBasic_Load),
+            ("LET", TinyBasic_Let)):
+
+        statementHandlers[keyword] = handler
+
+        statementHandlers[keyword.lower()] = handler
+
+
 def GetTotalMemory():
 
     global totalMemoryMessage
@@ -515,7 +540,7 @@ def DataInput():
 
     N_numericData = input()
 
-    A_processorStack.insert(V_variableStackPointer, N_numericData)
+    A_processorStack[V_variableStackPointer] = N_numericData
 
     dataInput = False
 
@@ -533,7 +558,7 @@ def AutoRun():
 
     C_characterPointer = 0
 
-    programCode.insert(L_programCodeMemoryPointer, Zs)
+    programCode[L_programCodeMemoryPointer] = Zs
 
     GetNumber()
 
@@ -594,8 +619,7 @@ def Exec():
 
 def NextStatement():
 
-    global tempT, C_characterPointer, N_numericData, V_variableStackPointer, gosubStackPointer
-    global Ds, character, subroutine, errorMessage
+    global subroutine
 
     GetLabel()
 
@@ -605,119 +629,14 @@ def NextStatement():
 
         return
 
-    if Ds == "IF" or Ds == "if":
-
-        TinyBasic_If()
-
-        return
-
-    if Ds == "REM" or Ds == "rem":
-
-        TinyBasic_Rem()
-
-        return
-
-    if Ds == "INPUT" or Ds == "input":
-
-        TinyBasic_Input()
-
-        return
-
-    if Ds == "PRINT" or Ds == "print":
-
-        TinyBasic_Print()
-
-        return
-
-    if Ds == "CLEAR" or Ds == "clear":
-
-        TinyBasic_Clear()
-
-        return
-
-    if Ds == "RUN" or Ds == "run":
-
-        gosubStackPointer = -1
-
-        TinyBasic_Run()
-
-        return
-
-    if Ds == "GOTO" or Ds == "goto":
-
-        TinyBasic_Goto()
-
-        return
-
-    if Ds == "GOSUB" or Ds == "gosub":
-
-        TinyBasic_Gosub()
-
-        return
-
-    if Ds == "RETURN" or Ds == "return":
-
-        TinyBasic_Return()
-
-        return
-
-    if Ds == "NEW" or Ds == "new":
-
-        TinyBasic_New()
-
-        return
-
-    if Ds == "CLS" or Ds == "cls":
-
-        TinyBasic_Cls()
-
-        return
-
-    if Ds == "HELP" or Ds == "help":
-
-        TinyBasic_Help()
-
-        return
-
-    if Ds == "MEM" or Ds == "mem":
-
-        TinyBasic_Mem()
-
-        return
-
-    if Ds == "END" or Ds == "end":
-
-        TinyBasic_End()
-
-        return
-
-    if Ds == "STOP" or Ds == "stop":
-
-        TinyBasic_Stop()
-
-        return
-
-    if Ds == "LIST" or Ds == "list":
-
-        TinyBasic_List()
-
-        return
-
-    if Ds == "SAVE" or Ds == "save":
-
-        # TinyBasic_Save()
-
-        return
+    # anything that isn't a statement keyword is an implicit LET
+    statementHandlers.get(Ds, TinyBasic_Assignment)()
 
-    if Ds == "LOAD" or Ds == "load":
 
-        # TinyBasic_Load()
+def TinyBasic_Assignment():
 
-        return
-
-    if Ds == "LET" or Ds == "let":
-
-        TinyBasic_Let()
+    global tempT, C_characterPointer, N_numericData, V_variableStackPointer
+    global character, subroutine, errorMessage
 
     ReturnVar()
 
@@ -751,7 +670,7 @@ def NextStatement():
 
         return
 
-    A_processorStack.insert(stackPointer, N_numericData)
+    A_processorStack[stackPointer] = N_numericData
 
     subroutine = "FinishStatement"
 
@@ -831,6 +750,9 @@ def EnterLine():
 
     NextLine()
 
+    # lines may have moved, cached numbers are stale
+    numberCache.clear()
+
 
 def NextLine():
 
@@ -838,48 +760,63 @@ def NextLine():
     global tempI, tempB, tempT, N_numericData, C_characterPointer, L_programCodeMemoryPointer
     global Zs
 
-    nextLine = True
+    # stored lines are kept in line number order, empty slots last
+    L_programCodeMemoryPointer = bisect_left(programCode, tempT, PROGRAM_CODE_MEMORY_START, PROGRAM_CODE_MEMORY, key=LineNumberKey)
 
-    while nextLine:
+    if L_programCodeMemoryPointer == PROGRAM_CODE_MEMORY:
 
-        GetNumber()
+        ErrorMessage(ERROR_CODE_PROGRAM_OVERFLOW, ERROR_MESSAGE_PROGRAM_OVERFLOW)
 
-        isNextLine = (N_numericData < tempT) and (N_numericData != 0) and (L_programCodeMemoryPointer < PROGRAM_CODE_MEMORY + 1)
+        return
 
-        if isNextLine:
+    C_characterPointer = 0
 
-            L_programCodeMemoryPointer = L_programCodeMemoryPointer + 1
+    GetNumber()
 
-            C_characterPointer = 0
+    if tempT != N_numericData:
 
-            # goto NextLine
-            nextLine = True
+        # a new line needs the last slot free, a line number on its
+        # own has nothing to delete
+        if programCode[PROGRAM_CODE_MEMORY - 1] != EMPTY_STRING:
 
-        else:
+            if Zs.strip(CHR_SPACE + CHR_END_OF_LINE).lstrip("0123456789").strip(CHR_SPACE) != EMPTY_STRING:
 
-            nextLine = False
+                ErrorMessage(ERROR_CODE_PROGRAM_OVERFLOW, ERROR_MESSAGE_PROGRAM_OVERFLOW)
 
-    if L_programCodeMemoryPointer == PROGRAM_CODE_MEMORY:
+            return
 
-        ErrorMessage(ERROR_CODE_PROGRAM_OVERFLOW, ERROR_MESSAGE_PROGRAM_OVERFLOW)
+        # later lines move down a slot into the free one
+        programCode.pop()
 
-        return
+        programCode.insert(L_programCodeMemoryPointer, EMPTY_STRING)
 
-    if tempT != N_numericData:
+    programCode[L_programCodeMemoryPointer] = Zs
 
-        for tempI in range(PROGRAM_CODE_MEMORY - 1, L_programCodeMemoryPointer, -1):
+    SkipSpace()
 
-            programCode.insert(tempI, programCode[tempI - 1])
+    if character == EMPTY_STRING or character == CHR_END_OF_LINE:
 
-    programCode.insert(L_programCodeMemoryPointer, Zs)
+        del programCode[L_programCodeMemoryPointer]
 
-    SkipSpace()
+        programCode.append(EMPTY_STRING)
 
-    if character == EMPTY_STRING or character == CHR_END_OF_LINE:
 
-        for tempI in range(L_programCodeMemoryPointer, PROGRAM_CODE_MEMORY):
+def LineNumberKey(programLine):
 
-            programCode.insert(tempI, programCode[tempI + 1])
+    # empty slots sort after every line
+    if programLine == EMPTY_STRING:
+
+        return PROGRAM_LINE_NUMBER_LAST
+
+    programLine = programLine.lstrip(CHR_SPACE)
+
+    digitCount = 0
+
+    while programLine[digitCount:digitCount + 1].isdigit():
+
+        digitCount = digitCount + 1
+
+    return int(programLine[:digitCount])
 
 
 def GetExpression():
@@ -889,7 +826,7 @@ def GetExpression():
 
     S_processorStackPointer = PROCESSOR_STACK_MEMORY_START
 
-    A_processorStack.insert(S_processorStackPointer, 0)
+    A_processorStack[S_processorStackPointer] = 0
 
     BoolExpression()
 
@@ -1018,6 +955,13 @@ def GroupExpression():
     global tempB, N_numericData, C_characterPointer, S_processorStackPointer
     global character, errorMessage
 
+    # no room left on the math stack
+    if S_processorStackPointer >= PROCESSOR_STACK_MEMORY - 1:
+
+        ErrorMessage(ERROR_CODE_PROGRAM_OVERFLOW, ERROR_MESSAGE_PROGRAM_OVERFLOW)
+
+        return
+
     SkipSpace()
 
     GetChar()
@@ -1071,7 +1015,7 @@ def GroupExpression():
 
         S_processorStackPointer = S_processorStackPointer + 1
 
-        A_processorStack.insert(S_processorStackPointer, N_numericData)
+        A_processorStack[S_processorStackPointer] = N_numericData
 
     else:
 
@@ -1087,7 +1031,7 @@ def GroupExpression():
 
             S_processorStackPointer = S_processorStackPointer + 1
 
-            A_processorStack.insert(S_processorStackPointer, A_processorStack[V_variableStackPointer])
+            A_processorStack[S_processorStackPointer] = A_processorStack[V_variableStackPointer]
 
         else:
 
@@ -1095,7 +1039,7 @@ def GroupExpression():
 
                 S_processorStackPointer = S_processorStackPointer + 1
 
-                A_processorStack.insert(S_processorStackPointer, 0)  # TICKS)
+                A_processorStack[S_processorStackPointer] = 0  # TICKS
 
                 return
 
@@ -1103,7 +1047,7 @@ def GroupExpression():
 
                 S_processorStackPointer = S_processorStackPointer + 1
 
-                A_processorStack.insert(S_processorStackPointer, 1)  # = TICKSPERSEC
+                A_processorStack[S_processorStackPointer] = 1  # = TICKSPERSEC
 
                 return
 
@@ -1114,11 +1058,21 @@ def GroupExpression():
 
 def GetNumber():
 
-    global tempA, tempB, C_characterPointer
+    global tempA, tempB, N_numericData, C_characterPointer
     global Bs, character, errorMessage
 
     SkipSpace()
 
+    numberKey = (L_programCodeMemoryPointer, C_characterPointer)
+
+    if numberKey in numberCache:
+
+        N_numericData, C_characterPointer, Bs = numberCache[numberKey]
+
+        GetChar()
+
+        return
+
     GetChar()
 
     tempA = 0
@@ -1149,6 +1103,11 @@ def GetNumber():
 
     NextNumber()
 
+    # the workspace holds a new command every time
+    if (errorMessage == EMPTY_STRING) and (L_programCodeMemoryPointer != PROGRAM_CODE_MEMORY_WORKSPACE):
+
+        numberCache[numberKey] = (N_numericData, C_characterPointer, Bs)
+
 
 def NextNumber():
 
@@ -1339,53 +1298,103 @@ def GetChar():
 
 
 # **** support routines ****
+
+
+def CreateTemporaryFile(fileName):
+
+    # a new file next to fileName, created the way open() creates
+    # one so the umask applies to it
+    while True:
+
+        temporaryFileName = fileName + "." + os.urandom(4).hex() + ".tmp"
+
+        try:
+
+            return os.open(temporaryFileName, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666), temporaryFileName
+
+        except FileExistsError:
+
+            continue
+
+
+def ReplaceFile(fileName, fileText):
+
+    # written next to the file and renamed over it
+    fileDescriptor, temporaryFileName = CreateTemporaryFile(fileName)
+
+    try:
+
+        with os.fdopen(fileDescriptor, "w") as temporaryFile:
+
+            temporaryFile.write(fileText)
+
+        # a file saved over keeps its mode
+        try:
+
+            os.chmod(temporaryFileName, stat.S_IMODE(os.stat(fileName).st_mode))
+
+        except FileNotFoundError:
+
+            pass
+
+        os.replace(temporaryFileName, fileName)
+
+    except BaseException:
+
+        os.remove(temporaryFileName)
+
+        raise
+
+
 def NextChar():
 
     global C_characterPointer
     global Bs, subroutine, character
 
-    C_characterPointer = C_characterPointer + 1
+    # finds the closing quote in one pass, "" inside the
+    # string is a double quote
+    endOfLine = As.find(CHR_END_OF_LINE, C_characterPointer)
 
-    character = As[C_characterPointer:1]
+    if endOfLine == -1:
 
-    asciiCharacter = chr(character)
+        endOfLine = len(As)
 
-    asciiCode = ord(asciiCharacter)
+    stringParts = []
 
-    if character == CHR_END_OF_LINE:  # "":
+    textPointer = C_characterPointer + 1
 
-        ErrorMessage(ERROR_CODE_UNTERMINATED_STRING, ERROR_MESSAGE_UNTERMINATED_STRING)
+    closingQuote = As.find(CHR_DOUBLE_QUOTE, textPointer, endOfLine)
 
-        # GOTO Ready
-        subroutine = "Ready"
+    while (closingQuote != -1) and (As[closingQuote + 1:closingQuote + 2] == CHR_DOUBLE_QUOTE):
 
-        return
+        stringParts.append(As[textPointer:closingQuote + 1])
 
-    else:
+        textPointer = closingQuote + 2
 
-        if character != CHR_DOUBLE_QUOTE:
+        closingQuote = As.find(CHR_DOUBLE_QUOTE, textPointer, endOfLine)
 
-            Bs = Bs + character
+    if closingQuote == -1:
 
-            # GOTO NextChar
-            subroutine = "NextChar"
+        C_characterPointer = endOfLine
 
-            return
+        character = As[C_characterPointer:C_characterPointer + 1]
 
-    C_characterPointer = C_characterPointer + 1
+        ErrorMessage(ERROR_CODE_UNTERMINATED_STRING, ERROR_MESSAGE_UNTERMINATED_STRING)
+
+        # GOTO Ready
+        subroutine = "Ready"
 
-    character = As[C_characterPointer:1]
+        return
 
-    if character == CHR_DOUBLE_QUOTE:
+    stringParts.append(As[textPointer:closingQuote])
 
-        Bs = Bs + character
+    Bs = EMPTY_STRING.join(stringParts)
 
-        # GOTO NextChar
-        subroutine = "NextChar"
+    C_characterPointer = closingQuote + 1
 
-        return
+    character = As[C_characterPointer:C_characterPointer + 1]
 
-    WriteTextToConsole(Bs)  # ;
+    WriteTextToConsole(Bs, not CRLF)  # ;
 
     subroutine = "EndPrint"
 
@@ -1569,7 +1578,7 @@ def TinyBasic_Clear():
 
     for tempI in range(VARIABLE_STACK_MEMORY_START, VARIABLE_STACK_MEMORY_START + VARIABLE_STACK_MEMORY):
 
-        A_processorStack.insert(tempI, 0)
+        A_processorStack[tempI] = 0
 
     subroutine = "FinishStatement"
 
@@ -1711,13 +1720,13 @@ def TinyBasic_Gosub():
     global gosubStackPointer
     global subroutine
 
-    if gosubStackPointer < GOSUB_STACK_MEMORY:
+    if gosubStackPointer < GOSUB_STACK_MEMORY - 1:
 
         gosubStackPointer = gosubStackPointer + 1
 
-        gosubLineNumberPointer.insert(gosubStackPointer, L_programCodeMemoryPointer)
+        gosubLineNumberPointer[gosubStackPointer] = L_programCodeMemoryPointer
 
-        returnLineNumberPointer.insert(gosubStackPointer, L_programCodeMemoryPointer + 1)
+        returnLineNumberPointer[gosubStackPointer] = L_programCodeMemoryPointer + 1
 
         TinyBasic_Goto()
 
@@ -1775,7 +1784,9 @@ def TinyBasic_New():
 
     for tempI in range(PROGRAM_CODE_MEMORY_START, PROGRAM_CODE_MEMORY):
 
-        programCode.insert(tempI, EMPTY_STRING)
+        programCode[tempI] = EMPTY_STRING
+
+    numberCache.clear()
 
     if E_errorLineNumber == 0:
 
@@ -1909,19 +1920,19 @@ def TinyBasic_Save():
 
     fileName = fileName + FILE_EXTENSION
 
-    file = open(fileName, "a")
+    programText = EMPTY_STRING
 
     for tempI in range(PROGRAM_CODE_MEMORY_START, PROGRAM_CODE_MEMORY):
 
         Bs = programCode[tempI]
 
+        # one line per record, the line end becomes a newline
         if Bs != "":
 
-            file.write(Bs)
-
-            # tempA = TRUE
+            programText = programText + Bs.rstrip(CHR_END_OF_LINE) + "\n"
 
-    file.close()
+    # saving twice replaces the program, a failed save changes nothing
+    ReplaceFile(fileName, programText)
 
     subroutine = "FinishStatement"
 
@@ -1944,9 +1955,11 @@ def TinyBasic_Load():
 
     fileName = fileName + FILE_EXTENSION
 
-    file = open(fileName, "r")
+    try:
 
-    if file == FILE_NOT_FOUND:
+        file = open(fileName, "r")
+
+    except OSError:
 
         ErrorMessage(ERROR_CODE_FILE_NOT_FOUND, ERROR_MESSAGE_FILE_NOT_FOUND)
 
@@ -1956,26 +1969,35 @@ def TinyBasic_Load():
 
     tempI = PROGRAM_CODE_MEMORY_START
 
-    endOfFile = False
+    # saved lines are in order, each goes in the next slot
+    with file:
+
+        for Bs in file:
+
+            Bs = Bs.rstrip("\r\n")
 
-    # while NOT endOfFile
+            if Bs.strip() == EMPTY_STRING:
 
-    # endOfFile = EOF#(file)
+                continue
 
-    file.readline(Bs)
+            if tempI == PROGRAM_CODE_MEMORY:
 
-    programCode.insert(tempI, Bs)
+                ErrorMessage(ERROR_CODE_PROGRAM_OVERFLOW, ERROR_MESSAGE_PROGRAM_OVERFLOW)
 
-    tempI = tempI + 1
+                break
 
-    file.close()
+            programCode[tempI] = Bs + CHR_END_OF_LINE
 
-    while tempI <= PROGRAM_CODE_MEMORY:
+            tempI = tempI + 1
 
-        programCode.insert(tempI, EMPTY_STRING)
+    while tempI < PROGRAM_CODE_MEMORY:
+
+        programCode[tempI] = EMPTY_STRING
 
         tempI = tempI + 1
 
+    numberCache.clear()
+
     if E_errorLineNumber == 0:
 
         subroutine = "FinishStatement"
@@ -1995,6 +2017,10 @@ def TinyBasic_Let():
 
         subroutine = "Ready"
 
+        return
+
+    TinyBasic_Assignment()
+
 
 # **** tiny basic conditional operators ****
 def TinyBasic_Equals():
@@ -2007,7 +2033,7 @@ def TinyBasic_Equals():
 
     condition = A_processorStack[S_processorStackPointer - 1] == A_processorStack[S_processorStackPointer]
 
-    A_processorStack.insert(S_processorStackPointer - 1, condition)
+    A_processorStack[S_processorStackPointer - 1] = condition
 
     S_processorStackPointer = S_processorStackPointer - 1
 
@@ -2031,7 +2057,7 @@ def TinyBasic_Greater_Than():
 
         condition = A_processorStack[S_processorStackPointer - 1] > A_processorStack[S_processorStackPointer]
 
-        A_processorStack.insert(S_processorStackPointer - 1, condition)
+        A_processorStack[S_processorStackPointer - 1] = condition
 
         S_processorStackPointer = S_processorStackPointer - 1
 
@@ -2046,7 +2072,7 @@ def TinyBasic_Greater_Than_Equal_To():
 
     condition = A_processorStack[S_processorStackPointer - 1] >= A_processorStack[S_processorStackPointer]
 
-    A_processorStack.insert(S_processorStackPointer - 1, condition)
+    A_processorStack[S_processorStackPointer - 1] = condition
 
     S_processorStackPointer = S_processorStackPointer - 1
 
@@ -2076,7 +2102,7 @@ def TinyBasic_Less_Than():
 
         condition = A_processorStack[S_processorStackPointer - 1] < A_processorStack[S_processorStackPointer]
 
-        A_processorStack.insert(S_processorStackPointer - 1, condition)
+        A_processorStack[S_processorStackPointer - 1] = condition
 
         S_processorStackPointer = S_processorStackPointer - 1
 
@@ -2091,7 +2117,7 @@ def TinyBasic_Less_Than_Equal_To():
 
     condition = A_processorStack[S_processorStackPointer - 1] <= A_processorStack[S_processorStackPointer]
 
-    A_processorStack.insert(S_processorStackPointer - 1, condition)
+    A_processorStack[S_processorStackPointer - 1] = condition
 
     S_processorStackPointer = S_processorStackPointer - 1
 
@@ -2106,7 +2132,7 @@ def TinyBasic_Not_Equal_To():
 
     condition = A_processorStack[S_processorStackPointer - 1] != A_processorStack[S_processorStackPointer]
 
-    A_processorStack.insert(S_processorStackPointer - 1, condition)
+    A_processorStack[S_processorStackPointer - 1] = condition
 
     S_processorStackPointer = S_processorStackPointer - 1
 
@@ -2120,7 +2146,7 @@ def TinyBasic_Add():
 
     MulExpression()
 
-    A_processorStack.insert(S_processorStackPointer - 1, A_processorStack[S_processorStackPointer - 1] + A_processorStack[S_processorStackPointer])
+    A_processorStack[S_processorStackPointer - 1] = A_processorStack[S_processorStackPointer - 1] + A_processorStack[S_processorStackPointer]
 
     S_processorStackPointer = S_processorStackPointer - 1
 
@@ -2133,7 +2159,7 @@ def TinyBasic_Subtract():
 
     MulExpression()
 
-    A_processorStack.insert(S_processorStackPointer - 1, A_processorStack[S_processorStackPointer - 1] - A_processorStack[S_processorStackPointer])
+    A_processorStack[S_processorStackPointer - 1] = A_processorStack[S_processorStackPointer - 1] - A_processorStack[S_processorStackPointer]
 
     S_processorStackPointer = S_processorStackPointer - 1
 
@@ -2146,7 +2172,7 @@ def TinyBasic_Multiply():
 
     GroupExpression()
 
-    A_processorStack.insert(S_processorStackPointer - 1, A_processorStack[S_processorStackPointer - 1] * A_processorStack[S_processorStackPointer])
+    A_processorStack[S_processorStackPointer - 1] = A_processorStack[S_processorStackPointer - 1] * A_processorStack[S_processorStackPointer]
 
     S_processorStackPointer = S_processorStackPointer - 1
 
@@ -2169,7 +2195,7 @@ def TinyBasic_Divide():
 
     else:
 
-        A_processorStack.insert(S_processorStackPointer - 1, A_processorStack[S_processorStackPointer - 1] / A_processorStack[S_processorStackPointer])
+        A_processorStack[S_processorStackPointer - 1] = A_processorStack[S_processorStackPointer - 1] / A_processorStack[S_processorStackPointer]
 
         S_processorStackPointer = S_processorStackPointer - 1
 
@@ -2192,9 +2218,11 @@ def TinyBasic_Modulus():
 
     else:
 
-        A_processorStack.insert(S_processorStackPointer - 1, A_processorStack[S_processorStackPointer - 1] % A_processorStack[S_processorStackPointer])
+        A_processorStack[S_processorStackPointer - 1] = A_processorStack[S_processorStackPointer - 1] % A_processorStack[S_processorStackPointer]
 
         S_processorStackPointer = S_processorStackPointer - 1
 
 
-Start()
+if __name__ == "__main__":
+
+    Start()
@@ -0,0 +1,128 @@
+#
+# Tiny Basic Python Edition
+#
+# Mk2 v1 batch runner
+#
+# Runs many independent programs on a pool of worker
+# processes, results come back as each program finishes.
+# ---------------------------------
+
+
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from TinyBasic_Mk2_v1 import Interpreter, RunResult, SourceHash, BYTECODE_ENGINE_SWITCH, CLEARED_VARIABLES, PROGRAM_IMAGE_EXTENSION
+
+
+# budgets for each program
+DEFAULT_MAX_STEPS = 10000000
+DEFAULT_MAX_SECONDS = 10
+
+# a program that made the interpreter itself fail
+RUN_STATUS_CRASHED = "CRASHED"
+
+# each worker process keeps one interpreter for every program it runs
+workerInterpreter = None
+
+
+def ImageFileName(imageDirectory, source):
+
+    # images are named after the source they were made from,
+    # so programs that are the same share one
+    if imageDirectory is None:
+
+        return None
+
+    return os.path.join(imageDirectory, SourceHash(source).hex() + PROGRAM_IMAGE_EXTENSION)
+
+
+def StartWorker(useBytecodeEngine):
+
+    global workerInterpreter
+
+    workerInterpreter = Interpreter()
+
+    workerInterpreter.useBytecodeEngine = useBytecodeEngine
+
+
+def RunJob(jobIndex, source, stdin, maxSteps, maxSeconds, imageDirectory):
+
+    # runs in the worker, one program per call so its result is
+    # handed back as soon as it finishes
+    try:
+
+        result = workerInterpreter.run_program(source, stdin, max_steps=maxSteps, max_seconds=maxSeconds,
+                                               image_file=ImageFileName(imageDirectory, source))
+
+    except Exception as exception:
+
+        result = RunResult("", list(CLEARED_VARIABLES), RUN_STATUS_CRASHED, repr(exception), None, None)
+
+    return jobIndex, result
+
+
+def run_programs(programs, max_steps=DEFAULT_MAX_STEPS, max_seconds=DEFAULT_MAX_SECONDS,
+                 max_workers=None, use_bytecode=False, image_directory=None):
+
+    # programs is a list of sources or (source, stdin) pairs, yields
+    # (index in programs, RunResult) in the order the programs finish,
+    # image_directory keeps program images so a program run again
+    # isn't parsed again
+    jobs = []
+
+    for jobIndex, program in enumerate(programs):
+
+        if isinstance(program, str):
+
+            jobs.append((jobIndex, program, None))
+
+        else:
+
+            jobs.append((jobIndex, program[0], program[1]))
+
+    if not jobs:
+
+        return
+
+    if max_workers is None:
+
+        max_workers = os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=StartWorker, initargs=(use_bytecode,)) as executor:
+
+        futures = [executor.submit(RunJob, jobIndex, source, stdin, max_steps, max_seconds, image_directory)
+                   for jobIndex, source, stdin in jobs]
+
+        for future in as_completed(futures):
+
+            yield future.result()
+
+
+def Start():
+
+    # python TinyBasic_Mk2_Runner.py [--bytecode] program.bas ...
+    useBytecodeEngine = BYTECODE_ENGINE_SWITCH in sys.argv[1:]
+
+    fileNames = [argument for argument in sys.argv[1:] if argument != BYTECODE_ENGINE_SWITCH]
+
+    programs = []
+
+    for fileName in fileNames:
+
+        with open(fileName) as programFile:
+
+            programs.append(programFile.read())
+
+    for jobIndex, result in run_programs(programs, use_bytecode=useBytecodeEngine):
+
+        print(fileNames[jobIndex] + ": " + result.status)
+
+        # error reports are part of the output already
+        print(result.output, end="")
+
+
+if __name__ == "__main__":
+
+    Start()
@@ -11,9 +11,27 @@
 # ---------------------------------
 
 
+import hashlib
+import io
+import marshal
+import mmap
+import operator
+import os
+import re
+import stat
+import struct
+import sys
+import time
+import zlib
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+
 # A          temp
 # B          temp
-# C          character index in line
+# C          token index in line
 # E          line number for error msg
 # I          temp (loops)
 # K          temp
@@ -21,7 +39,7 @@
 # N          number
 # S          expression stack index
 # T          temp
-# V          variable index
+# V          variable index (A-Z = 0-25)
 
 # A$         temp
 # B$         temp
@@ -101,6 +119,9 @@ ERROR_CODE_MISTAKE = 0
 ERROR_CODE_NO_SUCH_VARIABLE = 0
 ERROR_CODE_DIVISION_BY_ZERO = 224
 ERROR_CODE_MISSING_RIGHT_PARENTHESIS = 296
+ERROR_CODE_NUMBER_TOO_LARGE = 0
+ERROR_CODE_FILE_NOT_FOUND = 0
+ERROR_CODE_FILE_ERROR = 0
 
 
 # error messages
@@ -108,7 +129,7 @@ ERROR_MESSAGE_STOP = "STOP"
 ERROR_MESSAGE_MEMORY_OVERFLOW = "MEMORY OVERFLOW"  # 8
 ERROR_MESSAGE_GOSUB_STACK_OVERFLOW = "GOSUB STACK OVERFLOW"  # 188
 ERROR_MESSAGE_LINE_NOT_FOUND = "LINE NOT FOUND"  # 32
-ERROR_MESSAGE_MISSING_DOUBLE_QUOTE = "MISSING """  # 62
+ERROR_MESSAGE_MISSING_DOUBLE_QUOTE = 'MISSING "'  # 62
 ERROR_MESSAGE_NO_MATCHING_GOSUB = "RETURN HAS NO MATCHING GOSUB"  # 133
 ERROR_MESSAGE_END_OF_STATEMENT_EXPECTED = "END OF STATEMENT EXPECTED"
 ERROR_MESSAGE_INVALID_FACTOR = "INVALID FACTOR"
@@ -124,1858 +145,3998 @@ ERROR_MESSAGE_MISTAKE = "MISTAKE"
 ERROR_MESSAGE_NO_SUCH_VARIABLE = "NO SUCH VARIABLE"
 ERROR_MESSAGE_DIVISION_BY_ZERO = "DIVISION BY ZERO"  # 224
 ERROR_MESSAGE_MISSING_RIGHT_PARENTHESIS = "MISSING )"  # 296
+ERROR_MESSAGE_NUMBER_TOO_LARGE = "NUMBER TOO LARGE"
+ERROR_MESSAGE_FILE_NOT_FOUND = "FILE NOT FOUND"
+ERROR_MESSAGE_FILE_ERROR = "FILE ERROR"
+
+
+# token types, each stored line is held as a list of
+# (token type, token value, operator character) tuples
+TOKEN_END_OF_LINE = 0
+TOKEN_KEYWORD = 1
+TOKEN_VARIABLE = 2
+TOKEN_NUMBER = 3
+TOKEN_STRING = 4
+TOKEN_LABEL = 5
+TOKEN_OPERATOR = 6
+
+# keyword ids
+KEYWORD_IF = 1
+KEYWORD_THEN = 2
+KEYWORD_REM = 3
+KEYWORD_INPUT = 4
+KEYWORD_PRINT = 5
+KEYWORD_RUN = 6
+KEYWORD_GOTO = 7
+KEYWORD_GOSUB = 8
+KEYWORD_RETURN = 9
+KEYWORD_NEW = 10
+KEYWORD_CLS = 11
+KEYWORD_HELP = 12
+KEYWORD_MEM = 13
+KEYWORD_END = 14
+KEYWORD_STOP = 15
+KEYWORD_LIST = 16
+KEYWORD_PAUSE = 17
+KEYWORD_SAVE = 18
+KEYWORD_LOAD = 19
+KEYWORD_LET = 20
+KEYWORD_CLEAR = 21
+KEYWORD_PROFILE = 22
+
+KEYWORDS = {
+    "IF": KEYWORD_IF,
+    "THEN": KEYWORD_THEN,
+    "REM": KEYWORD_REM,
+    "INPUT": KEYWORD_INPUT,
+    "PRINT": KEYWORD_PRINT,
+    "RUN": KEYWORD_RUN,
+    "GOTO": KEYWORD_GOTO,
+    "GOSUB": KEYWORD_GOSUB,
+    "RETURN": KEYWORD_RETURN,
+    "NEW": KEYWORD_NEW,
+    "CLS": KEYWORD_CLS,
+    "HELP": KEYWORD_HELP,
+    "MEM": KEYWORD_MEM,
+    "END": KEYWORD_END,
+    "STOP": KEYWORD_STOP,
+    "LIST": KEYWORD_LIST,
+    "PAUSE": KEYWORD_PAUSE,
+    "SAVE": KEYWORD_SAVE,
+    "LOAD": KEYWORD_LOAD,
+    "LET": KEYWORD_LET,
+    "CLEAR": KEYWORD_CLEAR,
+    "PROFILE": KEYWORD_PROFILE
+}
+
+KEYWORD_NAMES = {keywordId: keyword for keyword, keywordId in KEYWORDS.items()}
+
+# operators made of two characters
+DOUBLE_CHARACTER_OPERATORS = ("<=", ">=", "<>")
+
+RELATIONAL_OPERATORS = (OP_EQUALS, OP_LESS_THAN, OP_GREATER_THAN, "<=", ">=", "<>")
+
+
+# bytecode engine, selected with --bytecode on the command line
+BYTECODE_ENGINE_SWITCH = "--bytecode"
+
+# bytecode instructions, an instruction is followed by its operand (if any)
+BC_PUSH_VARIABLE = 0
+BC_PUSH_NUMBER = 1
+BC_STORE = 2
+BC_ADD = 3
+BC_SUBTRACT = 4
+BC_MULTIPLY = 5
+BC_DIVIDE = 6
+BC_MODULUS = 7
+BC_EQUALS = 8
+BC_NOT_EQUAL_TO = 9
+BC_LESS_THAN = 10
+BC_LESS_THAN_EQUAL_TO = 11
+BC_GREATER_THAN = 12
+BC_GREATER_THAN_EQUAL_TO = 13
+BC_JUMP = 14
+BC_JUMP_IF_FALSE = 15
+BC_GOTO = 16
+BC_GOSUB = 17
+BC_RETURN = 18
+BC_PRINT_STRING = 19
+BC_PRINT_NUMBER = 20
+BC_PRINT_NEWLINE = 21
+BC_INPUT = 22
+BC_CALL = 23
+BC_ERROR = 24
+BC_END = 25
+
+BYTECODE_OPERATORS = {
+    OP_PLUS: BC_ADD,
+    OP_MINUS: BC_SUBTRACT,
+    OP_MULTIPLY: BC_MULTIPLY,
+    OP_DIVIDE: BC_DIVIDE,
+    OP_MODULUS: BC_MODULUS,
+    OP_EQUALS: BC_EQUALS,
+    "<>": BC_NOT_EQUAL_TO,
+    OP_LESS_THAN: BC_LESS_THAN,
+    "<=": BC_LESS_THAN_EQUAL_TO,
+    OP_GREATER_THAN: BC_GREATER_THAN,
+    ">=": BC_GREATER_THAN_EQUAL_TO
+}
+
+# run_program exit status
+RUN_STATUS_OK = "OK"
+RUN_STATUS_ERROR = "ERROR"
+RUN_STATUS_STOPPED = "STOPPED"
+RUN_STATUS_STEP_LIMIT = "STEP LIMIT"
+RUN_STATUS_TIME_LIMIT = "TIME LIMIT"
+RUN_STATUS_NO_INPUT = "NO INPUT"
+
+# variables is the list SnapshotVariables gives
+RunResult = namedtuple("RunResult", "output variables status error errorCode errorLineNumber")
+
+# steps handed out between looks at the budgets and the clock
+BUDGET_SLICE = 1000
+
+# SAVE n / LOAD n use the file tinyBas<n>.txt
+PROGRAM_FILE_PREFIX = "tinyBas"
+PROGRAM_FILE_EXTENSION = ".txt"
+
+# tokenized program saved beside its source, run_program uses it
+# while the source hash still matches, raise the version whenever
+# TokenizeLine changes what it produces
+PROGRAM_IMAGE_EXTENSION = ".tbc"
+PROGRAM_IMAGE_MAGIC = b"TBC\0"
+PROGRAM_IMAGE_VERSION = 2
+
+# magic, image version, marshal version, sha-256 of the source,
+# sha-256 of the body, line count, body length, followed by the
+# body, the compressed marshal of the (text, tokens) lines
+PROGRAM_IMAGE_HEADER = struct.Struct("<4sHH32s32sII")
+
+# what ConvertToUppercase does to a typed line, for loaded ones
+UPPERCASE_TABLE = str.maketrans("abcdefghijklmnopqrstuvwxyz", "ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+# one line of a LOADed file, its line number and the rest of it
+MAPPED_LINE_PATTERN = re.compile(rb"[ ]*([0-9.]*)([^\n]*)\n?")
+
+# output is held back until this many characters are waiting,
+# this long has passed (checked between step slices), or the
+# interpreter waits for input
+OUTPUT_BUFFER_LIMIT = 8192
+OUTPUT_FLUSH_SECONDS = 0.1
+
+# PROFILE ON / OFF
+PROFILE_ON = "ON"
+PROFILE_OFF = "OFF"
+
+# binary operators of cached expressions, division and
+# modulus are left out as they check for zero
+EXPRESSION_OPERATIONS = {
+    BC_ADD: operator.add,
+    BC_SUBTRACT: operator.sub,
+    BC_MULTIPLY: operator.mul,
+    BC_EQUALS: operator.eq,
+    BC_NOT_EQUAL_TO: operator.ne,
+    BC_LESS_THAN: operator.lt,
+    BC_LESS_THAN_EQUAL_TO: operator.le,
+    BC_GREATER_THAN: operator.gt,
+    BC_GREATER_THAN_EQUAL_TO: operator.ge
+}
+
+# operators giving True / False, which print as such
+RELATIONAL_INSTRUCTIONS = (
+    BC_EQUALS,
+    BC_NOT_EQUAL_TO,
+    BC_LESS_THAN,
+    BC_LESS_THAN_EQUAL_TO,
+    BC_GREATER_THAN,
+    BC_GREATER_THAN_EQUAL_TO
+)
+
+# cached for expressions the compiler turns down
+INTERPRETED_EXPRESSION = (None, 0)
+
+# CompileStatement results besides a token position
+COMPILE_LINE_DONE = -1
+COMPILE_UNSUPPORTED = -2
+
+# tokens whose values belong to the line they are on
+LINE_OWNED_TOKEN_VALUES = (TOKEN_NUMBER, TOKEN_STRING, TOKEN_LABEL)
+
+# bytes held by each store, from GetMemoryUsage(), with the number
+# of program lines stored and the most that can be
+MemoryUsage = namedtuple("MemoryUsage", "program variables mathStack gosubStack used lines lineLimit")
 
 
-STRING_OBJECT_DATA_LENGTH = 20
-BYTES_PER_CHARACTER_BUFFER = 2
-
-PROGRAM_CODE_MEMORY_TOP = 125
 PROGRAM_CODE_MEMORY_START = 27
 PROGRAM_CODE_MEMORY_WORKSPACE = 26
 
+# the program store grows a line at a time up to this many
+# lines, set programLineLimit on an interpreter to change it
+PROGRAM_LINE_LIMIT = 10000
+
+# a stored line is its line number token then the statements
+LINE_BODY_TOKEN = 1
+
 VARIABLE_STACK_MEMORY_TOP = 53
 VARIABLE_STACK_MEMORY_START = 27
 
+# numeric mode, integer arithmetic truncates division and decimals
+INTEGER_ARITHMETIC = False
+
+# variables A-Z, a 64 bit integer array for integer arithmetic,
+# otherwise a list so ints keep their full precision, read them
+# through VariableValues or SnapshotVariables, which look the same
+# in both modes
+VARIABLE_COUNT = 26
+VARIABLE_TYPECODE = "q" if INTEGER_ARITHMETIC else None
+CLEARED_VARIABLES = array(VARIABLE_TYPECODE, [0] * VARIABLE_COUNT) if INTEGER_ARITHMETIC else [0] * VARIABLE_COUNT
+
 # ACCUMULATOR_MEMORY_START = 54
 
 PROCESSOR_STACK_MEMORY_TOP = 84
-GOSUB_STACK_MEMORY_TOP = 26
+
+# operands GroupExpression can push before the math stack overflows
+MATH_STACK_DEPTH = PROCESSOR_STACK_MEMORY_TOP - 1 - VARIABLE_STACK_MEMORY_TOP
+
+# GOSUBs that can be waiting for a RETURN, set
+# gosubStackLimit on an interpreter to change it
+GOSUB_STACK_LIMIT = 25
 COMMAND_HELP_MEMORY = 10
 MAXIMUM_LINE_LENGTH = 72
 
 
-programCode = []
-commandHelp = []
-A_processorStack = []
-gosubLineNumberStack = []
-returnLineNumberStack = []
+def TokenizeLine(lineText):
 
+    # turns one line of source into a list of
+    # (token type, token value, operator character) tuples
+    # ending with an end of line token, so the interpreter
+    # never has to look at the characters again
 
-welcomeMessage = ""
-promptMessage = ""
-totalMemoryMessage = ""
-freeMemoryMessage = ""
+    lineTokens = []
 
-subroutine = ""
+    textPointer = 0
 
+    # a minus sign straight after an operand is a subtraction,
+    # anywhere else it belongs to the number that follows it
+    afterOperand = False
 
-A = 0
-B = 0
-C_characterPointer = 0
-errorCode = 0
-E_errorLineNumber = 0
-L_programCodeMemoryPointer = 0
-lineNumber = 0
-N_numericData = 0
-S_processorStackPointer = 0
-T = 0
-V_variableStackMemoryPointer = 0
-gosubStackMemoryPointer = 0
-asciiCode = 0
+    character = lineText[textPointer]
 
-As_programCodeWorkspace = ""
-Bs_stringData = ""
-Cs_character = ""
-Ds_statementLabel = ""
-Es_errorMessage = ""
-Zs_command = ""
+    while character != CHR_END_OF_LINE:
 
-fileName = ""
+        if character == SPACE:
 
-F = False
-savingFile = False
-loadingFile = False
-fileNameOkay = False
+            textPointer = textPointer + 1
 
+            character = lineText[textPointer]
 
-def Start():
+            continue
 
-    Initialise()
+        asciiCode = ord(character)
 
-    while True:
+        nextCharacter = lineText[textPointer + 1:textPointer + 2]
 
-        if subroutine == "Ready":
-            Ready()
+        # labels, keywords and variables
+        if (asciiCode >= ASC_UPPERCASE_A) and (asciiCode <= ASC_UPPERCASE_Z):
 
-        if subroutine == "EnterCommand":
-            EnterCommand()
+            labelStart = textPointer
 
-        if subroutine == "MakeItSo":
-            MakeItSo()
+            while (asciiCode >= ASC_UPPERCASE_A) and (asciiCode <= ASC_UPPERCASE_Z):
 
-        if subroutine == "Engage":
-            Engage()
+                textPointer = textPointer + 1
 
-        if subroutine == "RunCommandInterpreter":
-            RunCommandInterpreter()
+                asciiCode = ord(lineText[textPointer])
 
-        if subroutine == "FinishStatement":
-            FinishStatement()
-    
-        if subroutine == "Print":
-            TinyBasic_Print()
+            label = lineText[labelStart:textPointer]
 
-        if subroutine == "NextCharacter":
-            NextCharacter()
-    
-        # WHEN "PrintBufferController" : PrintBufferController)
-        # WHEN "GetString" : GetString)
-        # WHEN "GetNumeric" : GetNumeric)
-    
-        # WHEN "Save" : SaveFile)
-        # WHEN "Load" : LoadFile)
+            if len(label) == 1:
 
+                # index into the variable store, 0-25 for A-Z
+                lineTokens.append((TOKEN_VARIABLE, ord(label) - ASC_UPPERCASE_A, EMPTY_STRING))
 
-def Initialise():
+            elif label in KEYWORDS:
 
-    global subroutine
+                lineTokens.append((TOKEN_KEYWORD, KEYWORDS[label], EMPTY_STRING))
 
-    ColdStart()
-    WarmStart()
+                # nothing after REM is ever executed
+                if label == "REM":
 
-    print(welcomeMessage)
-    print()
+                    break
 
-    GetTotalMemory()
-    GetFreeMemory()
+            else:
 
-    print(totalMemoryMessage + freeMemoryMessage)
-    print()
-    print(promptMessage, end="")
+                lineTokens.append((TOKEN_LABEL, label, EMPTY_STRING))
 
-    subroutine = "Ready"
+            # a - after a keyword starts a negative number, as in PRINT -5
+            afterOperand = label not in KEYWORDS
 
+            character = lineText[textPointer]
 
-def InitialiseCommandHelp():
+            continue
 
-    commandHelp.insert(0, "CLS, END")
-    commandHelp.insert(1, "HELP, MEM, NEW, RUN")
-    commandHelp.insert(2, "GOTO | GOSUB | LOAD | SAVE <exp>")
-    commandHelp.insert(3, "if <exp> THEN <statement>")
-    commandHelp.insert(4, "INPUT <var>")
-    commandHelp.insert(5, "[LET] <var>=<exp>")
-    commandHelp.insert(6, "LIST [<exp>|PAUSE]")
-    commandHelp.insert(7, "print <exp|str>[,<exp|str>][;]")
-    commandHelp.insert(8, "REM <any>")
+        isNumber = ((asciiCode >= ASC_ZERO) and (asciiCode <= ASC_NINE)) or (asciiCode == ASC_DECIMAL_POINT)
 
+        if (asciiCode == ASC_MINUS) and not afterOperand:
 
-def ColdStart():
+            isNumber = ("0" <= nextCharacter <= "9") or (nextCharacter == ".")
 
-    global programCode, A_processorStack, gosubLineNumberStack, returnLineNumberStack
-    global welcomeMessage, promptMessage
+        # numbers
+        if isNumber:
 
-    # [27-125] = 99 program lines
-    # DIM A$(125)
-    programCode = []
+            numberStart = textPointer
 
-    # [27 - 53] = 26 variables
-    # [54 - 84] = 30 items math stack
-    A_processorStack = []
+            textPointer = textPointer + 1
 
-    # gosub stack
-    gosubLineNumberStack = []
-    returnLineNumberStack = []
+            character = lineText[textPointer]
 
-    InitialiseCommandHelp()
+            while ("0" <= character <= "9") or (character == "."):
 
-    welcomeMessage = SPACE + "**** TINY BASIC PYTHON EDITION ****"
-    promptMessage = "READY"
+                textPointer = textPointer + 1
 
+                character = lineText[textPointer]
 
-def WarmStart():
+            numberText = lineText[numberStart:textPointer]
 
-    global A, B, C_characterPointer, errorCode, E_errorLineNumber, L_programCodeMemoryPointer
-    global lineNumber, N_numericData, S_processorStackPointer, T, V_variableStackMemoryPointer
-    global gosubStackMemoryPointer, asciiCode
+            lineTokens.append((TOKEN_NUMBER, ParseNumber(numberText), EMPTY_STRING))
 
-    global As_programCodeWorkspace, Bs_stringData, Cs_character
-    global Ds_statementLabel, Es_errorMessage, fileName
+            afterOperand = True
 
-    global savingFile, loadingFile, fileNameOkay
+            continue
 
-    for programCodePointer in range(PROGRAM_CODE_MEMORY_TOP + 1):
+        # string literals, "" inside a string is a double quote
+        if character == CHR_DOUBLE_QUOTE:
 
-        programCode.insert(programCodePointer, EMPTY_STRING)
+            stringData = EMPTY_STRING
 
-    for processorStackPointer in range(PROCESSOR_STACK_MEMORY_TOP):
+            textPointer = textPointer + 1
 
-        A_processorStack.insert(processorStackPointer, 0)
+            closingQuote = lineText.find(CHR_DOUBLE_QUOTE, textPointer)
 
-    for gosubStackPointer in range(GOSUB_STACK_MEMORY_TOP):
+            while closingQuote != -1 and lineText[closingQuote + 1] == CHR_DOUBLE_QUOTE:
 
-        gosubLineNumberStack.insert(gosubStackPointer, 0)
+                stringData = stringData + lineText[textPointer:closingQuote + 1]
 
-        returnLineNumberStack.insert(gosubStackPointer, 0)
+                textPointer = closingQuote + 2
 
-    A = 0
-    B = 0
+                closingQuote = lineText.find(CHR_DOUBLE_QUOTE, textPointer)
 
-    C_characterPointer = 0
+            if closingQuote == -1:
 
-    errorCode = 0
-    E_errorLineNumber = 0
+                # unterminated, reported when the string is used
+                lineTokens.append((TOKEN_STRING, None, EMPTY_STRING))
 
-    L_programCodeMemoryPointer = 0
+                break
 
-    lineNumber = 0
+            stringData = stringData + lineText[textPointer:closingQuote]
 
-    N_numericData = 0
+            lineTokens.append((TOKEN_STRING, stringData, EMPTY_STRING))
 
-    S_processorStackPointer = 0
+            textPointer = closingQuote + 1
 
-    T = 0
+            character = lineText[textPointer]
 
-    V_variableStackMemoryPointer = 0
+            afterOperand = False
 
-    gosubStackMemoryPointer = 0
+            continue
 
-    asciiCode = 0
+        # operators and anything else
+        if (character + nextCharacter) in DOUBLE_CHARACTER_OPERATORS:
 
-    As_programCodeWorkspace = EMPTY_STRING
-    Bs_stringData = EMPTY_STRING
-    Cs_character = EMPTY_STRING
-    Ds_statementLabel = EMPTY_STRING
-    Es_errorMessage = EMPTY_STRING
+            character = character + nextCharacter
 
-    fileName = EMPTY_STRING
+        lineTokens.append((TOKEN_OPERATOR, character, character))
 
-    savingFile = False
-    loadingFile = False
-    fileNameOkay = False
+        afterOperand = (character == OP_RIGHT_PARENTHESIS)
 
+        textPointer = textPointer + len(character)
 
-def GetTotalMemory():
+        character = lineText[textPointer]
 
-    global totalMemoryMessage
+    lineTokens.append((TOKEN_END_OF_LINE, CHR_END_OF_LINE, CHR_END_OF_LINE))
 
-    totalMemory = (STRING_OBJECT_DATA_LENGTH + MAXIMUM_LINE_LENGTH * BYTES_PER_CHARACTER_BUFFER) * PROGRAM_CODE_MEMORY_TOP
+    return lineTokens
 
-    totalMemory = int(totalMemory / 1024)
 
-    totalMemoryMessage = SPACE + str(totalMemory) + "K MEMORY"
+def LineMemory(lineText, lineTokens):
 
+    # bytes held by a stored line, its text and its tokens
+    lineMemory = sys.getsizeof(lineText) + sys.getsizeof(lineTokens)
 
-def GetFreeMemory():
+    for token in lineTokens:
 
-    global freeMemoryMessage
+        lineMemory = lineMemory + sys.getsizeof(token)
 
-    freeMemoryStart = PROGRAM_CODE_MEMORY_START
+        # variables and keywords are small shared ints
+        if token[0] in LINE_OWNED_TOKEN_VALUES:
 
-    for memoryPointer in range(PROGRAM_CODE_MEMORY_TOP - 1, PROGRAM_CODE_MEMORY_START, -1):
+            lineMemory = lineMemory + sys.getsizeof(token[1])
 
-        memoryLocation = programCode[memoryPointer]
+    return lineMemory
 
-        if memoryLocation == EMPTY_STRING:
 
-            freeMemoryStart = memoryPointer
+def ParseNumber(numberText):
 
-    memoryTopBytes = (STRING_OBJECT_DATA_LENGTH + MAXIMUM_LINE_LENGTH * BYTES_PER_CHARACTER_BUFFER) * PROGRAM_CODE_MEMORY_TOP
+    # returns None for a malformed number, reported when it is used
+    if numberText.count(".") > 1:
 
-    memoryBottomBytes = (STRING_OBJECT_DATA_LENGTH + MAXIMUM_LINE_LENGTH * BYTES_PER_CHARACTER_BUFFER) * freeMemoryStart
+        return None
 
-    freeMemory = memoryTopBytes - memoryBottomBytes
+    if "." not in numberText:
 
-    freeMemoryMessage = "  " + str(freeMemory) + " BYTES FREE"
+        return int(numberText)
 
+    if numberText.strip("-.") == EMPTY_STRING:
 
-def Ready():
+        return None
 
-    global subroutine
+    if INTEGER_ARITHMETIC:
 
-    ErrorHandler()
+        return int(float(numberText))
 
-    subroutine = "EnterCommand"
+    return float(numberText)
 
 
-def EnterCommand():
+def SourceHash(sourceText):
 
-    global Zs_command, subroutine
+    return hashlib.sha256(sourceText.encode()).digest()
 
-    Zs_command = input(">")
 
-    if Zs_command == EMPTY_STRING:
+def CreateTemporaryFile(fileName):
 
-        subroutine = "Ready"
+    # a new file next to fileName, created the way open() creates
+    # one so the umask applies to it
+    while True:
 
-    else:
+        temporaryFileName = fileName + "." + os.urandom(4).hex() + ".tmp"
 
-        Zs_command = ConvertToUppercase(Zs_command)
+        try:
 
-        Zs_command = Zs_command + CHR_END_OF_LINE
+            return os.open(temporaryFileName, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666), temporaryFileName
 
-        subroutine = "MakeItSo"
+        except FileExistsError:
 
+            continue
 
-def MakeItSo():
 
-    global L_programCodeMemoryPointer, C_characterPointer, E_errorLineNumber
-    global lineNumber, subroutine
+def ReplaceFile(fileName, fileData):
 
-    L_programCodeMemoryPointer = PROGRAM_CODE_MEMORY_WORKSPACE
+    # written next to the file and renamed over it, so a
+    # failed write leaves the old copy as it was
+    fileDescriptor, temporaryFileName = CreateTemporaryFile(fileName)
 
-    C_characterPointer = 0
+    try:
 
-    programCode.insert(PROGRAM_CODE_MEMORY_WORKSPACE, Zs_command)
+        with os.fdopen(fileDescriptor, "wb" if isinstance(fileData, bytes) else "w") as dataFile:
 
-    GetNumber()
+            dataFile.write(fileData)
 
-    lineNumber = N_numericData
+        # a file saved over keeps its mode
+        try:
 
-    E_errorLineNumber = N_numericData
+            os.chmod(temporaryFileName, stat.S_IMODE(os.stat(fileName).st_mode))
 
-    if lineNumber == 0:
+        except FileNotFoundError:
 
-        if Cs_character == CHR_END_OF_LINE:
+            pass
 
-            subroutine = "Ready"
+        os.replace(temporaryFileName, fileName)
 
-        else:
+    except BaseException:
 
-            subroutine = "RunCommandInterpreter"
+        os.remove(temporaryFileName)
 
-            return
+        raise
 
-    if lineNumber > 0:
 
-        EnterLine()
+def WriteProgramImage(fileName, sourceHash, programLines):
 
-        subroutine = "Ready"
+    # programLines is a list of (line text, line tokens), the fastest
+    # compression already brings it well under the size of the source
+    imageBody = zlib.compress(marshal.dumps(programLines), 1)
 
-        return
+    imageHeader = PROGRAM_IMAGE_HEADER.pack(PROGRAM_IMAGE_MAGIC, PROGRAM_IMAGE_VERSION, marshal.version, sourceHash, hashlib.sha256(imageBody).digest(), len(programLines), len(imageBody))
 
-    if lineNumber < 0:
+    ReplaceFile(fileName, imageHeader + imageBody)
 
-        E_errorLineNumber = 0
 
-        ErrorMessage(ERROR_CODE_INVALID_LINE_NUMBER, ERROR_MESSAGE_INVALID_LINE_NUMBER)
+def ReadProgramImage(fileName, sourceHash):
 
-        subroutine = "Ready"
+    # the (line text, line tokens) list of the image, or None when
+    # there is no image, it doesn't belong to the source any more
+    # or it has been damaged
+    try:
 
-    else:
+        with open(fileName, "rb") as imageFile:
 
-        subroutine = "Engage"
+            # a stale image is turned down before its body is read
+            imageHeader = imageFile.read(PROGRAM_IMAGE_HEADER.size)
 
+            if len(imageHeader) < PROGRAM_IMAGE_HEADER.size:
 
-def Engage():
-    
-    global E_errorLineNumber, subroutine
-    
-    GetNumber()
-    
-    E_errorLineNumber = N_numericData
-    
-    subroutine = "RunCommandInterpreter"
+                return None
 
+            imageMagic, imageVersion, marshalVersion, imageHash, bodyHash, lineCount, bodyLength = PROGRAM_IMAGE_HEADER.unpack(imageHeader)
 
-def RunCommandInterpreter():
-    
-    global T, subroutine, C_characterPointer, gosubStackMemoryPointer
-    
-    GetStatementLabel()
-    
-    if Es_errorMessage != EMPTY_STRING:
-        
-        subroutine = "Ready"
-        
-        return 
+            if (imageMagic != PROGRAM_IMAGE_MAGIC) or (imageVersion != PROGRAM_IMAGE_VERSION) or (marshalVersion != marshal.version) or (imageHash != sourceHash):
 
-    if Ds_statementLabel == "IF":
+                return None
 
-        TinyBasic_If()
-        
-        return
-    
-    if Ds_statementLabel == "REM":
+            imageBody = imageFile.read(bodyLength + 1)
 
-        TinyBasic_Rem()
+    except OSError:
 
-        return
-    
-    if Ds_statementLabel == "INPUT":
+        return None
 
-        TinyBasic_Input()
+    if (len(imageBody) != bodyLength) or (hashlib.sha256(imageBody).digest() != bodyHash):
 
-        return
-    
-    if Ds_statementLabel == "PRINT":
+        return None
 
-        TinyBasic_Print()
+    try:
 
-        return
-    
-    if Ds_statementLabel == "RUN":
+        programLines = marshal.loads(zlib.decompress(imageBody))
 
-        gosubStackMemoryPointer = -1
+    except (zlib.error, EOFError, ValueError, TypeError):
 
-        TinyBasic_Run()
+        return None
 
-        return
+    if (not isinstance(programLines, list)) or (len(programLines) != lineCount) or (not ProgramLinesValid(programLines)):
 
-    if Ds_statementLabel == "GOTO":
+        return None
 
-        TinyBasic_Goto()
+    return programLines
 
-        return
 
-    if Ds_statementLabel == "GOSUB":
+def ProgramLinesValid(programLines):
 
-        TinyBasic_Gosub()
+    # checks an image holds what StoreProgramLines expects, lines of
+    # text with their tokens, numbered in increasing order
+    previousLineNumber = 0
 
-        return
+    for programLine in programLines:
 
-    if Ds_statementLabel == "RETURN":
+        if (not isinstance(programLine, tuple)) or (len(programLine) != 2):
 
-        TinyBasic_Return()
+            return False
 
-        return
+        lineText, lineTokens = programLine
 
-    if Ds_statementLabel == "NEW":
+        if (not isinstance(lineText, str)) or (not lineText.endswith("\n")) or (not isinstance(lineTokens, list)) or (not lineTokens):
 
-        TinyBasic_New()
+            return False
 
-        return
+        for lineToken in lineTokens:
 
-    if Ds_statementLabel == "CLS":
+            if (not isinstance(lineToken, tuple)) or (len(lineToken) != 3):
 
-        TinyBasic_Cls()
+                return False
 
-        return
+        tokenType, lineNumber = lineTokens[0][:2]
 
-    if Ds_statementLabel == "HELP":
+        if (tokenType != TOKEN_NUMBER) or (type(lineNumber) is not int) or (lineNumber <= previousLineNumber):
 
-        TinyBasic_Help()
+            return False
 
-        return
+        if lineTokens[-1][0] != TOKEN_END_OF_LINE:
 
-    if Ds_statementLabel == "MEM":
+            return False
 
-        TinyBasic_Mem()
+        previousLineNumber = lineNumber
 
-        return
+    return True
 
-    if Ds_statementLabel == "END":
 
-        TinyBasic_End()
+def ParseInputNumber(inputText):
 
-        return
+    # a number typed in answer to INPUT, None if it isn't one
+    numberText = inputText.strip()
 
-    if Ds_statementLabel == "STOP":
+    digitsText = numberText[1:] if numberText[:1] == OP_MINUS else numberText
 
-        TinyBasic_Stop()
+    if (digitsText == EMPTY_STRING) or (digitsText.strip("0123456789.") != EMPTY_STRING):
 
-        return
+        return None
 
-    if Ds_statementLabel == "LIST":
+    return ParseNumber(numberText)
 
-        TinyBasic_List()
 
-        return
+def FormatNumber(numericData):
 
-    if Ds_statementLabel == "SAVE":
+    # whole numbers print without a decimal point
+    if isinstance(numericData, float) and numericData.is_integer():
 
-        TinyBasic_Save()
+        return str(int(numericData))
 
-        return
+    return str(numericData)
 
-    if Ds_statementLabel == "LOAD":
 
-        TinyBasic_Load()
+def FoldExpression(expressionCode):
 
-        return
+    # works out operations on constants and drops +0, -0 and *1 from
+    # a postfix expression, each operand is kept as (code, constant
+    # value or None, True when its value is known to be a number)
+    operands = []
 
-    if Ds_statementLabel == "LET":
+    codePosition = 0
 
-        TinyBasic_Let()
+    while codePosition < len(expressionCode):
 
-    ReturnVariable()
+        instruction = expressionCode[codePosition]
 
-    if Es_errorMessage != EMPTY_STRING:
+        if instruction == BC_PUSH_NUMBER:
 
-        subroutine = "Ready"
+            operands.append((expressionCode[codePosition:codePosition + 2], expressionCode[codePosition + 1], True))
 
-        return
+            codePosition = codePosition + 2
 
-    SkipSpace()
+            continue
 
-    GetCharacter()
+        # a variable may hold the True or False of a comparison
+        if instruction == BC_PUSH_VARIABLE:
 
-    if Cs_character != OP_EQUALS:
+            operands.append((expressionCode[codePosition:codePosition + 2], None, False))
 
-        ErrorMessage(ERROR_CODE_EQUALS_EXPECTED, ERROR_MESSAGE_EQUALS_EXPECTED)
+            codePosition = codePosition + 2
 
-        subroutine = "Ready"
+            continue
 
-        return
+        codePosition = codePosition + 1
 
-    C_characterPointer = C_characterPointer + 1
+        rightCode, rightValue, rightIsNumber = operands.pop()
 
-    T = V_variableStackMemoryPointer
+        leftCode, leftValue, leftIsNumber = operands.pop()
 
-    GetExpression()
+        isNumber = instruction not in RELATIONAL_INSTRUCTIONS
 
-    if Es_errorMessage != EMPTY_STRING:
+        # division by zero is left to report its error when it runs
+        if (leftValue is not None) and (rightValue is not None) and not ((instruction in (BC_DIVIDE, BC_MODULUS)) and (rightValue == 0)):
 
-        subroutine = "Ready"
+            if instruction == BC_DIVIDE:
 
-        return
+                value = leftValue / rightValue
 
-    A_processorStack.insert(T, N_numericData)
+                if INTEGER_ARITHMETIC:
 
-    subroutine = "FinishStatement"
+                    value = int(value)
 
+            elif instruction == BC_MODULUS:
 
-def FinishStatement():
+                value = leftValue % rightValue
 
-    global L_programCodeMemoryPointer, C_characterPointer, subroutine
-    global Bs_stringData
+            else:
 
-    SkipSpace()
+                value = EXPRESSION_OPERATIONS[instruction](leftValue, rightValue)
 
-    GetCharacter()
+            operands.append(([BC_PUSH_NUMBER, value], value, isNumber))
 
-    if Cs_character == COLON:
+            continue
 
-        C_characterPointer = C_characterPointer + 1
+        # the operand kept has to be a number already, True + 0 is 1
+        rightIsIdentity = (type(rightValue) is int) and leftIsNumber
 
-        subroutine = "RunCommandInterpreter"
+        leftIsIdentity = (type(leftValue) is int) and rightIsNumber
 
-        return
+        if (instruction == BC_ADD) or (instruction == BC_SUBTRACT):
 
-    if Cs_character != CHR_END_OF_LINE:
+            if rightIsIdentity and (rightValue == 0):
 
-        ErrorMessage(ERROR_CODE_END_OF_STATEMENT_EXPECTED, ERROR_MESSAGE_END_OF_STATEMENT_EXPECTED)
+                operands.append((leftCode, None, True))
 
-        subroutine = "Ready"
+                continue
 
-        return
+            if (instruction == BC_ADD) and leftIsIdentity and (leftValue == 0):
 
-    if L_programCodeMemoryPointer == PROGRAM_CODE_MEMORY_WORKSPACE:
+                operands.append((rightCode, None, True))
 
-        subroutine = "Ready"
+                continue
 
-        return
+        if instruction == BC_MULTIPLY:
 
-    L_programCodeMemoryPointer = L_programCodeMemoryPointer + 1
+            if rightIsIdentity and (rightValue == 1):
 
-    C_characterPointer = 0
+                operands.append((leftCode, None, True))
 
-    if L_programCodeMemoryPointer == PROGRAM_CODE_MEMORY_TOP + 1:
+                continue
 
-        ErrorMessage(ERROR_CODE_MEMORY_OVERFLOW, ERROR_MESSAGE_MEMORY_OVERFLOW)
+            if leftIsIdentity and (leftValue == 1):
 
-        subroutine = "Ready"
+                operands.append((rightCode, None, True))
 
-        return
+                continue
 
-    Bs_stringData = programCode[L_programCodeMemoryPointer]
+        operands.append((leftCode + rightCode + [instruction], None, isNumber))
 
-    if Bs_stringData == EMPTY_STRING:
+    return operands[0][0]
 
-        subroutine = "Ready"
 
-    else:
+class Interpreter:
 
-        subroutine = "Engage"
+    __slots__ = (
+        "programCode",
+        "programTokens",
+        "commandHelp",
+        "statementHandlers",
+        "variables",
+        "A_processorStack",
+        "gosubStack",
+        "gosubStackLimit",
+        "programLineNumbers",
+        "programLineLimit",
+        "programMemoryUsed",
+        "programMapping",
+        "mappedLinesLeft",
+        "bytecode",
+        "bytecodeLineStarts",
+        "bytecodeValid",
+        "expressionCache",
+        "welcomeMessage",
+        "promptMessage",
+        "totalMemoryMessage",
+        "freeMemoryMessage",
+        "subroutine",
+        "stateHandlers",
+        "stepBudget",
+        "stepsLeft",
+        "deadline",
+        "stepLimitReached",
+        "timeLimitReached",
+        "profiling",
+        "lineProfile",
+        "profileLineNumber",
+        "profileLineStart",
+        "inputSource",
+        "outputSink",
+        "outputBuffer",
+        "outputBufferLength",
+        "outputBufferLimit",
+        "outputFlushSeconds",
+        "outputFlushTime",
+        "A",
+        "B",
+        "C_tokenPointer",
+        "errorCode",
+        "E_errorLineNumber",
+        "L_programCodeMemoryPointer",
+        "lineNumber",
+        "N_numericData",
+        "S_processorStackPointer",
+        "T",
+        "V_variableStackMemoryPointer",
+        "asciiCode",
+        "tokenType",
+        "tokenValue",
+        "labelType",
+        "labelValue",
+        "As_programCodeWorkspace",
+        "Bs_stringData",
+        "Cs_character",
+        "Ds_statementLabel",
+        "Es_errorMessage",
+        "Zs_command",
+        "fileName",
+        "F",
+        "useBytecodeEngine",
+        "savingFile",
+        "loadingFile",
+        "fileNameOkay"
+    )
+
+    def __init__(self):
+
+        self.programCode = []
+        self.programTokens = []
+        self.commandHelp = []
+        self.statementHandlers = {}
+        self.variables = CLEARED_VARIABLES[:]
+        self.A_processorStack = []
+
+        # return frames, (slot, token pointer) after the GOSUB for
+        # the interpreter and a code position for the bytecode engine
+        self.gosubStack = []
+        self.gosubStackLimit = GOSUB_STACK_LIMIT
+
+        # sorted line numbers of the stored program,
+        # line number at index i lives in slot [27 + i]
+        self.programLineNumbers = []
+
+        # soft limit on program lines, and the bytes they use
+        self.programLineLimit = PROGRAM_LINE_LIMIT
+        self.programMemoryUsed = 0
+
+        # file the LOADed program is mapped from, its lines are held
+        # as (start, end) offsets until they are first needed, and
+        # the number of them still waiting to be read
+        self.programMapping = None
+        self.mappedLinesLeft = 0
+
+        # compiled program, rebuilt on RUN after the program changes
+        self.bytecode = []
+        self.bytecodeLineStarts = []
+        self.bytecodeValid = False
+
+        # (slot, token pointer) -> (postfix, token pointer after it)
+        # for expressions in stored lines, emptied when the program changes
+        self.expressionCache = {}
+
+        self.welcomeMessage = ""
+        self.promptMessage = ""
+        self.totalMemoryMessage = ""
+        self.freeMemoryMessage = ""
+
+        self.subroutine = ""
+        self.stateHandlers = {}
+
+        # budgets of a headless run, None = no limit
+        self.stepBudget = None
+        self.stepsLeft = None
+        self.deadline = None
+        self.stepLimitReached = False
+        self.timeLimitReached = False
+
+        # line number -> [executions, seconds] while profiling
+        self.profiling = False
+        self.lineProfile = {}
+        self.profileLineNumber = None
+        self.profileLineStart = 0
+
+        # file INPUT and the prompt read lines from, None reads
+        # through input() from whatever sys.stdin is
+        self.inputSource = None
+
+        # text waiting for the sink, a callable taking a string,
+        # None writes to whatever sys.stdout is when flushed
+        self.outputSink = None
+        self.outputBuffer = []
+        self.outputBufferLength = 0
+        self.outputBufferLimit = OUTPUT_BUFFER_LIMIT
+        self.outputFlushSeconds = OUTPUT_FLUSH_SECONDS
+        self.outputFlushTime = 0
+
+        self.A = 0
+        self.B = 0
+        self.C_tokenPointer = 0
+        self.errorCode = 0
+        self.E_errorLineNumber = 0
+        self.L_programCodeMemoryPointer = 0
+        self.lineNumber = 0
+        self.N_numericData = 0
+        self.S_processorStackPointer = 0
+        self.T = 0
+        self.V_variableStackMemoryPointer = 0
+        self.asciiCode = 0
+
+        self.tokenType = TOKEN_END_OF_LINE
+        self.tokenValue = CHR_END_OF_LINE
+        self.labelType = TOKEN_END_OF_LINE
+        self.labelValue = CHR_END_OF_LINE
 
+        self.As_programCodeWorkspace = ""
+        self.Bs_stringData = ""
+        self.Cs_character = ""
+        self.Ds_statementLabel = ""
+        self.Es_errorMessage = ""
+        self.Zs_command = ""
 
-def EnterLine():
-    
-    global B, F, T, L_programCodeMemoryPointer, C_characterPointer
+        self.fileName = ""
 
-    L_programCodeMemoryPointer = PROGRAM_CODE_MEMORY_START
+        self.F = False
+        self.useBytecodeEngine = False
+        self.savingFile = False
+        self.loadingFile = False
+        self.fileNameOkay = False
+
+
+    def Start(self):
+
+        self.Initialise()
+
+        # steps are handed out in slices even without a budget, so
+        # output held through a long run is still shown on time
+        self.stepsLeft = 0
 
-    C_characterPointer = 0
+        try:
 
-    T = N_numericData
+            while True:
 
-    # (NextLine)
+                if self.stepsLeft == 0:
 
-    canLoop = True
+                    self.stepsLeft = self.GrantSteps()
 
-    # REPEAT
-    while canLoop:
+                self.stepsLeft = self.stepsLeft - 1
 
-        GetNumber()
+                self.stateHandlers[self.subroutine]()
 
-        F = (N_numericData < T) and (N_numericData != 0) and (L_programCodeMemoryPointer < PROGRAM_CODE_MEMORY_TOP + 1)
+                # WHEN "PrintBufferController" : PrintBufferController)
+                # WHEN "GetString" : GetString)
+                # WHEN "GetNumeric" : GetNumeric)
 
-        if F:
+                # WHEN "Save" : SaveFile)
+                # WHEN "Load" : LoadFile)
 
-            L_programCodeMemoryPointer = L_programCodeMemoryPointer + 1
+        finally:
 
-            C_characterPointer = 0
+            self.FlushOutput()
 
-        else:
 
-            canLoop = False
+    def Initialise(self):
 
-    # UNTIL F = FALSE
+        self.useBytecodeEngine = BYTECODE_ENGINE_SWITCH in sys.argv[1:]
 
-    if L_programCodeMemoryPointer == PROGRAM_CODE_MEMORY_TOP + 1:
+        self.ColdStart()
+        self.WarmStart()
 
-        ErrorMessage(ERROR_CODE_MEMORY_OVERFLOW, ERROR_MESSAGE_MEMORY_OVERFLOW)
+        self.WriteOutput(self.welcomeMessage + CHR_END_OF_LINE)
+        self.WriteOutput(CHR_END_OF_LINE)
 
-        return
+        self.GetTotalMemory()
+        self.GetFreeMemory()
 
-    if T != N_numericData:
+        self.WriteOutput(self.totalMemoryMessage + self.freeMemoryMessage + CHR_END_OF_LINE)
+        self.WriteOutput(CHR_END_OF_LINE)
+        self.WriteOutput(self.promptMessage)
 
-        for i in range(PROGRAM_CODE_MEMORY_TOP, L_programCodeMemoryPointer, -1):
+        self.subroutine = "Ready"
 
-            B = i - 1
 
-            programCode.insert(i, programCode[B])
+    def InitialiseCommandHelp(self):
 
-    programCode.insert(L_programCodeMemoryPointer, Zs_command)
+        del self.commandHelp[:]
 
-    GetCharacter()
+        self.commandHelp.insert(0, "CLS, CLEAR, END")
+        self.commandHelp.insert(1, "HELP, MEM, NEW, RUN")
+        self.commandHelp.insert(2, "GOTO | GOSUB | LOAD | SAVE <exp>")
+        self.commandHelp.insert(3, "if <exp> THEN <statement>")
+        self.commandHelp.insert(4, "INPUT <var>")
+        self.commandHelp.insert(5, "[LET] <var>=<exp>")
+        self.commandHelp.insert(6, "LIST [<exp>|PAUSE]")
+        self.commandHelp.insert(7, "print <exp|str>[,<exp|str>][;]")
+        self.commandHelp.insert(8, "REM <any>")
+        self.commandHelp.insert(9, "PROFILE [ON|OFF]")
 
-    if Cs_character == CHR_END_OF_LINE:
 
-        for i in range(L_programCodeMemoryPointer, PROGRAM_CODE_MEMORY_TOP - 1):
+    def InitialiseStateHandlers(self):
 
-            B = i + 1
+        # state -> handler jump table, one lookup and one call per step
+        self.stateHandlers = {
+            "Ready": self.Ready,
+            "EnterCommand": self.EnterCommand,
+            "MakeItSo": self.MakeItSo,
+            "Engage": self.Engage,
+            "RunCommandInterpreter": self.RunCommandInterpreter,
+            "FinishStatement": self.FinishStatement
+        }
 
-            programCode.insert(i, programCode[B])
 
+    def InitialiseStatementHandlers(self):
 
-def GetExpression():
-    
-    global S_processorStackPointer, N_numericData
+        # keyword -> statement handler, THEN and PAUSE fall through to assignment
+        self.statementHandlers = {
+            KEYWORD_IF: self.TinyBasic_If,
+            KEYWORD_REM: self.TinyBasic_Rem,
+            KEYWORD_INPUT: self.TinyBasic_Input,
+            KEYWORD_PRINT: self.TinyBasic_Print,
+            KEYWORD_RUN: self.TinyBasic_Run,
+            KEYWORD_GOTO: self.TinyBasic_Goto,
+            KEYWORD_GOSUB: self.TinyBasic_Gosub,
+            KEYWORD_RETURN: self.TinyBasic_Return,
+            KEYWORD_NEW: self.TinyBasic_New,
+            KEYWORD_CLS: self.TinyBasic_Cls,
+            KEYWORD_HELP: self.TinyBasic_Help,
+            KEYWORD_MEM: self.TinyBasic_Mem,
+            KEYWORD_END: self.TinyBasic_End,
+            KEYWORD_STOP: self.TinyBasic_Stop,
+            KEYWORD_LIST: self.TinyBasic_List,
+            KEYWORD_SAVE: self.TinyBasic_Save,
+            KEYWORD_LOAD: self.TinyBasic_Load,
+            KEYWORD_LET: self.TinyBasic_Let,
+            KEYWORD_CLEAR: self.TinyBasic_Clear,
+            KEYWORD_PROFILE: self.TinyBasic_Profile
+        }
 
-    S_processorStackPointer = VARIABLE_STACK_MEMORY_TOP  # ACCUMULATOR_MEMORY_START
 
-    A_processorStack.insert(S_processorStackPointer, 0)
+    def ColdStart(self):
 
-    BoolExpression()
+        # [27-] = program lines, grows as lines are entered,
+        # an empty slot after the last line ends the program
+        self.programCode = [EMPTY_STRING] * (PROGRAM_CODE_MEMORY_START + 1)
 
-    N_numericData = A_processorStack[S_processorStackPointer]
+        # tokenized copy of each program line
+        self.programTokens = [None] * (PROGRAM_CODE_MEMORY_START + 1)
 
+        # [54 - 84] = 30 items math stack
+        # variables A-Z are kept in their own array
+        self.A_processorStack = [0] * PROCESSOR_STACK_MEMORY_TOP
 
-def BoolExpression():
+        # gosub stack
+        self.gosubStack = []
 
-    global F, asciiCode
+        self.InitialiseCommandHelp()
 
-    AdditionSubtractionExpression()
+        self.InitialiseStateHandlers()
 
-    SkipSpace()
+        self.InitialiseStatementHandlers()
 
-    GetCharacter()
+        self.welcomeMessage = SPACE + "**** TINY BASIC PYTHON EDITION ****"
+        self.promptMessage = "READY"
 
-    # (NextBool)
 
-    canLoop = True
+    def WarmStart(self):
 
-    # REPEAT
-    while canLoop:
+        self.programCode[:] = [EMPTY_STRING] * (PROGRAM_CODE_MEMORY_START + 1)
 
-        if Cs_character == OP_EQUALS:
+        self.programTokens[:] = [None] * (PROGRAM_CODE_MEMORY_START + 1)
 
-            TinyBasic_Equals()
+        self.CloseProgramMapping()
 
-        if Cs_character == OP_GREATER_THAN:
+        for processorStackPointer in range(PROCESSOR_STACK_MEMORY_TOP):
 
-            TinyBasic_Greater_Than()
+            self.A_processorStack[processorStackPointer] = 0
 
-        if Cs_character == OP_LESS_THAN:
+        del self.gosubStack[:]
 
-            TinyBasic_Less_Than()
+        self.programLineNumbers = []
 
-        SkipSpace()
+        self.programMemoryUsed = 0
 
-        GetCharacter()
+        self.bytecodeValid = False
 
-        asciiCode = ord(Cs_character)
+        self.expressionCache.clear()
 
-        F = (asciiCode >= ASC_LESS_THAN) and (asciiCode <= ASC_GREATER_THAN)
+        self.ClearVariables()
 
-        if not F:
+        self.A = 0
+        self.B = 0
 
-            canLoop = False
+        self.C_tokenPointer = 0
 
-    # UNTIL F = FALSE
+        self.errorCode = 0
+        self.E_errorLineNumber = 0
 
+        self.L_programCodeMemoryPointer = 0
 
-def AdditionSubtractionExpression():
+        self.lineNumber = 0
 
-    global F, asciiCode
+        self.N_numericData = 0
 
-    MultiplyDivideModulusExpression()
-    
-    SkipSpace()
-    
-    GetCharacter()
+        self.S_processorStackPointer = 0
 
-    # (NextAdditionSubraction)
+        self.T = 0
 
-    canLoop = True
+        self.V_variableStackMemoryPointer = 0
 
-    # REPEAT
-    while canLoop:
+        self.asciiCode = 0
 
-        if Cs_character == OP_PLUS:
+        self.As_programCodeWorkspace = EMPTY_STRING
+        self.Bs_stringData = EMPTY_STRING
+        self.Cs_character = EMPTY_STRING
+        self.Ds_statementLabel = EMPTY_STRING
+        self.Es_errorMessage = EMPTY_STRING
 
-            TinyBasic_Add()
+        self.fileName = EMPTY_STRING
 
-        if Cs_character == OP_MINUS:
+        self.savingFile = False
+        self.loadingFile = False
+        self.fileNameOkay = False
 
-            TinyBasic_Subtract()
 
-        SkipSpace()
+    def GetTotalMemory(self):
 
-        GetCharacter()
+        # measured bytes, there is no fixed pool to take them from
+        usedMemory = self.GetMemoryUsage().used
 
-        asciiCode = ord(Cs_character)
+        self.totalMemoryMessage = SPACE + str(usedMemory) + " BYTES USED"
 
-        F = (asciiCode == ASC_PLUS) or (asciiCode == ASC_MINUS)
 
-        if not F:
+    def GetFreeMemory(self):
 
-            canLoop = False
+        # the program store is limited by lines, not bytes
+        memoryUsage = self.GetMemoryUsage()
 
-    # UNTIL F = FALSE
+        self.freeMemoryMessage = "  " + str(memoryUsage.lineLimit - memoryUsage.lines) + " LINES FREE"
 
 
-def MultiplyDivideModulusExpression():
+    def Ready(self):
 
-    global F, asciiCode
+        if self.profiling:
 
-    GroupExpression()
+            self.ProfileLine(None)
 
-    SkipSpace()
+        self.ErrorHandler()
 
-    GetCharacter()
+        self.subroutine = "EnterCommand"
 
-    # (NextMultiplyDivideModulus)
 
-    canLoop = True
+    def EnterCommand(self):
 
-    # REPEAT
-    while canLoop:
+        self.Zs_command = self.ReadInput(">")
 
-        if Cs_character == OP_MULTIPLY:
+        if self.Zs_command == EMPTY_STRING:
 
-            TinyBasic_Multiply()
+            self.subroutine = "Ready"
+
+        else:
 
-        if Cs_character == OP_DIVIDE:
+            self.Zs_command = self.ConvertToUppercase(self.Zs_command)
 
-            TinyBasic_Divide()
+            self.Zs_command = self.Zs_command + CHR_END_OF_LINE
 
-        if Cs_character == OP_MODULUS:
+            self.subroutine = "MakeItSo"
 
-            TinyBasic_Modulus()
 
-        SkipSpace()
+    def MakeItSo(self):
 
-        GetCharacter()
+        self.L_programCodeMemoryPointer = PROGRAM_CODE_MEMORY_WORKSPACE
 
-        asciiCode = ord(Cs_character)
+        self.C_tokenPointer = 0
 
-        F = (asciiCode == ASC_ASTERISK) or (asciiCode == ASC_FORWARD_SLASH) or (asciiCode == ASC_PERCENT)
+        self.programCode[PROGRAM_CODE_MEMORY_WORKSPACE] = self.Zs_command
 
-        if not F:
+        self.programTokens[PROGRAM_CODE_MEMORY_WORKSPACE] = TokenizeLine(self.Zs_command)
 
-            canLoop = False
+        self.GetNumber()
 
-    # UNTIL F = FALSE
+        if self.Es_errorMessage != EMPTY_STRING:
 
+            self.subroutine = "Ready"
 
-def GroupExpression():
+            return
 
-    global B, F, C_characterPointer, S_processorStackPointer, asciiCode
-    global Cs_character
+        self.lineNumber = self.N_numericData
 
-    TICKS = 0
-    TICKSPERSEC = 0
+        self.E_errorLineNumber = self.N_numericData
 
-    SkipSpace()
+        if self.lineNumber == 0:
 
-    GetCharacter()
+            if self.Cs_character == CHR_END_OF_LINE:
 
-    if Cs_character == OP_LEFT_PARENTHESIS:
+                self.subroutine = "Ready"
 
-        C_characterPointer = C_characterPointer + 1
+            else:
 
-        BoolExpression()
+                self.subroutine = "RunCommandInterpreter"
 
-        SkipSpace()
+                return
 
-        GetCharacter()
+        if self.lineNumber > 0:
 
-        if Cs_character != OP_RIGHT_PARENTHESIS:
+            self.EnterLine()
 
-            ErrorMessage(ERROR_CODE_MISSING_RIGHT_PARENTHESIS, ERROR_MESSAGE_MISSING_RIGHT_PARENTHESIS)
+            self.subroutine = "Ready"
 
             return
 
-        C_characterPointer = C_characterPointer + 1
+        if self.lineNumber < 0:
 
-        return
+            self.E_errorLineNumber = 0
 
-    if Cs_character == CHR_END_OF_LINE:
+            self.ErrorMessage(ERROR_CODE_INVALID_LINE_NUMBER, ERROR_MESSAGE_INVALID_LINE_NUMBER)
 
-        ErrorMessage(ERROR_CODE_INVALID_FACTOR, ERROR_MESSAGE_INVALID_FACTOR)
+            self.subroutine = "Ready"
 
-        return
+        else:
 
-    # ELSE
-    asciiCode = ord(Cs_character)
+            self.subroutine = "Engage"
 
-    F = ((asciiCode < ASC_ZERO) or (asciiCode > ASC_NINE)) and (asciiCode != ASC_MINUS) and (asciiCode != ASC_DECIMAL_POINT)
 
-    if not F:
+    def Engage(self):
 
-        GetNumber()
+        if self.programTokens[self.L_programCodeMemoryPointer] is None:
 
-        if Es_errorMessage != EMPTY_STRING:
+            self.ReadMappedLine(self.L_programCodeMemoryPointer)
 
-            return
+        # line numbers were read when the lines were entered
+        self.N_numericData = self.programLineNumbers[self.L_programCodeMemoryPointer - PROGRAM_CODE_MEMORY_START]
 
-        S_processorStackPointer = S_processorStackPointer + 1
+        self.C_tokenPointer = LINE_BODY_TOKEN
 
-        A_processorStack.insert(S_processorStackPointer, N_numericData)
+        self.E_errorLineNumber = self.N_numericData
 
-    else:
+        if self.profiling:
 
-        GetStatementLabel()
+            self.ProfileLine(self.N_numericData)
 
-        if Es_errorMessage != EMPTY_STRING:
+        self.subroutine = "RunCommandInterpreter"
 
-            return
 
-        B = len(Ds_statementLabel)
+    def RunCommandInterpreter(self):
+
+        self.GetStatementLabel()
 
-        if B == 1:
+        if self.Es_errorMessage != EMPTY_STRING:
 
-            ReturnVariable()
+            self.subroutine = "Ready"
 
-            S_processorStackPointer = S_processorStackPointer + 1
+            return 
 
-            A_processorStack.insert(S_processorStackPointer, A_processorStack[V_variableStackMemoryPointer])
+        # anything that isn't a statement keyword is an implicit LET
+        if self.labelType == TOKEN_KEYWORD:
+
+            self.statementHandlers.get(self.labelValue, self.TinyBasic_Assignment)()
 
         else:
 
-            if Ds_statementLabel == "ticks":
+            self.TinyBasic_Assignment()
 
-                S_processorStackPointer = S_processorStackPointer + 1
 
-                A_processorStack.insert(S_processorStackPointer, TICKS)
+    def TinyBasic_Assignment(self):
 
-                return
+        self.ReturnVariable()
 
-            if Ds_statementLabel == "tickspersec":
+        if self.Es_errorMessage != EMPTY_STRING:
 
-                S_processorStackPointer = S_processorStackPointer + 1
+            self.subroutine = "Ready"
 
-                A_processorStack.insert(S_processorStackPointer, TICKSPERSEC)
+            return
 
-                return
+        self.GetToken()
+
+        if self.Cs_character != OP_EQUALS:
+
+            self.ErrorMessage(ERROR_CODE_EQUALS_EXPECTED, ERROR_MESSAGE_EQUALS_EXPECTED)
+
+            self.subroutine = "Ready"
+
+            return
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
 
-            ErrorMessage(ERROR_CODE_FUNCTION_EXPECTED, ERROR_MESSAGE_FUNCTION_EXPECTED)
+        self.T = self.V_variableStackMemoryPointer
 
+        self.GetExpression()
 
-def GetNumber():
+        if self.Es_errorMessage != EMPTY_STRING:
 
-    global F, C_characterPointer, asciiCode
-    global Bs_stringData
+            self.subroutine = "Ready"
+
+            return
+
+        self.StoreVariable(self.T, self.N_numericData)
+
+        if self.Es_errorMessage != EMPTY_STRING:
+
+            self.subroutine = "Ready"
+
+            return
+
+        self.subroutine = "FinishStatement"
 
-    SkipSpace()
 
-    GetCharacter()
+    def FinishStatement(self):
 
-    decimalPlaces = 0
+        self.GetToken()
 
-    if Cs_character == OP_MINUS:
+        if self.Cs_character == COLON:
 
-        Bs_stringData = OP_MINUS
+            self.C_tokenPointer = self.C_tokenPointer + 1
 
-        C_characterPointer = C_characterPointer + 1
+            self.subroutine = "RunCommandInterpreter"
 
-        GetCharacter()
+            return
+
+        if self.Cs_character != CHR_END_OF_LINE:
 
-        asciiCode = ord(Cs_character)
+            self.ErrorMessage(ERROR_CODE_END_OF_STATEMENT_EXPECTED, ERROR_MESSAGE_END_OF_STATEMENT_EXPECTED)
 
-        print(asciiCode)
+            self.subroutine = "Ready"
 
-        F = ((asciiCode < ASC_ZERO) or (asciiCode > ASC_NINE)) and (asciiCode != ASC_DECIMAL_POINT)
+            return
 
-        if F:
+        if self.L_programCodeMemoryPointer == PROGRAM_CODE_MEMORY_WORKSPACE:
 
-            ErrorMessage(ERROR_CODE_INVALID_NUMBER, ERROR_MESSAGE_INVALID_NUMBER)
+            self.subroutine = "Ready"
 
             return
 
-    else:
+        self.L_programCodeMemoryPointer = self.L_programCodeMemoryPointer + 1
+
+        self.C_tokenPointer = 0
+
+        if self.programCode[self.L_programCodeMemoryPointer] == EMPTY_STRING:
+
+            self.subroutine = "Ready"
+
+        else:
+
+            self.subroutine = "Engage"
+
+
+    def EnterLine(self):
+
+        self.bytecodeValid = False
+
+        # lines may move, cached expressions and return frames are stale
+        self.expressionCache.clear()
+
+        del self.gosubStack[:]
+
+        # line number on its own deletes the line
+        self.GetToken()
+
+        lineIndex = bisect_left(self.programLineNumbers, self.N_numericData)
 
-        Bs_stringData = EMPTY_STRING
+        lineExists = (lineIndex < len(self.programLineNumbers)) and (self.programLineNumbers[lineIndex] == self.N_numericData)
 
-    # (NextNumber)
+        self.L_programCodeMemoryPointer = PROGRAM_CODE_MEMORY_START + lineIndex
 
-    canLoop = True
+        if self.Cs_character == CHR_END_OF_LINE:
 
-    # REPEAT
-    while canLoop:
+            if lineExists:
 
-        asciiCode = ord(Cs_character)
+                self.DropStoredLine(self.L_programCodeMemoryPointer)
 
-        if asciiCode == ASC_DECIMAL_POINT:
+                # later lines move up a slot
+                del self.programCode[self.L_programCodeMemoryPointer]
 
-            decimalPlaces = decimalPlaces + 1
+                del self.programTokens[self.L_programCodeMemoryPointer]
 
-        if decimalPlaces > 1:
+                del self.programLineNumbers[lineIndex]
 
-            ErrorMessage(ERROR_CODE_INVALID_NUMBER, ERROR_MESSAGE_INVALID_NUMBER)
+            self.C_tokenPointer = 0
 
             return
 
-        F = ((asciiCode < ASC_ZERO) or (asciiCode > ASC_NINE)) and (asciiCode != ASC_DECIMAL_POINT)
+        if lineExists:
 
-        if F:
+            self.DropStoredLine(self.L_programCodeMemoryPointer)
 
-            GetNumberCalc()
+            self.programMemoryUsed = self.programMemoryUsed + LineMemory(self.Zs_command, self.programTokens[PROGRAM_CODE_MEMORY_WORKSPACE])
+
+            self.programCode[self.L_programCodeMemoryPointer] = self.Zs_command
+
+            self.programTokens[self.L_programCodeMemoryPointer] = self.programTokens[PROGRAM_CODE_MEMORY_WORKSPACE]
+
+            self.C_tokenPointer = 0
 
             return
 
-        Bs_stringData = Bs_stringData + Cs_character
+        if len(self.programLineNumbers) >= self.programLineLimit:
 
-        C_characterPointer = C_characterPointer + 1
+            self.ErrorMessage(ERROR_CODE_MEMORY_OVERFLOW, ERROR_MESSAGE_MEMORY_OVERFLOW)
 
-        GetCharacter()
+            return
 
-    # UNTIL Cs_character$ = CHR_END_OF_LINE$
+        self.programMemoryUsed = self.programMemoryUsed + LineMemory(self.Zs_command, self.programTokens[PROGRAM_CODE_MEMORY_WORKSPACE])
 
-    GetNumberCalc()
+        # later lines move down a slot
+        self.programCode.insert(self.L_programCodeMemoryPointer, self.Zs_command)
 
+        self.programTokens.insert(self.L_programCodeMemoryPointer, self.programTokens[PROGRAM_CODE_MEMORY_WORKSPACE])
 
-def GetNumberCalc():
+        self.programLineNumbers.insert(lineIndex, self.N_numericData)
 
-    global N_numericData
+        self.C_tokenPointer = 0
 
-    N_numericData = int(Bs_stringData)
 
+    def FindLineNumber(self, lineNumberToFind):
 
-def GetVariable():
+        # returns the slot holding the line, or 0 if there is no such line
+        lineIndex = bisect_left(self.programLineNumbers, lineNumberToFind)
 
-    GetStatementLabel()
+        if (lineIndex < len(self.programLineNumbers)) and (self.programLineNumbers[lineIndex] == lineNumberToFind):
 
-    if Es_errorMessage != EMPTY_STRING:
+            return PROGRAM_CODE_MEMORY_START + lineIndex
 
-        return
+        return 0
 
-    ReturnVariable()
 
+    def MapProgramLines(self, programMapping):
 
-def ReturnVariable():
+        # finds every line of a mapped file in one scan, only the line
+        # numbers are read, a line read later replaces one with the
+        # same number as if it had been typed in
+        programLines = {}
 
-    global A, F, asciiCode, V_variableStackMemoryPointer
+        for lineMatch in MAPPED_LINE_PATTERN.finditer(programMapping):
 
-    asciiCode = ord(Ds_statementLabel)
+            if lineMatch.end() == lineMatch.start():
 
-    A = len(Ds_statementLabel)
+                break
 
-    # F = (A != 1) OR (asciiCode < CHR_UPPERCASE_A) OR (asciiCode > CHR_UPPERCASE_Z)
-    F = (A == 1) and (asciiCode >= ASC_UPPERCASE_A) and (asciiCode <= ASC_UPPERCASE_Z)
+            numberText, lineBody = lineMatch.groups()
 
-    if F:
+            # blank lines are skipped
+            if (numberText == b"") and (lineBody.strip() == b""):
 
-        # [27 - 53]
-        V_variableStackMemoryPointer = asciiCode - 38
+                continue
 
-    else:
+            lineNumber = ParseNumber(numberText.decode()) if numberText else None
 
-        ErrorMessage(ERROR_CODE_VARIABLE_EXPECTED, ERROR_MESSAGE_VARIABLE_EXPECTED)
+            if (lineNumber is None) or (lineNumber <= 0) or (lineBody.strip() == b""):
 
+                self.E_errorLineNumber = 0
 
-def GetStatementLabel():
+                self.ErrorMessage(ERROR_CODE_INVALID_LINE_NUMBER, ERROR_MESSAGE_INVALID_LINE_NUMBER)
 
-    global F, C_characterPointer, asciiCode, subroutine
-    global Ds_statementLabel
+                continue
 
-    SkipSpace()
+            programLines[lineNumber] = (lineMatch.start(), lineMatch.end(2))
 
-    GetCharacter()
+        self.programLineNumbers = sorted(programLines)
 
-    Ds_statementLabel = EMPTY_STRING
+        if len(self.programLineNumbers) > self.programLineLimit:
 
-    # if Cs_character$ = "" THEN
-    if Cs_character == CHR_END_OF_LINE:
+            self.ErrorMessage(ERROR_CODE_MEMORY_OVERFLOW, ERROR_MESSAGE_MEMORY_OVERFLOW)
 
-        ErrorMessage(ERROR_CODE_INVALID_LABEL, ERROR_MESSAGE_INVALID_LABEL)
+            del self.programLineNumbers[self.programLineLimit:]
 
-        return
+        del self.programCode[PROGRAM_CODE_MEMORY_START:]
 
-    asciiCode = ord(Cs_character)
+        del self.programTokens[PROGRAM_CODE_MEMORY_START:]
 
-    F = (asciiCode < ASC_UPPERCASE_A) or (asciiCode > ASC_UPPERCASE_Z)
+        self.programMemoryUsed = 0
 
-    if F:
+        self.bytecodeValid = False
 
-        ErrorMessage(ERROR_CODE_INVALID_LABEL, ERROR_MESSAGE_INVALID_LABEL)
+        self.expressionCache.clear()
 
-        return
+        del self.gosubStack[:]
 
-    GetNextLabel()
+        self.CloseProgramMapping()
 
+        self.programMapping = programMapping
 
-def GetNextLabel():
+        self.mappedLinesLeft = len(self.programLineNumbers)
 
-    global F, C_characterPointer, asciiCode
-    global Ds_statementLabel
+        for lineNumber in self.programLineNumbers:
 
-    canLoop = True
+            lineOffsets = programLines[lineNumber]
 
-    # REPEAT
-    while canLoop:
+            self.programCode.append(lineOffsets)
 
-        Ds_statementLabel = Ds_statementLabel + Cs_character
+            self.programTokens.append(None)
 
-        C_characterPointer = C_characterPointer + 1
+            self.programMemoryUsed = self.programMemoryUsed + sys.getsizeof(lineOffsets)
 
-        GetCharacter()
+        # end of program
+        self.programCode.append(EMPTY_STRING)
 
-        # if Cs_character$ = "" THEN
-        if Cs_character == CHR_END_OF_LINE:
+        self.programTokens.append(None)
 
-            return
+        if self.mappedLinesLeft == 0:
 
-        asciiCode = ord(Cs_character)
+            self.CloseProgramMapping()
 
-        F = (asciiCode >= ASC_UPPERCASE_A) and (asciiCode <= ASC_UPPERCASE_Z)
 
-        if not F:
+    def ReadMappedLine(self, lineSlot):
 
-            canLoop = False
+        # turns the offsets of a mapped line into its text and tokens
+        lineStart, lineEnd = self.programCode[lineSlot]
 
-    # UNTIL F = FALSE
+        lineText = self.programMapping[lineStart:lineEnd].rstrip(b"\r").decode(errors="replace").translate(UPPERCASE_TABLE) + CHR_END_OF_LINE
 
+        lineTokens = TokenizeLine(lineText)
 
-def SkipSpace():
+        self.programMemoryUsed = self.programMemoryUsed - sys.getsizeof(self.programCode[lineSlot]) + LineMemory(lineText, lineTokens)
 
-    global C_characterPointer, Cs_character
+        self.programCode[lineSlot] = lineText
 
-    GetCharacter()
+        self.programTokens[lineSlot] = lineTokens
 
-    while Cs_character == SPACE:
+        self.MappedLineDone()
 
-        C_characterPointer = C_characterPointer + 1
 
-        Cs_character = As_programCodeWorkspace[C_characterPointer]
+    def DropStoredLine(self, lineSlot):
 
+        # takes a line about to be replaced or deleted off the books,
+        # a mapped line not read yet only holds its offsets
+        if self.programTokens[lineSlot] is None:
 
-def GetCharacter():
+            self.programMemoryUsed = self.programMemoryUsed - sys.getsizeof(self.programCode[lineSlot])
 
-    global As_programCodeWorkspace, Cs_character
+            self.MappedLineDone()
 
-    As_programCodeWorkspace = programCode[L_programCodeMemoryPointer]
+        else:
 
-    Cs_character = As_programCodeWorkspace[C_characterPointer]
+            self.programMemoryUsed = self.programMemoryUsed - LineMemory(self.programCode[lineSlot], self.programTokens[lineSlot])
 
 
-# tiny basic commands
-def TinyBasic_If():
+    def MappedLineDone(self):
 
-    global C_characterPointer, subroutine
-    global Bs_stringData
+        # the file is let go once no line points into it
+        self.mappedLinesLeft = self.mappedLinesLeft - 1
 
-    GetExpression()
+        if self.mappedLinesLeft == 0:
 
-    if Es_errorMessage != EMPTY_STRING:
+            self.CloseProgramMapping()
 
-        subroutine = "Ready"
 
-        return
+    def CloseProgramMapping(self):
 
-    # if N < 1 THEN
-    if N_numericData == 0:
+        # an empty file is held as b""
+        if isinstance(self.programMapping, mmap.mmap):
 
-        Bs_stringData = programCode[L_programCodeMemoryPointer]
+            self.programMapping.close()
 
-        C_characterPointer = len(Bs_stringData)  # + 1
+        self.programMapping = None
 
-        subroutine = "FinishStatement"
+        self.mappedLinesLeft = 0
 
-        return
 
-    GetStatementLabel()
+    def StoredProgramLines(self):
 
-    if Es_errorMessage != EMPTY_STRING:
+        programEnd = PROGRAM_CODE_MEMORY_START + len(self.programLineNumbers)
 
-        subroutine = "Ready"
+        for lineSlot in range(PROGRAM_CODE_MEMORY_START, programEnd):
 
-        return
+            if self.programTokens[lineSlot] is None:
 
-    if Ds_statementLabel != "THEN":
+                self.ReadMappedLine(lineSlot)
 
-        ErrorMessage(ERROR_CODE_THEN_EXPECTED, ERROR_MESSAGE_THEN_EXPECTED)
+        return list(zip(self.programCode[PROGRAM_CODE_MEMORY_START:programEnd], self.programTokens[PROGRAM_CODE_MEMORY_START:programEnd]))
 
-        subroutine = "Ready"
 
-    else:
+    def StoreProgramLines(self, programLines):
 
-        subroutine = "RunCommandInterpreter"
+        # replaces the stored program with (line text, line tokens)
+        # already in line number order
+        if len(programLines) > self.programLineLimit:
 
+            self.ErrorMessage(ERROR_CODE_MEMORY_OVERFLOW, ERROR_MESSAGE_MEMORY_OVERFLOW)
 
-def TinyBasic_Rem():
+            programLines = programLines[:self.programLineLimit]
 
-    global C_characterPointer, subroutine
-    global Bs_stringData
+        del self.programCode[PROGRAM_CODE_MEMORY_START:]
 
-    Bs_stringData = programCode[L_programCodeMemoryPointer]
+        del self.programTokens[PROGRAM_CODE_MEMORY_START:]
 
-    C_characterPointer = len(Bs_stringData)  # + 1
+        self.programLineNumbers = []
 
-    subroutine = "FinishStatement"
+        self.programMemoryUsed = 0
 
+        self.bytecodeValid = False
 
-def TinyBasic_Input():
+        self.expressionCache.clear()
 
-    global N_numericData, subroutine
+        del self.gosubStack[:]
 
-    GetVariable()
+        for lineText, lineTokens in programLines:
 
-    if Es_errorMessage != EMPTY_STRING:
+            self.programCode.append(lineText)
 
-        subroutine = "Ready"
+            self.programTokens.append(lineTokens)
 
-        return
+            # first token of a stored line is its line number
+            self.programLineNumbers.append(lineTokens[0][1])
 
-    N_numericData = input()
+            self.programMemoryUsed = self.programMemoryUsed + LineMemory(lineText, lineTokens)
 
-    A_processorStack.insert(V_variableStackMemoryPointer, int(N_numericData))
+        # end of program
+        self.programCode.append(EMPTY_STRING)
 
-    subroutine = "FinishStatement"
+        self.programTokens.append(None)
 
 
-def TinyBasic_Print():
+    def GetExpression(self):
 
-    global C_characterPointer, subroutine
-    global Bs_stringData
+        self.S_processorStackPointer = VARIABLE_STACK_MEMORY_TOP  # ACCUMULATOR_MEMORY_START
 
-    SkipSpace()
+        self.A_processorStack[self.S_processorStackPointer] = 0
 
-    GetCharacter()
+        # expressions in stored lines are compiled to postfix the first
+        # time they run, the workspace changes with every command
+        if self.L_programCodeMemoryPointer != PROGRAM_CODE_MEMORY_WORKSPACE:
 
-    if Cs_character == CHR_DOUBLE_QUOTE:
+            expressionKey = (self.L_programCodeMemoryPointer, self.C_tokenPointer)
 
-        Bs_stringData = EMPTY_STRING
+            cachedExpression = self.expressionCache.get(expressionKey)
 
-        subroutine = "NextCharacter"
+            if cachedExpression is None:
 
-        return
+                cachedExpression = self.expressionCache[expressionKey] = self.CompileCachedExpression()
 
-    else:
+            expression, endTokenPointer = cachedExpression
 
-        GetExpression()
+            if expression is not None:
 
-        # if E$!="" GOTO _Ready
-        if Es_errorMessage != EMPTY_STRING:
+                self.N_numericData = self.EvaluateExpression(expression)
 
-            subroutine = "Ready"
+                self.C_tokenPointer = endTokenPointer
 
-            return
+                self.GetToken()
 
-        print(N_numericData)
+                return
 
-    SkipSpace()
+        self.BoolExpression()
 
-    GetCharacter()
+        self.N_numericData = self.A_processorStack[self.S_processorStackPointer]
 
-    # if C$="," INC C : GOTO _Print
-    if Cs_character == COLON:
 
-        C_characterPointer = C_characterPointer + 1
+    def CompileCachedExpression(self):
 
-        subroutine = "Print"
+        # (instruction, operand) pairs for EvaluateExpression, operand is
+        # the operator function for binary operators
+        code = []
 
-        return
+        endTokenPointer = self.CompileBool(code, self.programTokens[self.L_programCodeMemoryPointer], self.C_tokenPointer)
 
-    SkipSpace()
+        # errors are reported by BoolExpression when the line runs
+        if endTokenPointer < 0:
 
-    GetCharacter()
+            return INTERPRETED_EXPRESSION
 
-    # if C$!=";" THEN
-    if Cs_character != SEMI_COLON:
+        # so is running out of math stack, counted before folding
+        # as BoolExpression pushes every operand
+        stackDepth = 0
 
-        print()
+        codePosition = 0
 
-    else:
+        while codePosition < len(code):
 
-        C_characterPointer = C_characterPointer + 1
+            if (code[codePosition] == BC_PUSH_VARIABLE) or (code[codePosition] == BC_PUSH_NUMBER):
 
-    subroutine = "FinishStatement"
+                stackDepth = stackDepth + 1
 
+                if stackDepth > MATH_STACK_DEPTH:
 
-def NextCharacter():
+                    return INTERPRETED_EXPRESSION
 
-    global Cs_character, C_characterPointer, subroutine
-    global Bs_stringData
+                codePosition = codePosition + 2
 
-    C_characterPointer = C_characterPointer + 1
+            else:
 
-    Cs_character = As_programCodeWorkspace[C_characterPointer]
+                stackDepth = stackDepth - 1
 
-    if Cs_character == CHR_END_OF_LINE:
+                codePosition = codePosition + 1
 
-        ErrorMessage(ERROR_CODE_MISSING_DOUBLE_QUOTE, ERROR_MESSAGE_MISSING_DOUBLE_QUOTE)
+        code = FoldExpression(code)
 
-        subroutine = "Ready"
+        expression = []
 
-        return
+        codePosition = 0
 
-    else:
+        while codePosition < len(code):
 
-        # if C$!=G$ THEN
-        if Cs_character != CHR_DOUBLE_QUOTE:
+            instruction = code[codePosition]
 
-            Bs_stringData = Bs_stringData + Cs_character
+            if (instruction == BC_PUSH_VARIABLE) or (instruction == BC_PUSH_NUMBER):
 
-            # GOTO _NextChar
-            subroutine = "NextCharacter"
+                expression.append((instruction, code[codePosition + 1]))
 
-            return
+                codePosition = codePosition + 2
 
-    C_characterPointer = C_characterPointer + 1
+            else:
 
-    Cs_character = As_programCodeWorkspace[C_characterPointer]
+                expression.append((instruction, EXPRESSION_OPERATIONS.get(instruction)))
 
-    # if C$=G$ THEN
-    if Cs_character == CHR_DOUBLE_QUOTE:
+                codePosition = codePosition + 1
 
-        Bs_stringData = Bs_stringData + Cs_character
+        return expression, endTokenPointer
 
-        # GOTO _NextChar
-        subroutine = "NextCharacter"
 
-        return
+    def EvaluateExpression(self, expression):
 
-    print(Bs_stringData)
+        variableStore = self.variables
 
+        stack = []
 
-def TinyBasic_List():
+        push = stack.append
 
-    global B, F, T, C_characterPointer, L_programCodeMemoryPointer, subroutine
-    global Es_errorMessage
+        pop = stack.pop
 
-    GetNumber()
-    # N_numericData = FN_GetNumber
+        for instruction, operand in expression:
 
-    T = N_numericData
+            if instruction == BC_PUSH_VARIABLE:
 
-    K = L_programCodeMemoryPointer
+                push(variableStore[operand])
 
-    J = C_characterPointer
+            elif instruction == BC_PUSH_NUMBER:
 
-    if T == 0:
+                push(operand)
 
-        GetNextLabel()
+            elif operand is not None:
 
-        if Es_errorMessage == EMPTY_STRING:
+                value = pop()
 
-            if Ds_statementLabel == "PAUSE":
+                stack[-1] = operand(stack[-1], value)
 
-                J = C_characterPointer
+            else:
 
-        Es_errorMessage = EMPTY_STRING
+                value = pop()
 
-    for L_programCodeMemoryPointer in range(PROGRAM_CODE_MEMORY_START, PROGRAM_CODE_MEMORY_TOP):
+                # as in TinyBasic_Divide, the dividend is left on the stack
+                if value == 0:
 
-        C_characterPointer = 0
+                    self.ErrorMessage(ERROR_CODE_DIVISION_BY_ZERO, ERROR_MESSAGE_DIVISION_BY_ZERO)
 
-        GetNumber()
-        # N_numericData = FN_GetNumber
+                elif instruction == BC_DIVIDE:
 
-        F = (T == 0) or (N_numericData == T)
+                    stack[-1] = stack[-1] / value
 
-        if F:
+                    if INTEGER_ARITHMETIC:
 
-            if As_programCodeWorkspace != EMPTY_STRING:
+                        stack[-1] = int(stack[-1])
 
-                lineNumberLength = len(str(N_numericData))
+                else:
 
-                lineNumberPadding = LINE_NUMBER_PADDING[:5 - lineNumberLength]
+                    stack[-1] = stack[-1] % value
 
-                # removes end of line character from string
-                print(lineNumberPadding + As_programCodeWorkspace[:len(As_programCodeWorkspace) - 1])
+        return stack[-1]
 
-                """
-                if Ds_statementLabel == "PAUSE":
 
-                    B = (L_programCodeMemoryPointer - PROGRAM_CODE_MEMORY_WORKSPACE) % 10
+    def BoolExpression(self):
 
-                    if B == 0:
+        self.AdditionSubtractionExpression()
 
-                        # print("Pause...")
+        self.GetToken()
 
-                        P = input("...")
-                """
+        # (NextBool)
 
-    L_programCodeMemoryPointer = K
+        canLoop = True
 
-    C_characterPointer = J
+        # REPEAT
+        while canLoop:
 
-    subroutine = "FinishStatement"
+            if self.Cs_character == OP_EQUALS:
 
+                self.TinyBasic_Equals()
 
-def TinyBasic_Run():
+            if self.Cs_character == OP_GREATER_THAN:
 
-    global L_programCodeMemoryPointer, C_characterPointer, subroutine
+                self.TinyBasic_Greater_Than()
 
-    # clear variable stack
-    for i in range(VARIABLE_STACK_MEMORY_START, VARIABLE_STACK_MEMORY_TOP):
+            if self.Cs_character == ">=":
 
-        A_processorStack.insert(i, 0)
+                self.TinyBasic_Greater_Than_Equal_To()
 
-    L_programCodeMemoryPointer = PROGRAM_CODE_MEMORY_START
+            if self.Cs_character == OP_LESS_THAN:
 
-    C_characterPointer = 0
+                self.TinyBasic_Less_Than()
 
-    # Bs_stringData$ = programCode$(L_programCodeMemoryPointer)
+            if self.Cs_character == "<=":
 
-    if programCode[L_programCodeMemoryPointer] == EMPTY_STRING:
+                self.TinyBasic_Less_Than_Equal_To()
 
-        subroutine = "Ready"
+            if self.Cs_character == "<>":
 
-    else:
+                self.TinyBasic_Not_Equal_To()
 
-        subroutine = "Engage"
+            self.GetToken()
 
+            self.F = self.Cs_character in RELATIONAL_OPERATORS
 
-def TinyBasic_Goto():
+            if not self.F:
 
-    global T, L_programCodeMemoryPointer, C_characterPointer, subroutine
+                canLoop = False
 
-    GetExpression()
+        # UNTIL F = FALSE
 
-    if Es_errorMessage != EMPTY_STRING:
 
-        subroutine = "Ready"
+    def AdditionSubtractionExpression(self):
 
-        return
+        self.MultiplyDivideModulusExpression()
 
-    if E_errorLineNumber >= N_numericData:
+        self.GetToken()
 
-        L_programCodeMemoryPointer = PROGRAM_CODE_MEMORY_START
+        # (NextAdditionSubraction)
 
-    C_characterPointer = 0
+        canLoop = True
 
-    T = N_numericData
+        # REPEAT
+        while canLoop:
 
-    GotoLineNumber()
+            if self.Cs_character == OP_PLUS:
 
+                self.TinyBasic_Add()
 
-def GotoLineNumber():
+            if self.Cs_character == OP_MINUS:
 
-    global C_characterPointer, L_programCodeMemoryPointer, E_errorLineNumber, subroutine
+                self.TinyBasic_Subtract()
 
-    while True:
+            self.GetToken()
+
+            self.F = (self.Cs_character == OP_PLUS) or (self.Cs_character == OP_MINUS)
+
+            if not self.F:
+
+                canLoop = False
+
+        # UNTIL F = FALSE
+
+
+    def MultiplyDivideModulusExpression(self):
+
+        self.GroupExpression()
+
+        self.GetToken()
+
+        # (NextMultiplyDivideModulus)
+
+        canLoop = True
+
+        # REPEAT
+        while canLoop:
 
-        if L_programCodeMemoryPointer > PROGRAM_CODE_MEMORY_TOP:
+            if self.Cs_character == OP_MULTIPLY:
 
-            ErrorMessage(ERROR_CODE_LINE_NOT_FOUND, ERROR_MESSAGE_LINE_NOT_FOUND)
+                self.TinyBasic_Multiply()
 
-            subroutine = "Ready"
+            if self.Cs_character == OP_DIVIDE:
+
+                self.TinyBasic_Divide()
+
+            if self.Cs_character == OP_MODULUS:
+
+                self.TinyBasic_Modulus()
+
+            self.GetToken()
+
+            self.F = (self.Cs_character == OP_MULTIPLY) or (self.Cs_character == OP_DIVIDE) or (self.Cs_character == OP_MODULUS)
+
+            if not self.F:
+
+                canLoop = False
+
+        # UNTIL F = FALSE
+
+
+    def GroupExpression(self):
+
+        TICKS = 0
+        TICKSPERSEC = 0
+
+        # no room left on the math stack
+        if self.S_processorStackPointer >= PROCESSOR_STACK_MEMORY_TOP - 1:
+
+            self.ErrorMessage(ERROR_CODE_MEMORY_OVERFLOW, ERROR_MESSAGE_MEMORY_OVERFLOW)
 
             return
 
-        GetNumber()
+        self.GetToken()
+
+        if self.Cs_character == OP_LEFT_PARENTHESIS:
+
+            self.C_tokenPointer = self.C_tokenPointer + 1
+
+            self.BoolExpression()
 
-        if N_numericData == T:
+            self.GetToken()
 
-            E_errorLineNumber = N_numericData
+            if self.Cs_character != OP_RIGHT_PARENTHESIS:
 
-            subroutine = "RunCommandInterpreter"
+                self.ErrorMessage(ERROR_CODE_MISSING_RIGHT_PARENTHESIS, ERROR_MESSAGE_MISSING_RIGHT_PARENTHESIS)
+
+                return
+
+            self.C_tokenPointer = self.C_tokenPointer + 1
 
             return
 
-        L_programCodeMemoryPointer = L_programCodeMemoryPointer + 1
+        if self.Cs_character == CHR_END_OF_LINE:
 
-        C_characterPointer = 0
+            self.ErrorMessage(ERROR_CODE_INVALID_FACTOR, ERROR_MESSAGE_INVALID_FACTOR)
 
+            return
 
-def TinyBasic_Gosub():
+        # ELSE
+        self.F = (self.tokenType != TOKEN_NUMBER) and (self.Cs_character != OP_MINUS)
 
-    global gosubStackMemoryPointer, subroutine
+        if not self.F:
 
-    if gosubStackMemoryPointer < GOSUB_STACK_MEMORY_TOP:
+            self.GetNumber()
 
-        gosubStackMemoryPointer = gosubStackMemoryPointer + 1
+            if self.Es_errorMessage != EMPTY_STRING:
 
-        gosubLineNumberStack.insert(gosubStackMemoryPointer, L_programCodeMemoryPointer)
+                return
 
-        returnLineNumberStack.insert(gosubStackMemoryPointer, L_programCodeMemoryPointer + 1)
+            self.S_processorStackPointer = self.S_processorStackPointer + 1
 
-        TinyBasic_Goto()
+            self.A_processorStack[self.S_processorStackPointer] = self.N_numericData
 
-    else:
+        else:
 
-        ErrorMessage(ERROR_CODE_GOSUB_STACK_OVERFLOW, ERROR_MESSAGE_GOSUB_STACK_OVERFLOW)
+            self.GetStatementLabel()
 
-        subroutine = "Ready"
+            if self.Es_errorMessage != EMPTY_STRING:
 
+                return
 
-def TinyBasic_Return():
+            if self.labelType == TOKEN_VARIABLE:
 
-    global L_programCodeMemoryPointer, C_characterPointer, E_errorLineNumber, subroutine
+                self.ReturnVariable()
 
-    gosubStackPointer = 0
+                self.S_processorStackPointer = self.S_processorStackPointer + 1
 
-    if gosubStackMemoryPointer < 0:
+                self.A_processorStack[self.S_processorStackPointer] = self.variables[self.V_variableStackMemoryPointer]
 
-        ErrorMessage(ERROR_CODE_NO_MATCHING_GOSUB, ERROR_MESSAGE_NO_MATCHING_GOSUB)
+            else:
 
-        subroutine = "Ready"
+                if self.Ds_statementLabel == "ticks":
 
-        return
+                    self.S_processorStackPointer = self.S_processorStackPointer + 1
 
-    for gosubStackPointer in range(gosubStackMemoryPointer):
+                    self.A_processorStack[self.S_processorStackPointer] = TICKS
 
-        L_programCodeMemoryPointer = gosubLineNumberStack[gosubStackPointer]
+                    return
 
-    while True:
+                if self.Ds_statementLabel == "tickspersec":
+
+                    self.S_processorStackPointer = self.S_processorStackPointer + 1
+
+                    self.A_processorStack[self.S_processorStackPointer] = TICKSPERSEC
+
+                    return
+
+                self.ErrorMessage(ERROR_CODE_FUNCTION_EXPECTED, ERROR_MESSAGE_FUNCTION_EXPECTED)
+
+
+    def GetNumber(self):
+
+        self.GetToken()
+
+        # a minus sign not followed by a number
+        if self.Cs_character == OP_MINUS:
+
+            self.ErrorMessage(ERROR_CODE_INVALID_NUMBER, ERROR_MESSAGE_INVALID_NUMBER)
+
+            return
+
+        if self.tokenType != TOKEN_NUMBER:
+
+            self.N_numericData = 0
+
+            return
+
+        if self.tokenValue is None:
+
+            self.ErrorMessage(ERROR_CODE_INVALID_NUMBER, ERROR_MESSAGE_INVALID_NUMBER)
+
+            return
+
+        self.N_numericData = self.tokenValue
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.GetToken()
+
+
+    def GetVariable(self):
 
-        if L_programCodeMemoryPointer == PROGRAM_CODE_MEMORY_TOP + 1:
+        self.GetStatementLabel()
 
-            # ErrorMessage("Line not found")
-            ErrorMessage(ERROR_CODE_LINE_NOT_FOUND, ERROR_MESSAGE_LINE_NOT_FOUND)
+        if self.Es_errorMessage != EMPTY_STRING:
 
-            subroutine = "Ready"
+            return
+
+        self.ReturnVariable()
+
+
+    def ReturnVariable(self):
+
+        if self.labelType == TOKEN_VARIABLE:
+
+            # [0 - 25]
+            self.V_variableStackMemoryPointer = self.labelValue
+
+        else:
+
+            self.ErrorMessage(ERROR_CODE_VARIABLE_EXPECTED, ERROR_MESSAGE_VARIABLE_EXPECTED)
+
+
+    def GetStatementLabel(self):
+
+        self.GetToken()
+
+        self.Ds_statementLabel = EMPTY_STRING
+
+        self.labelType = self.tokenType
+
+        self.labelValue = self.tokenValue
+
+        if self.tokenType == TOKEN_KEYWORD:
+
+            self.Ds_statementLabel = KEYWORD_NAMES[self.tokenValue]
+
+        elif self.tokenType == TOKEN_LABEL:
+
+            self.Ds_statementLabel = self.tokenValue
+
+        elif self.tokenType != TOKEN_VARIABLE:
+
+            self.labelType = TOKEN_END_OF_LINE
+
+            self.ErrorMessage(ERROR_CODE_INVALID_LABEL, ERROR_MESSAGE_INVALID_LABEL)
+
+            return
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+
+    def GetToken(self):
+
+        self.tokenType, self.tokenValue, self.Cs_character = self.programTokens[self.L_programCodeMemoryPointer][self.C_tokenPointer]
+
+
+    # tiny basic commands
+    def TinyBasic_If(self):
+
+        self.GetExpression()
+
+        if self.Es_errorMessage != EMPTY_STRING:
+
+            self.subroutine = "Ready"
 
             return
 
-        GetNumber()
-        # N_numericData = FN_GetNumber
+        # if N < 1 THEN
+        if self.N_numericData == 0:
+
+            # skip to the end of line token
+            self.C_tokenPointer = len(self.programTokens[self.L_programCodeMemoryPointer]) - 1
+
+            self.subroutine = "FinishStatement"
+
+            return
 
-        if L_programCodeMemoryPointer == returnLineNumberStack[gosubStackPointer]:
+        self.GetStatementLabel()
 
-            E_errorLineNumber = N_numericData
+        if self.Es_errorMessage != EMPTY_STRING:
 
-            subroutine = "RunCommandInterpreter"
+            self.subroutine = "Ready"
 
             return
 
-        L_programCodeMemoryPointer = L_programCodeMemoryPointer + 1
+        if self.Ds_statementLabel != "THEN":
+
+            self.ErrorMessage(ERROR_CODE_THEN_EXPECTED, ERROR_MESSAGE_THEN_EXPECTED)
+
+            self.subroutine = "Ready"
+
+        else:
+
+            self.subroutine = "RunCommandInterpreter"
+
+
+    def TinyBasic_Rem(self):
+
+        # skip to the end of line token
+        self.C_tokenPointer = len(self.programTokens[self.L_programCodeMemoryPointer]) - 1
+
+        self.subroutine = "FinishStatement"
+
+
+    def TinyBasic_Input(self):
 
-        C_characterPointer = 0
+        self.GetVariable()
 
+        if self.Es_errorMessage != EMPTY_STRING:
 
-def TinyBasic_New():
+            self.subroutine = "Ready"
 
-    global subroutine
+            return
+
+        self.N_numericData = ParseInputNumber(self.ReadInput(EMPTY_STRING))
 
-    WarmStart()
+        if self.N_numericData is None:
 
-    subroutine = "Ready"
+            self.ErrorMessage(ERROR_CODE_INVALID_NUMBER, ERROR_MESSAGE_INVALID_NUMBER)
 
+            self.subroutine = "Ready"
 
-def TinyBasic_Cls():
-    """
-    global subroutine
+            return
 
-    CLS
+        self.StoreVariable(self.V_variableStackMemoryPointer, self.N_numericData)
 
-    subroutine = "FinishStatement"
-    """
-    
+        if self.Es_errorMessage != EMPTY_STRING:
 
-def TinyBasic_Help():
+            self.subroutine = "Ready"
 
-    global subroutine
+            return
 
-    for i in range(COMMAND_HELP_MEMORY):
+        self.subroutine = "FinishStatement"
 
-        print(commandHelp[i])
 
-    subroutine = "FinishStatement"
+    def TinyBasic_Print(self):
 
+        self.GetToken()
 
-def TinyBasic_Mem():
+        # print on its own outputs a blank line
+        if (self.Cs_character == CHR_END_OF_LINE) or (self.Cs_character == COLON):
 
-    global subroutine
+            self.WriteOutput(CHR_END_OF_LINE)
 
-    GetFreeMemory()
+            self.subroutine = "FinishStatement"
 
-    print(freeMemoryMessage)
+            return
 
-    subroutine = "FinishStatement"
+        canLoop = True
 
+        while canLoop:
 
-def TinyBasic_End():
+            self.GetToken()
 
-    global subroutine
+            if self.tokenType == TOKEN_STRING:
 
-    subroutine = "Ready"
+                if self.tokenValue is None:
 
+                    self.ErrorMessage(ERROR_CODE_MISSING_DOUBLE_QUOTE, ERROR_MESSAGE_MISSING_DOUBLE_QUOTE)
 
-def TinyBasic_Stop():
+                    self.subroutine = "Ready"
 
-    global subroutine
+                    return
 
-    ErrorMessage(ERROR_CODE_STOP, ERROR_MESSAGE_STOP)
+                self.WriteOutput(self.tokenValue)
 
-    subroutine = "Ready"
+                self.C_tokenPointer = self.C_tokenPointer + 1
 
+            else:
 
-def TinyBasic_Save():
-    """
-    GetExpression()
-    if Es_errorMessage$ != EMPTY_STRING THEN
-    subroutine = "Ready"
-    RETURN
-    ENDIF
-    As_programCodeWorkspace$="tinyBas"+STR$(N_numericData,0)
-    A=FALSE
-    # OPEN As_programCodeWorkspace$ FOR OUTPUT AS #1
-    FOR I=27 TO 125
-    Bs_stringData$=programCode$(I)
-    if Bs_stringData$!="" THEN
-    print #1,Bs_stringData$
-    A=TRUE
-    ENDIF
-    NEXT
-    CLOSE #1
-    if A=FALSE THEN
-    # KILL As_programCodeWorkspace$
-    ENDIF
-    subroutine = "FinishStatement"
-    RETURN
-    """
+                self.GetExpression()
 
+                # if E$!="" GOTO _Ready
+                if self.Es_errorMessage != EMPTY_STRING:
 
-def TinyBasic_Load():
-    """
-    GetExpression)
-    if Es_errorMessage$ != EMPTY_STRING THEN
-    subroutine = "Ready"
-    RETURN
-    ENDIF
-    As_programCodeWorkspace$ = "tinyBas" + STR$(N_numericData)
-    # B=FILE_EXISTS(As_programCodeWorkspace)
-    if B=FALSE THEN
-    Es_errorMessage$="File "+As_programCodeWorkspace$+" not found"
-    subroutine = "Ready"
-    RETURN
-    ENDIF
-    # OPEN As_programCodeWorkspace$ FOR INPUT AS #1
-    B=FALSE
-    I = PROGRAM_CODE_MEMORY_START
-    WHILE B=FALSE
-    B=EOF(#1)
-        INPUT #1,Bs_stringData$
-    programCode$(I)=Bs_stringData$
-    INC I
-    #ENDWHILE
-    CLOSE #1
-    WHILE I <= PROGRAM_CODE_MEMORY_TOP
-    programCode$(I) = ""
-    I = I + 1
-    #ENDWHILE
-    if E_errorLineNumber = 0 THEN
-    subroutine = "FinishStatement"
-    RETURN
-    ENDIF
-    subroutine = "Ready"
-    RETURN
-    """
+                    self.subroutine = "Ready"
 
+                    return
 
-def TinyBasic_Let():
+                self.WriteOutput(FormatNumber(self.N_numericData))
 
-    global subroutine
+            self.GetToken()
 
-    GetStatementLabel()
+            # if C$="," INC C : GOTO _Print
+            if self.Cs_character == COMMA:
 
-    if Es_errorMessage != EMPTY_STRING:
+                self.C_tokenPointer = self.C_tokenPointer + 1
 
-        subroutine = "Ready"
+            else:
 
+                canLoop = False
 
-# tiny basic math/conditional operators
-def TinyBasic_Equals():
+        # if C$!=";" THEN
+        if self.Cs_character != SEMI_COLON:
 
-    global C_characterPointer, S_processorStackPointer
+            self.WriteOutput(CHR_END_OF_LINE)
 
-    C_characterPointer = C_characterPointer + 1
+        else:
 
-    AdditionSubtractionExpression()
+            self.C_tokenPointer = self.C_tokenPointer + 1
 
-    B_stackpointer = S_processorStackPointer - 1
+        self.subroutine = "FinishStatement"
 
-    A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] == A_processorStack[S_processorStackPointer])
 
-    S_processorStackPointer = S_processorStackPointer - 1
+    def TinyBasic_List(self):
 
+        self.GetNumber()
 
-def TinyBasic_Greater_Than():
+        if self.Es_errorMessage != EMPTY_STRING:
 
-    global C_characterPointer, S_processorStackPointer
+            self.subroutine = "Ready"
 
-    C_characterPointer = C_characterPointer + 1
+            return
 
-    GetCharacter()
+        self.T = self.N_numericData
 
-    if Cs_character == OP_EQUALS:
+        if self.T == 0:
 
-        TinyBasic_Greater_Than_Equal_To()
+            self.GetToken()
 
-        return
+            if (self.tokenType == TOKEN_KEYWORD) and (self.tokenValue == KEYWORD_PAUSE):
 
-    AdditionSubtractionExpression()
+                self.C_tokenPointer = self.C_tokenPointer + 1
 
-    B_stackpointer = S_processorStackPointer - 1
+        for lineIndex in range(len(self.programLineNumbers)):
 
-    A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] > A_processorStack[S_processorStackPointer])
+            F = (self.T == 0) or (self.programLineNumbers[lineIndex] == self.T)
 
-    S_processorStackPointer = S_processorStackPointer - 1
+            if F:
 
+                if self.programTokens[PROGRAM_CODE_MEMORY_START + lineIndex] is None:
 
-def TinyBasic_Greater_Than_Equal_To():
+                    self.ReadMappedLine(PROGRAM_CODE_MEMORY_START + lineIndex)
 
-    global C_characterPointer, S_processorStackPointer
+                lineText = self.programCode[PROGRAM_CODE_MEMORY_START + lineIndex]
 
-    C_characterPointer = C_characterPointer + 1
+                lineNumberLength = len(str(self.programLineNumbers[lineIndex]))
 
-    AdditionSubtractionExpression()
+                lineNumberPadding = LINE_NUMBER_PADDING[:5 - lineNumberLength]
 
-    B_stackpointer = S_processorStackPointer - 1
+                # removes end of line character from string
+                self.WriteOutput(lineNumberPadding + lineText[:len(lineText) - 1] + CHR_END_OF_LINE)
 
-    A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] >= A_processorStack[S_processorStackPointer])
+        self.subroutine = "FinishStatement"
 
-    S_processorStackPointer = S_processorStackPointer - 1
 
+    def TinyBasic_Run(self):
 
-def TinyBasic_Less_Than():
+        del self.gosubStack[:]
 
-    global C_characterPointer, S_processorStackPointer
+        self.ClearVariables()
 
-    C_characterPointer = C_characterPointer + 1
+        self.L_programCodeMemoryPointer = PROGRAM_CODE_MEMORY_START
 
-    GetCharacter()
+        self.C_tokenPointer = 0
 
-    if Cs_character == OP_EQUALS:
+        # Bs_stringData$ = programCode$(L_programCodeMemoryPointer)
 
-        TinyBasic_Less_Than_Equal_To()
+        if self.programCode[self.L_programCodeMemoryPointer] == EMPTY_STRING:
 
-        return
+            self.subroutine = "Ready"
 
-    if Cs_character == OP_GREATER_THAN:
+            return
 
-        TinyBasic_Not_Equal_To()
+        if self.profiling:
 
-        return
+            self.lineProfile = {}
 
-    AdditionSubtractionExpression()
+        # the bytecode engine doesn't see line changes, so it can't be profiled
+        if self.useBytecodeEngine and not self.profiling:
 
-    B_stackpointer = S_processorStackPointer - 1
+            if not self.bytecodeValid:
 
-    A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] < A_processorStack[S_processorStackPointer])
+                self.CompileProgram()
 
-    S_processorStackPointer = S_processorStackPointer - 1
+            # programs the compiler can't handle fall back to the interpreter
+            if self.bytecode:
 
+                self.RunBytecode()
 
-def TinyBasic_Less_Than_Equal_To():
+                # its frames are code positions, which mean nothing
+                # to a RETURN typed at the prompt
+                del self.gosubStack[:]
 
-    global C_characterPointer, S_processorStackPointer
+                self.subroutine = "Ready"
 
-    C_characterPointer = C_characterPointer + 1
-    
-    AdditionSubtractionExpression()
-    
-    B_stackpointer = S_processorStackPointer - 1
-    
-    A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] <= A_processorStack[S_processorStackPointer])
-    
-    S_processorStackPointer = S_processorStackPointer - 1
+                return
 
+        self.subroutine = "Engage"
 
-def TinyBasic_Not_Equal_To():
 
-    global C_characterPointer, S_processorStackPointer
+    def TinyBasic_Goto(self):
 
-    C_characterPointer = C_characterPointer + 1
-    
-    AdditionSubtractionExpression()
-    
-    B_stackpointer = S_processorStackPointer - 1
-    
-    A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] != A_processorStack[S_processorStackPointer])
-    
-    S_processorStackPointer = S_processorStackPointer - 1
+        self.GetExpression()
 
+        if self.Es_errorMessage != EMPTY_STRING:
 
-def TinyBasic_Add():
+            self.subroutine = "Ready"
 
-    global C_characterPointer, S_processorStackPointer
+            return
 
-    C_characterPointer = C_characterPointer + 1
-    
-    MultiplyDivideModulusExpression()
-    
-    B_stackpointer = S_processorStackPointer - 1
-    
-    A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] + A_processorStack[S_processorStackPointer])
-    
-    S_processorStackPointer = S_processorStackPointer - 1
+        self.T = self.N_numericData
 
+        self.GotoLineNumber()
 
-def TinyBasic_Subtract():
 
-    global C_characterPointer, S_processorStackPointer
+    def GotoLineNumber(self):
 
-    C_characterPointer = C_characterPointer + 1
-    
-    MultiplyDivideModulusExpression()
-    
-    B_stackpointer = S_processorStackPointer - 1
-    
-    A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] - A_processorStack[S_processorStackPointer])
-    
-    S_processorStackPointer = S_processorStackPointer - 1
+        lineSlot = self.FindLineNumber(self.T)
 
+        if lineSlot == 0:
 
-def TinyBasic_Multiply():
+            self.ErrorMessage(ERROR_CODE_LINE_NOT_FOUND, ERROR_MESSAGE_LINE_NOT_FOUND)
 
-    global C_characterPointer, S_processorStackPointer
+            self.subroutine = "Ready"
 
-    C_characterPointer = C_characterPointer + 1
-    
-    GroupExpression()
-    
-    B_stackpointer = S_processorStackPointer - 1
-    
-    A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] * A_processorStack[S_processorStackPointer])
-    
-    S_processorStackPointer = S_processorStackPointer - 1
+            return
 
+        self.L_programCodeMemoryPointer = lineSlot
 
-def TinyBasic_Divide():
+        if self.programTokens[lineSlot] is None:
 
-    global C_characterPointer, S_processorStackPointer
+            self.ReadMappedLine(lineSlot)
 
-    C_characterPointer = C_characterPointer + 1
-    
-    GroupExpression()
-    
-    B_stackpointer = A_processorStack[S_processorStackPointer]
-    
-    if B_stackpointer == 0:
+        # step over the line number
+        self.C_tokenPointer = LINE_BODY_TOKEN
 
-        ErrorMessage(ERROR_CODE_DIVISION_BY_ZERO, ERROR_MESSAGE_DIVISION_BY_ZERO)
+        self.E_errorLineNumber = self.T
 
-        S_processorStackPointer = S_processorStackPointer - 1
+        if self.profiling:
 
-        return
-    
-    else:
+            self.ProfileLine(self.T)
 
-        B_stackpointer = S_processorStackPointer - 1
+        self.subroutine = "RunCommandInterpreter"
 
-        A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] / A_processorStack[S_processorStackPointer])
 
-        S_processorStackPointer = S_processorStackPointer - 1
+    def TinyBasic_Gosub(self):
 
+        if len(self.gosubStack) >= self.gosubStackLimit:
 
-def TinyBasic_Modulus():
+            self.ErrorMessage(ERROR_CODE_GOSUB_STACK_OVERFLOW, ERROR_MESSAGE_GOSUB_STACK_OVERFLOW)
 
-    global C_characterPointer, S_processorStackPointer
+            self.subroutine = "Ready"
 
-    C_characterPointer = C_characterPointer + 1
-    
-    GroupExpression()
-    
-    B_stackpointer = A_processorStack[S_processorStackPointer]
-    
-    if B_stackpointer == 0:
+            return
 
-        ErrorMessage(ERROR_CODE_DIVISION_BY_ZERO, ERROR_MESSAGE_DIVISION_BY_ZERO)
+        self.GetExpression()
 
-        S_processorStackPointer = S_processorStackPointer - 1
+        if self.Es_errorMessage != EMPTY_STRING:
 
-        return
-    
-    else:
+            self.subroutine = "Ready"
 
-        B_stackpointer = S_processorStackPointer - 1
+            return
 
-        A_processorStack.insert(B_stackpointer, A_processorStack[B_stackpointer] % A_processorStack[S_processorStackPointer])
+        # RETURN carries on from the end of this statement
+        self.gosubStack.append((self.L_programCodeMemoryPointer, self.C_tokenPointer))
 
-        S_processorStackPointer = S_processorStackPointer - 1
+        self.T = self.N_numericData
 
+        self.GotoLineNumber()
 
-def ConvertToUppercase(textstringToConvert):
 
-    global asciiCode
+    def TinyBasic_Return(self):
 
-    stringPointer = 0
+        if not self.gosubStack:
 
-    convertedString = ""
+            self.ErrorMessage(ERROR_CODE_NO_MATCHING_GOSUB, ERROR_MESSAGE_NO_MATCHING_GOSUB)
 
-    while stringPointer < len(textstringToConvert):
+            self.subroutine = "Ready"
 
-        # get character to work with into
-        # temporary variable, saves code
-        character = textstringToConvert[stringPointer]
+            return
 
-        # test character to see if lowercase
-        if (character >= "a") and (character <= "z"):
+        # back to the end of the gosub statement
+        self.L_programCodeMemoryPointer, self.C_tokenPointer = self.gosubStack.pop()
 
-            # it is, so convert it
-            # get code for character - offset 'A'
-            asciiCode = ord(character) - ASC_LOWERCASE_A
+        # a GOSUB typed at the prompt returns to the workspace
+        if self.L_programCodeMemoryPointer == PROGRAM_CODE_MEMORY_WORKSPACE:
 
-            # add value to offset for 'A'
-            convertedString = convertedString + chr(ASC_UPPERCASE_A + asciiCode)
+            self.E_errorLineNumber = 0
 
         else:
 
-            convertedString = convertedString + character
+            self.E_errorLineNumber = self.programLineNumbers[self.L_programCodeMemoryPointer - PROGRAM_CODE_MEMORY_START]
 
-        stringPointer = stringPointer + 1
+            if self.profiling:
 
-    return convertedString
+                self.ProfileLine(self.E_errorLineNumber)
 
+        self.subroutine = "FinishStatement"
 
-def ErrorMessage(code, message):
 
-    global errorCode, Es_errorMessage
+    def TinyBasic_Clear(self):
 
-    if Es_errorMessage == EMPTY_STRING:
+        self.ClearVariables()
 
-        errorCode = code
+        self.subroutine = "FinishStatement"
 
-        Es_errorMessage = message
 
+    def TinyBasic_Profile(self):
 
-def ErrorHandler():
+        self.GetToken()
 
-    global errorCode, Es_errorMessage
+        if (self.tokenType == TOKEN_LABEL) and (self.tokenValue == PROFILE_ON):
 
-    if Es_errorMessage != EMPTY_STRING:
+            self.EnableProfiling()
 
-        if E_errorLineNumber > 0 and errorCode == ERROR_CODE_STOP:
+            self.C_tokenPointer = self.C_tokenPointer + 1
 
-            Es_errorMessage = Es_errorMessage + " AT LINE " + str(E_errorLineNumber)
+        elif (self.tokenType == TOKEN_LABEL) and (self.tokenValue == PROFILE_OFF):
 
-            DisplayErrorMessage(Es_errorMessage)
+            self.DisableProfiling()
+
+            self.C_tokenPointer = self.C_tokenPointer + 1
+
+        elif (self.Cs_character == CHR_END_OF_LINE) or (self.Cs_character == COLON):
+
+            self.PrintProfile()
+
+        self.subroutine = "FinishStatement"
+
+
+    def TinyBasic_New(self):
+
+        self.WarmStart()
+
+        self.subroutine = "Ready"
+
+
+    def TinyBasic_Cls(self):
+        """
+        global subroutine
+
+        CLS
+
+        subroutine = "FinishStatement"
+        """
+
+        self.subroutine = "FinishStatement"
+
+
+    def TinyBasic_Help(self):
+
+        for i in range(COMMAND_HELP_MEMORY):
+
+            self.WriteOutput(self.commandHelp[i] + CHR_END_OF_LINE)
+
+        self.subroutine = "FinishStatement"
+
+
+    def TinyBasic_Mem(self):
+
+        memoryUsage = self.GetMemoryUsage()
+
+        self.GetTotalMemory()
+
+        self.WriteOutput(self.totalMemoryMessage + CHR_END_OF_LINE)
+
+        # where the used bytes are held
+        self.WriteOutput("    PROGRAM     " + str(memoryUsage.program).rjust(10) + CHR_END_OF_LINE)
+        self.WriteOutput("    VARIABLES   " + str(memoryUsage.variables).rjust(10) + CHR_END_OF_LINE)
+        self.WriteOutput("    MATH STACK  " + str(memoryUsage.mathStack).rjust(10) + CHR_END_OF_LINE)
+        self.WriteOutput("    GOSUB STACK " + str(memoryUsage.gosubStack).rjust(10) + CHR_END_OF_LINE)
+
+        self.GetFreeMemory()
+
+        self.WriteOutput(self.freeMemoryMessage + CHR_END_OF_LINE)
+
+        self.subroutine = "FinishStatement"
+
+
+    def TinyBasic_End(self):
+
+        self.subroutine = "Ready"
+
+
+    def TinyBasic_Stop(self):
+
+        self.ErrorMessage(ERROR_CODE_STOP, ERROR_MESSAGE_STOP)
+
+        self.subroutine = "Ready"
+
+
+    def TinyBasic_Save(self):
+
+        self.GetExpression()
+
+        if self.Es_errorMessage != EMPTY_STRING:
+
+            self.subroutine = "Ready"
+
+            return
+
+        self.fileName = PROGRAM_FILE_PREFIX + FormatNumber(self.N_numericData) + PROGRAM_FILE_EXTENSION
+
+        try:
+
+            # nothing to save removes the file
+            if not self.programLineNumbers:
+
+                if os.path.exists(self.fileName):
+
+                    os.remove(self.fileName)
+
+            else:
+
+                # reading every line also lets go of a mapped file,
+                # which may be the one being replaced
+                programLines = self.StoredProgramLines()
+
+                ReplaceFile(self.fileName, EMPTY_STRING.join([lineText for lineText, lineTokens in programLines]).encode())
+
+        except OSError:
+
+            self.ErrorMessage(ERROR_CODE_FILE_ERROR, ERROR_MESSAGE_FILE_ERROR)
+
+            self.subroutine = "Ready"
+
+            return
+
+        self.subroutine = "FinishStatement"
+
+
+    def TinyBasic_Load(self):
+
+        self.GetExpression()
+
+        if self.Es_errorMessage != EMPTY_STRING:
+
+            self.subroutine = "Ready"
 
             return
 
-        if E_errorLineNumber > 0:
+        self.fileName = PROGRAM_FILE_PREFIX + FormatNumber(self.N_numericData) + PROGRAM_FILE_EXTENSION
+
+        try:
+
+            with open(self.fileName, "rb") as programFile:
+
+                # an empty file can't be mapped
+                if os.fstat(programFile.fileno()).st_size == 0:
+
+                    programMapping = b""
+
+                else:
+
+                    programMapping = mmap.mmap(programFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        except FileNotFoundError:
+
+            self.ErrorMessage(ERROR_CODE_FILE_NOT_FOUND, ERROR_MESSAGE_FILE_NOT_FOUND)
+
+            self.subroutine = "Ready"
+
+            return
+
+        except OSError:
+
+            self.ErrorMessage(ERROR_CODE_FILE_ERROR, ERROR_MESSAGE_FILE_ERROR)
+
+            self.subroutine = "Ready"
+
+            return
+
+        # lines are only tokenized when they are first needed, so
+        # there is nothing for a program image to save here
+        self.MapProgramLines(programMapping)
+
+        # a program loading another one stops there
+        if (self.Es_errorMessage == EMPTY_STRING) and (self.L_programCodeMemoryPointer == PROGRAM_CODE_MEMORY_WORKSPACE):
+
+            self.subroutine = "FinishStatement"
+
+            return
+
+        self.subroutine = "Ready"
+
+
+    def TinyBasic_Let(self):
+
+        self.GetStatementLabel()
+
+        if self.Es_errorMessage != EMPTY_STRING:
+
+            self.subroutine = "Ready"
+
+            return
+
+        self.TinyBasic_Assignment()
+
+
+    # tiny basic math/conditional operators
+    def TinyBasic_Equals(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.AdditionSubtractionExpression()
+
+        B_stackpointer = self.S_processorStackPointer - 1
+
+        self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] == self.A_processorStack[self.S_processorStackPointer]
+
+        self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    def TinyBasic_Greater_Than(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.AdditionSubtractionExpression()
+
+        B_stackpointer = self.S_processorStackPointer - 1
+
+        self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] > self.A_processorStack[self.S_processorStackPointer]
+
+        self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    def TinyBasic_Greater_Than_Equal_To(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.AdditionSubtractionExpression()
+
+        B_stackpointer = self.S_processorStackPointer - 1
+
+        self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] >= self.A_processorStack[self.S_processorStackPointer]
+
+        self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    def TinyBasic_Less_Than(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.AdditionSubtractionExpression()
+
+        B_stackpointer = self.S_processorStackPointer - 1
+
+        self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] < self.A_processorStack[self.S_processorStackPointer]
+
+        self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    def TinyBasic_Less_Than_Equal_To(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.AdditionSubtractionExpression()
+
+        B_stackpointer = self.S_processorStackPointer - 1
+
+        self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] <= self.A_processorStack[self.S_processorStackPointer]
+
+        self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    def TinyBasic_Not_Equal_To(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.AdditionSubtractionExpression()
+
+        B_stackpointer = self.S_processorStackPointer - 1
+
+        self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] != self.A_processorStack[self.S_processorStackPointer]
+
+        self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    def TinyBasic_Add(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.MultiplyDivideModulusExpression()
+
+        B_stackpointer = self.S_processorStackPointer - 1
+
+        self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] + self.A_processorStack[self.S_processorStackPointer]
+
+        self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    def TinyBasic_Subtract(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.MultiplyDivideModulusExpression()
+
+        B_stackpointer = self.S_processorStackPointer - 1
+
+        self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] - self.A_processorStack[self.S_processorStackPointer]
+
+        self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    def TinyBasic_Multiply(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.GroupExpression()
+
+        B_stackpointer = self.S_processorStackPointer - 1
+
+        self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] * self.A_processorStack[self.S_processorStackPointer]
+
+        self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    def TinyBasic_Divide(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.GroupExpression()
+
+        B_stackpointer = self.A_processorStack[self.S_processorStackPointer]
+
+        if B_stackpointer == 0:
+
+            self.ErrorMessage(ERROR_CODE_DIVISION_BY_ZERO, ERROR_MESSAGE_DIVISION_BY_ZERO)
+
+            self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+            return
+
+        else:
+
+            B_stackpointer = self.S_processorStackPointer - 1
+
+            self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] / self.A_processorStack[self.S_processorStackPointer]
+
+            if INTEGER_ARITHMETIC:
+
+                self.A_processorStack[B_stackpointer] = int(self.A_processorStack[B_stackpointer])
+
+            self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    def TinyBasic_Modulus(self):
+
+        self.C_tokenPointer = self.C_tokenPointer + 1
+
+        self.GroupExpression()
+
+        B_stackpointer = self.A_processorStack[self.S_processorStackPointer]
+
+        if B_stackpointer == 0:
+
+            self.ErrorMessage(ERROR_CODE_DIVISION_BY_ZERO, ERROR_MESSAGE_DIVISION_BY_ZERO)
+
+            self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+            return
+
+        else:
+
+            B_stackpointer = self.S_processorStackPointer - 1
+
+            self.A_processorStack[B_stackpointer] = self.A_processorStack[B_stackpointer] % self.A_processorStack[self.S_processorStackPointer]
+
+            self.S_processorStackPointer = self.S_processorStackPointer - 1
+
+
+    # bytecode compiler
+    def CompileProgram(self):
+
+        # compiles the stored program into one flat list of instructions,
+        # leaves bytecode empty if the program uses a statement only the
+        # interpreter can run (RUN, NEW, LIST, SAVE, LOAD)
+
+        self.bytecodeValid = True
+
+        code = []
+
+        lineStarts = []
+
+        # (code position, line index) of jumps to the start of a line
+        lineJumps = []
+
+        for lineIndex in range(len(self.programLineNumbers)):
+
+            lineStarts.append(len(code))
+
+            if self.programTokens[PROGRAM_CODE_MEMORY_START + lineIndex] is None:
+
+                self.ReadMappedLine(PROGRAM_CODE_MEMORY_START + lineIndex)
+
+            lineTokens = self.programTokens[PROGRAM_CODE_MEMORY_START + lineIndex]
+
+            if self.CompileLine(code, lineTokens, lineIndex, lineJumps) == COMPILE_UNSUPPORTED:
+
+                self.bytecode = []
+
+                self.bytecodeLineStarts = []
+
+                return
+
+        lineStarts.append(len(code))
+
+        code.append(BC_END)
+
+        for codePosition, lineIndex in lineJumps:
+
+            code[codePosition] = lineStarts[lineIndex]
+
+        self.bytecode = code
+
+        self.bytecodeLineStarts = lineStarts
+
+
+    def CompileLine(self, code, lineTokens, lineIndex, lineJumps):
+
+        # first token is the line number
+        tokenPosition = 1
+
+        while True:
+
+            tokenPosition = self.CompileStatement(code, lineTokens, tokenPosition, lineIndex, lineJumps)
+
+            if tokenPosition < 0:
+
+                return tokenPosition
+
+            character = lineTokens[tokenPosition][2]
+
+            if character == COLON:
+
+                tokenPosition = tokenPosition + 1
+
+                continue
+
+            if character != CHR_END_OF_LINE:
+
+                return self.CompileError(code, ERROR_CODE_END_OF_STATEMENT_EXPECTED, ERROR_MESSAGE_END_OF_STATEMENT_EXPECTED)
+
+            return COMPILE_LINE_DONE
+
+
+    def CompileStatement(self, code, lineTokens, tokenPosition, lineIndex, lineJumps):
+
+        statementType, statementValue, character = lineTokens[tokenPosition]
+
+        if statementType == TOKEN_KEYWORD:
+
+            tokenPosition = tokenPosition + 1
+
+            if statementValue == KEYWORD_IF:
+
+                conditionStart = len(code)
+
+                tokenPosition = self.CompileExpression(code, lineTokens, tokenPosition)
+
+                if tokenPosition < 0:
+
+                    return tokenPosition
+
+                # a constant condition is folded to one number and
+                # needs no test, a false one falls through to the next line
+                if (len(code) == conditionStart + 2) and (code[conditionStart] == BC_PUSH_NUMBER):
+
+                    conditionValue = code.pop()
+
+                    code.pop()
+
+                    if conditionValue == 0:
+
+                        return COMPILE_LINE_DONE
+
+                else:
+
+                    # a false condition carries on with the next line
+                    code.append(BC_JUMP_IF_FALSE)
+
+                    lineJumps.append((len(code), lineIndex + 1))
+
+                    code.append(0)
+
+                labelType, labelValue, character = lineTokens[tokenPosition]
+
+                if (labelType == TOKEN_KEYWORD) and (labelValue == KEYWORD_THEN):
+
+                    return self.CompileStatement(code, lineTokens, tokenPosition + 1, lineIndex, lineJumps)
+
+                if (labelType == TOKEN_KEYWORD) or (labelType == TOKEN_LABEL) or (labelType == TOKEN_VARIABLE):
+
+                    return self.CompileError(code, ERROR_CODE_THEN_EXPECTED, ERROR_MESSAGE_THEN_EXPECTED)
+
+                return self.CompileError(code, ERROR_CODE_INVALID_LABEL, ERROR_MESSAGE_INVALID_LABEL)
+
+            if statementValue == KEYWORD_REM:
+
+                return COMPILE_LINE_DONE
+
+            if statementValue == KEYWORD_INPUT:
+
+                labelType, labelValue, character = lineTokens[tokenPosition]
+
+                if labelType == TOKEN_VARIABLE:
+
+                    code.append(BC_INPUT)
+
+                    code.append(labelValue)
+
+                    return tokenPosition + 1
+
+                return self.CompileLabelError(code, labelType)
+
+            if statementValue == KEYWORD_PRINT:
+
+                return self.CompilePrint(code, lineTokens, tokenPosition)
+
+            if statementValue == KEYWORD_GOTO:
+
+                tokenPosition = self.CompileGoto(code, lineTokens, tokenPosition, lineJumps)
+
+                if tokenPosition < 0:
+
+                    return tokenPosition
+
+                return COMPILE_LINE_DONE
+
+            if statementValue == KEYWORD_GOSUB:
+
+                # the return position is known once the target is compiled
+                code.append(BC_GOSUB)
+
+                returnPosition = len(code)
+
+                code.append(0)
+
+                tokenPosition = self.CompileGoto(code, lineTokens, tokenPosition, lineJumps)
+
+                code[returnPosition] = len(code)
+
+                return tokenPosition
+
+            if statementValue == KEYWORD_RETURN:
+
+                code.append(BC_RETURN)
+
+                return COMPILE_LINE_DONE
+
+            if statementValue == KEYWORD_END:
+
+                code.append(BC_END)
+
+                return COMPILE_LINE_DONE
+
+            if statementValue == KEYWORD_STOP:
+
+                return self.CompileError(code, ERROR_CODE_STOP, ERROR_MESSAGE_STOP)
+
+            if statementValue == KEYWORD_CLS:
+
+                return tokenPosition
+
+            if statementValue == KEYWORD_HELP:
+
+                code.append(BC_CALL)
+
+                code.append(self.TinyBasic_Help)
+
+                return tokenPosition
+
+            if statementValue == KEYWORD_MEM:
+
+                code.append(BC_CALL)
+
+                code.append(self.TinyBasic_Mem)
+
+                return tokenPosition
+
+            if statementValue == KEYWORD_CLEAR:
+
+                code.append(BC_CALL)
+
+                code.append(self.ClearVariables)
+
+                return tokenPosition
+
+            if statementValue == KEYWORD_LET:
+
+                statementType, statementValue, character = lineTokens[tokenPosition]
+
+                if (statementType != TOKEN_KEYWORD) and (statementType != TOKEN_LABEL) and (statementType != TOKEN_VARIABLE):
+
+                    return self.CompileError(code, ERROR_CODE_INVALID_LABEL, ERROR_MESSAGE_INVALID_LABEL)
+
+                tokenPosition = tokenPosition + 1
+
+            elif statementValue != KEYWORD_THEN and statementValue != KEYWORD_PAUSE:
+
+                return COMPILE_UNSUPPORTED
+
+        else:
+
+            tokenPosition = tokenPosition + 1
+
+        # [LET] <var>=<exp>
+        if statementType != TOKEN_VARIABLE:
+
+            return self.CompileLabelError(code, statementType)
+
+        if lineTokens[tokenPosition][2] != OP_EQUALS:
+
+            return self.CompileError(code, ERROR_CODE_EQUALS_EXPECTED, ERROR_MESSAGE_EQUALS_EXPECTED)
+
+        tokenPosition = self.CompileExpression(code, lineTokens, tokenPosition + 1)
+
+        if tokenPosition < 0:
+
+            return tokenPosition
+
+        code.append(BC_STORE)
+
+        code.append(statementValue)
+
+        return tokenPosition
+
+
+    def CompilePrint(self, code, lineTokens, tokenPosition):
+
+        character = lineTokens[tokenPosition][2]
+
+        # print on its own outputs a blank line
+        if (character == CHR_END_OF_LINE) or (character == COLON):
+
+            code.append(BC_PRINT_NEWLINE)
+
+            return tokenPosition
+
+        while True:
+
+            itemType, itemValue, character = lineTokens[tokenPosition]
+
+            if itemType == TOKEN_STRING:
+
+                if itemValue is None:
+
+                    return self.CompileError(code, ERROR_CODE_MISSING_DOUBLE_QUOTE, ERROR_MESSAGE_MISSING_DOUBLE_QUOTE)
+
+                code.append(BC_PRINT_STRING)
+
+                code.append(itemValue)
+
+                tokenPosition = tokenPosition + 1
+
+            else:
+
+                tokenPosition = self.CompileExpression(code, lineTokens, tokenPosition)
+
+                if tokenPosition < 0:
+
+                    return tokenPosition
+
+                code.append(BC_PRINT_NUMBER)
+
+            character = lineTokens[tokenPosition][2]
+
+            if character != COMMA:
+
+                break
+
+            tokenPosition = tokenPosition + 1
+
+        if character != SEMI_COLON:
+
+            code.append(BC_PRINT_NEWLINE)
+
+        else:
+
+            tokenPosition = tokenPosition + 1
+
+        return tokenPosition
+
+
+    def CompileGoto(self, code, lineTokens, tokenPosition, lineJumps):
+
+        targetType, targetValue, character = lineTokens[tokenPosition]
+
+        # a constant target is resolved now, anything else at run time
+        if (targetType == TOKEN_NUMBER) and (targetValue is not None) and (lineTokens[tokenPosition + 1][2] not in BYTECODE_OPERATORS):
+
+            lineSlot = self.FindLineNumber(targetValue)
+
+            if lineSlot == 0:
+
+                return self.CompileError(code, ERROR_CODE_LINE_NOT_FOUND, ERROR_MESSAGE_LINE_NOT_FOUND)
+
+            code.append(BC_JUMP)
+
+            lineJumps.append((len(code), lineSlot - PROGRAM_CODE_MEMORY_START))
+
+            code.append(0)
+
+            return tokenPosition + 1
+
+        tokenPosition = self.CompileExpression(code, lineTokens, tokenPosition)
+
+        if tokenPosition < 0:
+
+            return tokenPosition
+
+        code.append(BC_GOTO)
+
+        return tokenPosition
+
+
+    def CompileExpression(self, code, lineTokens, tokenPosition):
+
+        # compiled on its own first so constant parts can be folded
+        expressionCode = []
+
+        tokenPosition = self.CompileBool(expressionCode, lineTokens, tokenPosition)
+
+        if tokenPosition >= 0:
+
+            expressionCode = FoldExpression(expressionCode)
+
+        code.extend(expressionCode)
+
+        return tokenPosition
+
+
+    def CompileBool(self, code, lineTokens, tokenPosition):
+
+        # same grammar as BoolExpression and friends, emitted as postfix
+        tokenPosition = self.CompileAdditionSubtraction(code, lineTokens, tokenPosition)
+
+        if tokenPosition < 0:
+
+            return tokenPosition
+
+        character = lineTokens[tokenPosition][2]
+
+        while character in RELATIONAL_OPERATORS:
+
+            tokenPosition = self.CompileAdditionSubtraction(code, lineTokens, tokenPosition + 1)
+
+            if tokenPosition < 0:
+
+                return tokenPosition
+
+            code.append(BYTECODE_OPERATORS[character])
+
+            character = lineTokens[tokenPosition][2]
+
+        return tokenPosition
+
+
+    def CompileAdditionSubtraction(self, code, lineTokens, tokenPosition):
+
+        tokenPosition = self.CompileMultiplyDivideModulus(code, lineTokens, tokenPosition)
+
+        if tokenPosition < 0:
+
+            return tokenPosition
+
+        character = lineTokens[tokenPosition][2]
+
+        while (character == OP_PLUS) or (character == OP_MINUS):
+
+            tokenPosition = self.CompileMultiplyDivideModulus(code, lineTokens, tokenPosition + 1)
+
+            if tokenPosition < 0:
+
+                return tokenPosition
+
+            code.append(BYTECODE_OPERATORS[character])
+
+            character = lineTokens[tokenPosition][2]
+
+        return tokenPosition
+
+
+    def CompileMultiplyDivideModulus(self, code, lineTokens, tokenPosition):
+
+        tokenPosition = self.CompileGroup(code, lineTokens, tokenPosition)
+
+        if tokenPosition < 0:
+
+            return tokenPosition
+
+        character = lineTokens[tokenPosition][2]
+
+        while (character == OP_MULTIPLY) or (character == OP_DIVIDE) or (character == OP_MODULUS):
+
+            tokenPosition = self.CompileGroup(code, lineTokens, tokenPosition + 1)
+
+            if tokenPosition < 0:
+
+                return tokenPosition
+
+            code.append(BYTECODE_OPERATORS[character])
+
+            character = lineTokens[tokenPosition][2]
+
+        return tokenPosition
+
+
+    def CompileGroup(self, code, lineTokens, tokenPosition):
+
+        groupType, groupValue, character = lineTokens[tokenPosition]
+
+        if character == OP_LEFT_PARENTHESIS:
+
+            tokenPosition = self.CompileBool(code, lineTokens, tokenPosition + 1)
+
+            if tokenPosition < 0:
+
+                return tokenPosition
+
+            if lineTokens[tokenPosition][2] != OP_RIGHT_PARENTHESIS:
+
+                return self.CompileError(code, ERROR_CODE_MISSING_RIGHT_PARENTHESIS, ERROR_MESSAGE_MISSING_RIGHT_PARENTHESIS)
+
+            return tokenPosition + 1
+
+        if character == CHR_END_OF_LINE:
+
+            return self.CompileError(code, ERROR_CODE_INVALID_FACTOR, ERROR_MESSAGE_INVALID_FACTOR)
+
+        if (groupType == TOKEN_NUMBER) and (groupValue is not None):
+
+            code.append(BC_PUSH_NUMBER)
+
+            code.append(groupValue)
+
+            return tokenPosition + 1
+
+        if (groupType == TOKEN_NUMBER) or (character == OP_MINUS):
+
+            return self.CompileError(code, ERROR_CODE_INVALID_NUMBER, ERROR_MESSAGE_INVALID_NUMBER)
+
+        if groupType == TOKEN_VARIABLE:
+
+            code.append(BC_PUSH_VARIABLE)
+
+            code.append(groupValue)
+
+            return tokenPosition + 1
+
+        if (groupType == TOKEN_KEYWORD) or (groupType == TOKEN_LABEL):
+
+            return self.CompileError(code, ERROR_CODE_FUNCTION_EXPECTED, ERROR_MESSAGE_FUNCTION_EXPECTED)
+
+        return self.CompileError(code, ERROR_CODE_INVALID_LABEL, ERROR_MESSAGE_INVALID_LABEL)
+
+
+    def CompileLabelError(self, code, labelType):
+
+        # the error GetStatementLabel / ReturnVariable would report
+        if (labelType == TOKEN_KEYWORD) or (labelType == TOKEN_LABEL):
+
+            return self.CompileError(code, ERROR_CODE_VARIABLE_EXPECTED, ERROR_MESSAGE_VARIABLE_EXPECTED)
+
+        return self.CompileError(code, ERROR_CODE_INVALID_LABEL, ERROR_MESSAGE_INVALID_LABEL)
+
+
+    def CompileError(self, code, errorCode, errorMessage):
+
+        code.append(BC_ERROR)
+
+        code.append((errorCode, errorMessage))
+
+        return COMPILE_LINE_DONE
+
+
+    # bytecode engine
+    def RunBytecode(self):
+
+        code = self.bytecode
+
+        # every loop passes through a jump, goto or return, so only they
+        # count against the step budget
+        jumpsLeft = self.stepsLeft
+
+        variableStore = self.variables
+
+        gosubStack = self.gosubStack
+
+        stack = []
+
+        push = stack.append
+
+        pop = stack.pop
+
+        writeOutput = self.WriteOutput
+
+        programCounter = 0
+
+        while True:
+
+            instruction = code[programCounter]
+
+            if instruction == BC_PUSH_VARIABLE:
+
+                push(variableStore[code[programCounter + 1]])
+
+                programCounter = programCounter + 2
+
+            elif instruction == BC_PUSH_NUMBER:
+
+                push(code[programCounter + 1])
+
+                programCounter = programCounter + 2
+
+            elif instruction == BC_STORE:
+
+                try:
+
+                    variableStore[code[programCounter + 1]] = pop()
+
+                except OverflowError:
+
+                    self.ErrorMessage(ERROR_CODE_NUMBER_TOO_LARGE, ERROR_MESSAGE_NUMBER_TOO_LARGE)
+
+                    break
+
+                programCounter = programCounter + 2
+
+            elif instruction == BC_JUMP_IF_FALSE:
+
+                if pop() == 0:
+
+                    programCounter = code[programCounter + 1]
+
+                else:
+
+                    programCounter = programCounter + 2
+
+            elif instruction == BC_JUMP:
+
+                if jumpsLeft is not None:
+
+                    if jumpsLeft == 0:
+
+                        jumpsLeft = self.GrantSteps()
+
+                        if jumpsLeft == 0:
+
+                            break
+
+                    jumpsLeft = jumpsLeft - 1
+
+                programCounter = code[programCounter + 1]
+
+            elif instruction == BC_ADD:
+
+                value = pop()
+
+                stack[-1] = stack[-1] + value
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_SUBTRACT:
+
+                value = pop()
+
+                stack[-1] = stack[-1] - value
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_MULTIPLY:
+
+                value = pop()
+
+                stack[-1] = stack[-1] * value
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_LESS_THAN:
+
+                value = pop()
+
+                stack[-1] = stack[-1] < value
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_GREATER_THAN:
+
+                value = pop()
+
+                stack[-1] = stack[-1] > value
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_EQUALS:
+
+                value = pop()
+
+                stack[-1] = stack[-1] == value
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_NOT_EQUAL_TO:
+
+                value = pop()
+
+                stack[-1] = stack[-1] != value
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_LESS_THAN_EQUAL_TO:
+
+                value = pop()
+
+                stack[-1] = stack[-1] <= value
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_GREATER_THAN_EQUAL_TO:
+
+                value = pop()
+
+                stack[-1] = stack[-1] >= value
+
+                programCounter = programCounter + 1
+
+            elif (instruction == BC_DIVIDE) or (instruction == BC_MODULUS):
+
+                value = pop()
+
+                if value == 0:
+
+                    self.ErrorMessage(ERROR_CODE_DIVISION_BY_ZERO, ERROR_MESSAGE_DIVISION_BY_ZERO)
+
+                    break
+
+                if instruction == BC_DIVIDE:
+
+                    stack[-1] = stack[-1] / value
+
+                    if INTEGER_ARITHMETIC:
+
+                        stack[-1] = int(stack[-1])
+
+                else:
+
+                    stack[-1] = stack[-1] % value
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_PRINT_NUMBER:
+
+                writeOutput(FormatNumber(pop()))
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_PRINT_STRING:
+
+                writeOutput(code[programCounter + 1])
+
+                programCounter = programCounter + 2
+
+            elif instruction == BC_PRINT_NEWLINE:
+
+                writeOutput(CHR_END_OF_LINE)
+
+                programCounter = programCounter + 1
+
+            elif instruction == BC_GOTO:
+
+                if jumpsLeft is not None:
+
+                    if jumpsLeft == 0:
+
+                        jumpsLeft = self.GrantSteps()
+
+                        if jumpsLeft == 0:
+
+                            break
+
+                    jumpsLeft = jumpsLeft - 1
+
+                lineSlot = self.FindLineNumber(pop())
+
+                if lineSlot == 0:
+
+                    self.ErrorMessage(ERROR_CODE_LINE_NOT_FOUND, ERROR_MESSAGE_LINE_NOT_FOUND)
+
+                    break
+
+                programCounter = self.bytecodeLineStarts[lineSlot - PROGRAM_CODE_MEMORY_START]
+
+            elif instruction == BC_GOSUB:
+
+                if len(gosubStack) >= self.gosubStackLimit:
+
+                    self.ErrorMessage(ERROR_CODE_GOSUB_STACK_OVERFLOW, ERROR_MESSAGE_GOSUB_STACK_OVERFLOW)
+
+                    break
+
+                gosubStack.append(code[programCounter + 1])
+
+                programCounter = programCounter + 2
+
+            elif instruction == BC_RETURN:
+
+                if jumpsLeft is not None:
+
+                    if jumpsLeft == 0:
+
+                        jumpsLeft = self.GrantSteps()
+
+                        if jumpsLeft == 0:
+
+                            break
+
+                    jumpsLeft = jumpsLeft - 1
+
+                if not gosubStack:
+
+                    self.ErrorMessage(ERROR_CODE_NO_MATCHING_GOSUB, ERROR_MESSAGE_NO_MATCHING_GOSUB)
+
+                    break
+
+                programCounter = gosubStack.pop()
+
+            elif instruction == BC_INPUT:
+
+                value = ParseInputNumber(self.ReadInput(EMPTY_STRING))
+
+                if value is None:
+
+                    self.ErrorMessage(ERROR_CODE_INVALID_NUMBER, ERROR_MESSAGE_INVALID_NUMBER)
+
+                    break
+
+                try:
+
+                    variableStore[code[programCounter + 1]] = value
+
+                except OverflowError:
+
+                    self.ErrorMessage(ERROR_CODE_NUMBER_TOO_LARGE, ERROR_MESSAGE_NUMBER_TOO_LARGE)
+
+                    break
+
+                programCounter = programCounter + 2
+
+            elif instruction == BC_CALL:
+
+                code[programCounter + 1]()
+
+                programCounter = programCounter + 2
+
+            elif instruction == BC_ERROR:
+
+                self.ErrorMessage(*code[programCounter + 1])
+
+                break
+
+            else:
+
+                # BC_END
+                break
+
+        self.stepsLeft = jumpsLeft
+
+        # line number for the error handler
+        lineIndex = bisect_right(self.bytecodeLineStarts, programCounter) - 1
+
+        if self.programLineNumbers:
+
+            self.E_errorLineNumber = self.programLineNumbers[min(lineIndex, len(self.programLineNumbers) - 1)]
+
+
+    # variable store
+    def ClearVariables(self):
+
+        # one bulk copy instead of a loop over the slots
+        self.variables[:] = CLEARED_VARIABLES
+
+
+    def StoreVariable(self, variableIndex, value):
+
+        # the integer store only holds 64 bit values
+        try:
+
+            self.variables[variableIndex] = value
+
+        except OverflowError:
+
+            self.ErrorMessage(ERROR_CODE_NUMBER_TOO_LARGE, ERROR_MESSAGE_NUMBER_TOO_LARGE)
+
+
+    def SnapshotVariables(self):
+
+        # copy of A-Z as a list in either numeric mode, e.g. to keep
+        # the results of a run
+        return list(self.variables)
+
+
+    def VariableValues(self):
+
+        # A-Z without a copy, a sequence indexed 0-25 that is only to be
+        # read, it follows the store until the next run changes it
+        return self.variables
+
+
+    def RestoreVariables(self, snapshot):
+
+        self.variables[:] = snapshot
+
+
+    def ReadVariable(self, variableName):
+
+        return self.variables[ord(variableName.upper()) - ASC_UPPERCASE_A]
+
+
+    # memory accounting
+    def GetMemoryUsage(self):
+
+        # bytes held by program storage, the variable store and the
+        # math and gosub stacks, measured with sys.getsizeof
+        programMemory = sys.getsizeof(self.programCode) + sys.getsizeof(self.programTokens) + sys.getsizeof(self.programLineNumbers) + self.programMemoryUsed
+
+        variableMemory = sys.getsizeof(self.variables)
+
+        # a list holds its values as objects of their own
+        if not INTEGER_ARITHMETIC:
+
+            variableMemory = variableMemory + sum(sys.getsizeof(value) for value in self.variables)
+
+        mathStackMemory = sys.getsizeof(self.A_processorStack)
+
+        gosubStackMemory = sys.getsizeof(self.gosubStack) + sum(sys.getsizeof(gosubFrame) for gosubFrame in self.gosubStack)
+
+        usedMemory = programMemory + variableMemory + mathStackMemory + gosubStackMemory
+
+        return MemoryUsage(programMemory, variableMemory, mathStackMemory, gosubStackMemory, usedMemory, len(self.programLineNumbers), self.programLineLimit)
+
+
+    # headless batch run
+    def run_program(self, source, stdin=None, stdout=None, max_steps=None, max_seconds=None, image_file=None):
+
+        # loads the numbered lines in source and runs them without the REPL,
+        # stdin is the text (or file) INPUT reads from, output is captured
+        # through the output sink and also copied to stdout if given,
+        # max_steps and max_seconds bound the work done, image_file is
+        # a program image used instead of parsing source, and written
+        # when it is missing or stale
+        if stdin is None:
+
+            stdin = io.StringIO(EMPTY_STRING)
+
+        elif isinstance(stdin, str):
+
+            stdin = io.StringIO(stdin)
+
+        output = io.StringIO()
+
+        self.FlushOutput()
+
+        savedOutputSink = self.outputSink
+
+        self.outputSink = output.write
+
+        savedInputSource = self.inputSource
+
+        self.inputSource = stdin
+
+        try:
+
+            status = self.RunProgramSource(source, max_steps, max_seconds, image_file)
+
+            errorText = None
+
+            errorCode = None
+
+            errorLineNumber = None
+
+            if self.Es_errorMessage != EMPTY_STRING:
+
+                errorText = self.FormatErrorMessage()
+
+                errorCode = self.errorCode
+
+                errorLineNumber = self.E_errorLineNumber
+
+                self.ErrorHandler()
+
+        finally:
+
+            self.FlushOutput()
+
+            self.outputSink = savedOutputSink
+
+            self.inputSource = savedInputSource
+
+            self.stepBudget = None
+
+            self.stepsLeft = None
+
+            self.deadline = None
+
+        outputText = output.getvalue()
+
+        if stdout is not None:
+
+            stdout.write(outputText)
+
+        return RunResult(outputText, self.SnapshotVariables(), status, errorText, errorCode, errorLineNumber)
+
+
+    def RunProgramSource(self, source, maxSteps, maxSeconds, imageFileName):
+
+        self.ColdStart()
+
+        self.WarmStart()
+
+        programLines = None
+
+        if imageFileName is not None:
+
+            sourceHash = SourceHash(source)
+
+            programLines = ReadProgramImage(imageFileName, sourceHash)
+
+        if programLines is not None:
+
+            self.StoreProgramLines(programLines)
+
+        else:
+
+            for sourceLine in source.splitlines():
+
+                if sourceLine.strip() == EMPTY_STRING:
+
+                    continue
+
+                self.Zs_command = self.ConvertToUppercase(sourceLine) + CHR_END_OF_LINE
+
+                self.MakeItSo()
+
+                # only numbered lines belong in a program
+                if self.subroutine == "RunCommandInterpreter":
+
+                    self.E_errorLineNumber = 0
+
+                    self.ErrorMessage(ERROR_CODE_INVALID_LINE_NUMBER, ERROR_MESSAGE_INVALID_LINE_NUMBER)
+
+                if self.Es_errorMessage != EMPTY_STRING:
+
+                    return RUN_STATUS_ERROR
+
+            # an image that can't be written is only a missed speed up
+            if imageFileName is not None:
+
+                try:
+
+                    WriteProgramImage(imageFileName, sourceHash, self.StoredProgramLines())
+
+                except OSError:
+
+                    pass
+
+        self.stepBudget = maxSteps
+
+        self.stepLimitReached = False
+
+        self.timeLimitReached = False
+
+        if maxSeconds is not None:
+
+            self.deadline = time.monotonic() + maxSeconds
+
+        # steps are handed out in slices by GrantSteps
+        if (maxSteps is not None) or (maxSeconds is not None):
+
+            self.stepsLeft = 0
+
+        self.Zs_command = "RUN" + CHR_END_OF_LINE
+
+        self.subroutine = "MakeItSo"
+
+        try:
+
+            while self.subroutine != "Ready":
+
+                if self.stepsLeft is not None:
+
+                    if self.stepsLeft == 0:
+
+                        self.stepsLeft = self.GrantSteps()
+
+                        if self.stepsLeft == 0:
+
+                            break
+
+                    self.stepsLeft = self.stepsLeft - 1
+
+                self.stateHandlers[self.subroutine]()
+
+        except EOFError:
+
+            return RUN_STATUS_NO_INPUT
+
+        if self.stepLimitReached:
+
+            return RUN_STATUS_STEP_LIMIT
+
+        if self.timeLimitReached:
+
+            return RUN_STATUS_TIME_LIMIT
+
+        if self.profiling:
+
+            self.ProfileLine(None)
+
+        if self.Es_errorMessage == EMPTY_STRING:
+
+            return RUN_STATUS_OK
+
+        if self.errorCode == ERROR_CODE_STOP:
+
+            return RUN_STATUS_STOPPED
+
+        return RUN_STATUS_ERROR
+
+
+    # line profiler
+    def EnableProfiling(self):
+
+        self.profiling = True
+
+        self.lineProfile = {}
+
+        self.profileLineNumber = None
+
+
+    def DisableProfiling(self):
+
+        self.ProfileLine(None)
+
+        self.profiling = False
+
+
+    def ProfileLine(self, lineNumber):
+
+        # charges the time since the last line change to the line that was
+        # running, then counts lineNumber (None when the program stops)
+        now = time.perf_counter()
+
+        if self.profileLineNumber is not None:
+
+            self.lineProfile[self.profileLineNumber][1] += now - self.profileLineStart
+
+        if lineNumber is not None:
+
+            lineStatistics = self.lineProfile.get(lineNumber)
+
+            if lineStatistics is None:
+
+                lineStatistics = self.lineProfile[lineNumber] = [0, 0.0]
+
+            lineStatistics[0] += 1
+
+        self.profileLineNumber = lineNumber
+
+        self.profileLineStart = now
+
+
+    def ProfileReport(self):
+
+        # (line number, executions, seconds), hottest line first
+        report = [(lineNumber, executions, seconds) for lineNumber, (executions, seconds) in self.lineProfile.items()]
+
+        report.sort(key=lambda lineStatistics: lineStatistics[2], reverse=True)
+
+        return report
+
+
+    def PrintProfile(self):
+
+        self.WriteOutput(" LINE      COUNT    SECONDS" + CHR_END_OF_LINE)
+
+        for lineNumber, executions, seconds in self.ProfileReport():
+
+            self.WriteOutput(str(lineNumber).rjust(5) + str(executions).rjust(11) + ("%.6f" % seconds).rjust(11) + CHR_END_OF_LINE)
+
+
+    def GrantSteps(self):
+
+        # next slice of the step budget, the clock is checked between
+        # slices, 0 once either budget has run out
+        if self.outputBuffer and (time.monotonic() >= self.outputFlushTime):
+
+            self.FlushOutput()
+
+        if (self.deadline is not None) and (time.monotonic() > self.deadline):
+
+            self.timeLimitReached = True
+
+            return 0
+
+        if self.stepBudget is None:
+
+            return BUDGET_SLICE
+
+        grantedSteps = min(self.stepBudget, BUDGET_SLICE)
+
+        if grantedSteps == 0:
+
+            self.stepLimitReached = True
+
+        self.stepBudget = self.stepBudget - grantedSteps
+
+        return grantedSteps
+
+
+    def ConvertToUppercase(self, textstringToConvert):
+
+        stringPointer = 0
+
+        convertedString = ""
+
+        while stringPointer < len(textstringToConvert):
+
+            # get character to work with into
+            # temporary variable, saves code
+            character = textstringToConvert[stringPointer]
+
+            # test character to see if lowercase
+            if (character >= "a") and (character <= "z"):
+
+                # it is, so convert it
+                # get code for character - offset 'A'
+                self.asciiCode = ord(character) - ASC_LOWERCASE_A
+
+                # add value to offset for 'A'
+                convertedString = convertedString + chr(ASC_UPPERCASE_A + self.asciiCode)
+
+            else:
+
+                convertedString = convertedString + character
+
+            stringPointer = stringPointer + 1
+
+        return convertedString
+
+
+    def ErrorMessage(self, code, message):
+
+        if self.Es_errorMessage == EMPTY_STRING:
+
+            self.errorCode = code
+
+            self.Es_errorMessage = message
+
+
+    def ErrorHandler(self):
+
+        if self.Es_errorMessage != EMPTY_STRING:
+
+            self.Es_errorMessage = self.FormatErrorMessage()
+
+        self.DisplayErrorMessage(self.Es_errorMessage)
+
+
+    def FormatErrorMessage(self):
+
+        if self.E_errorLineNumber > 0 and self.errorCode == ERROR_CODE_STOP:
+
+            return self.Es_errorMessage + " AT LINE " + str(self.E_errorLineNumber)
+
+        if self.E_errorLineNumber > 0:
+
+            return "ERROR IN LINE " + str(self.E_errorLineNumber) + ": " + self.Es_errorMessage
+
+        return "ERROR: " + self.Es_errorMessage
+
+
+    def DisplayErrorMessage(self, errorMessage):
+
+        self.WriteOutput(errorMessage + CHR_END_OF_LINE)
+
+        self.Es_errorMessage = EMPTY_STRING
+
+
+    def ReadInput(self, prompt):
+
+        # a line without its newline, EOFError once input runs out
+        self.FlushOutput()
+
+        if self.inputSource is None:
+
+            return input(prompt)
+
+        if prompt != EMPTY_STRING:
+
+            self.WriteOutput(prompt)
+
+            self.FlushOutput()
+
+        inputLine = self.inputSource.readline()
+
+        if inputLine == EMPTY_STRING:
+
+            raise EOFError
+
+        return inputLine.rstrip(CHR_END_OF_LINE)
+
+
+    def WriteOutput(self, text):
+
+        self.outputBuffer.append(text)
+
+        self.outputBufferLength = self.outputBufferLength + len(text)
+
+        # the clock is only read between step slices, by GrantSteps
+        if self.outputBufferLength >= self.outputBufferLimit:
+
+            self.FlushOutput()
+
+
+    def FlushOutput(self):
+
+        self.outputFlushTime = time.monotonic() + self.outputFlushSeconds
+
+        if not self.outputBuffer:
+
+            return
+
+        outputText = EMPTY_STRING.join(self.outputBuffer)
+
+        del self.outputBuffer[:]
+
+        self.outputBufferLength = 0
+
+        if self.outputSink is not None:
 
-            Es_errorMessage = "ERROR IN LINE " + str(E_errorLineNumber) + ": " + Es_errorMessage
+            self.outputSink(outputText)
 
         else:
 
-            Es_errorMessage = "ERROR: " + Es_errorMessage
+            sys.stdout.write(outputText)
 
-    DisplayErrorMessage(Es_errorMessage)
+            sys.stdout.flush()
 
 
-def DisplayErrorMessage(errorMessage):
 
-    global Es_errorMessage
+def run_program(source, stdin=None, stdout=None, max_steps=None, max_seconds=None, image_file=None):
 
-    print(errorMessage)
+    # each job gets a fresh interpreter of its own
+    return Interpreter().run_program(source, stdin, stdout, max_steps, max_seconds, image_file)
 
-    Es_errorMessage = EMPTY_STRING
 
+if __name__ == "__main__":
 
-Start()
+    Interpreter().Start()
@@ -0,0 +1,325 @@
+#
+# Tiny Basic Python Edition
+#
+# Benchmarks
+#
+# Runs a fixed set of BASIC workloads through each interpreter
+# generation and prints the results as JSON.
+#
+# python benchmark.py [--repeat N] [--output FILE]
+# ---------------------------------
+
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import TinyBasic_Mk2_v1
+
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# generations that can only be driven through their REPL
+REPL_INTERPRETERS = (
+    ("TinyBasic", "TinyBasic.py"),
+    ("Mk1", "TinyBasic_Mk1_v1.py")
+)
+
+REPL_TIMEOUT_SECONDS = 60
+
+DEFAULT_REPEAT = 3
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+
+def ArithmeticLoop():
+
+    return "\n".join([
+        "10 I=0:S=0",
+        "20 S=S+I*3-I/2",
+        "30 I=I+1",
+        "40 IF I<20000 THEN GOTO 20",
+        "50 PRINT S"
+    ])
+
+
+def GosubRecursion():
+
+    # nests GOSUB 20 deep, 500 times over
+    return "\n".join([
+        "10 N=0:D=0",
+        "20 GOSUB 100",
+        "30 N=N+1",
+        "40 IF N<500 THEN GOTO 20",
+        "50 PRINT D",
+        "60 END",
+        "100 D=D+1",
+        "110 IF D%20<>0 THEN GOSUB 100",
+        "120 RETURN"
+    ])
+
+
+def PrintHeavy():
+
+    return "\n".join([
+        "10 I=0",
+        "20 PRINT \"LINE \",I,\" OF OUTPUT \",I*I",
+        "30 I=I+1",
+        "40 IF I<5000 THEN GOTO 20"
+    ])
+
+
+def LongBackwardGoto():
+
+    # 90 lines, the loop jumps from the last line back to the second
+    lines = ["10 I=0"]
+
+    for lineNumber in range(20, 890, 10):
+
+        lines.append(str(lineNumber) + " X=X+1")
+
+    lines.append("890 I=I+1")
+
+    lines.append("900 IF I<200 THEN GOTO 20")
+
+    return "\n".join(lines)
+
+
+def ProgramEntry():
+
+    # 99 lines, entered last line first so every line is
+    # inserted in front of the others
+    lines = ["990 END"]
+
+    for lineNumber in range(980, 0, -10):
+
+        lines.append(str(lineNumber) + " REM LINE " + str(lineNumber // 10))
+
+    return "\n".join(lines)
+
+
+WORKLOADS = (
+    ("arithmetic_loop", ArithmeticLoop),
+    ("gosub_recursion", GosubRecursion),
+    ("print_heavy", PrintHeavy),
+    ("long_backward_goto", LongBackwardGoto),
+    ("program_entry", ProgramEntry)
+)
+
+
+class CountingInterpreter(TinyBasic_Mk2_v1.Interpreter):
+
+    # counts statements, the handler tables pick up the override
+    __slots__ = ("statementCount",)
+
+    def __init__(self):
+
+        super().__init__()
+
+        self.statementCount = 0
+
+
+    def RunCommandInterpreter(self):
+
+        self.statementCount = self.statementCount + 1
+
+        super().RunCommandInterpreter()
+
+
+def CountStatements(source):
+
+    # statements executed, counted once on the interpreter so every
+    # engine is measured against the same figure
+    interpreter = CountingInterpreter()
+
+    result = interpreter.run_program(source)
+
+    return interpreter.statementCount, result
+
+
+def MeasureMk2(source, useBytecodeEngine, repeat):
+
+    interpreter = TinyBasic_Mk2_v1.Interpreter()
+
+    interpreter.useBytecodeEngine = useBytecodeEngine
+
+    wallSeconds = None
+
+    for _ in range(repeat):
+
+        startTime = time.perf_counter()
+
+        result = interpreter.run_program(source)
+
+        elapsed = time.perf_counter() - startTime
+
+        if (wallSeconds is None) or (elapsed < wallSeconds):
+
+            wallSeconds = elapsed
+
+    # separate run, tracemalloc slows everything down
+    tracemalloc.start()
+
+    interpreter.run_program(source)
+
+    peakMemory = tracemalloc.get_traced_memory()[1]
+
+    tracemalloc.stop()
+
+    status = STATUS_OK if result.status == TinyBasic_Mk2_v1.RUN_STATUS_OK else STATUS_FAILED
+
+    return status, result.error, wallSeconds, peakMemory
+
+
+def MeasureRepl(fileName, source, expectedOutput, repeat):
+
+    # feeds the program and RUN to the REPL, running out of input at
+    # the prompt afterwards is the normal way for these to finish
+    replInput = source + "\nRUN\n"
+
+    wallSeconds = None
+
+    error = None
+
+    for _ in range(repeat):
+
+        startTime = time.perf_counter()
+
+        try:
+
+            completed = subprocess.run([sys.executable, os.path.join(BENCHMARK_DIRECTORY, fileName)],
+                                       input=replInput, capture_output=True, text=True,
+                                       timeout=REPL_TIMEOUT_SECONDS)
+
+        except subprocess.TimeoutExpired:
+
+            return STATUS_FAILED, "timed out", None, None
+
+        elapsed = time.perf_counter() - startTime
+
+        errorLines = completed.stderr.strip().splitlines()
+
+        if errorLines and not errorLines[-1].startswith("EOFError"):
+
+            error = errorLines[-1]
+
+            break
+
+        # these report program errors on stdout
+        outputErrors = [line for line in completed.stdout.splitlines() if line.startswith("Error")]
+
+        if outputErrors:
+
+            error = outputErrors[0]
+
+            break
+
+        if expectedOutput not in completed.stdout:
+
+            error = "output differs from Mk2"
+
+            break
+
+        if (wallSeconds is None) or (elapsed < wallSeconds):
+
+            wallSeconds = elapsed
+
+    if error is not None:
+
+        return STATUS_FAILED, error, None, None
+
+    return STATUS_OK, None, wallSeconds, None
+
+
+def RunBenchmarks(repeat):
+
+    results = []
+
+    for workloadName, workload in WORKLOADS:
+
+        source = workload()
+
+        statements, expectedResult = CountStatements(source)
+
+        measurements = []
+
+        for interpreterName, fileName in REPL_INTERPRETERS:
+
+            measurements.append((interpreterName, MeasureRepl(fileName, source, expectedResult.output, repeat)))
+
+        measurements.append(("Mk2", MeasureMk2(source, False, repeat)))
+
+        measurements.append(("Mk2 bytecode", MeasureMk2(source, True, repeat)))
+
+        for interpreterName, (status, error, wallSeconds, peakMemory) in measurements:
+
+            statementsPerSecond = None
+
+            if (status == STATUS_OK) and wallSeconds:
+
+                statementsPerSecond = round(statements / wallSeconds)
+
+            results.append({
+                "interpreter": interpreterName,
+                "workload": workloadName,
+                "status": status,
+                "error": error,
+                "statements": statements,
+                "wall_seconds": wallSeconds,
+                "statements_per_second": statementsPerSecond,
+                "peak_memory_bytes": peakMemory
+            })
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results
+    }
+
+
+def Start():
+
+    repeat = DEFAULT_REPEAT
+
+    outputFileName = None
+
+    arguments = sys.argv[1:]
+
+    while arguments:
+
+        argument = arguments.pop(0)
+
+        if argument == "--repeat":
+
+            repeat = int(arguments.pop(0))
+
+        elif argument == "--output":
+
+            outputFileName = arguments.pop(0)
+
+        else:
+
+            sys.exit("usage: python benchmark.py [--repeat N] [--output FILE]")
+
+    report = json.dumps(RunBenchmarks(repeat), indent=2)
+
+    if outputFileName is None:
+
+        print(report)
+
+    else:
+
+        with open(outputFileName, "w") as outputFile:
+
+            outputFile.write(report + "\n")
+
+
+if __name__ == "__main__":
+
+    Start()
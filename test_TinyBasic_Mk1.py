@@ -0,0 +1,85 @@
+#
+# Tiny Basic Python Edition
+#
+# Mk1 SAVE and LOAD tests
+#
+# python -m unittest test_TinyBasic_Mk1
+# ---------------------------------
+
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+import TinyBasic_Mk1_v1
+
+
+def EnterLine(line):
+
+    # a numbered line typed at the prompt
+    TinyBasic_Mk1_v1.Zs = line + TinyBasic_Mk1_v1.CHR_END_OF_LINE
+
+    TinyBasic_Mk1_v1.errorMessage = TinyBasic_Mk1_v1.EMPTY_STRING
+
+    TinyBasic_Mk1_v1.AutoRun()
+
+
+class SaveLoadTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.savedDirectory = os.getcwd()
+
+        self.scratchDirectory = tempfile.TemporaryDirectory()
+
+        os.chdir(self.scratchDirectory.name)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+
+            TinyBasic_Mk1_v1.Initialise()
+
+            TinyBasic_Mk1_v1.PowerOn()
+
+    def tearDown(self):
+
+        os.chdir(self.savedDirectory)
+
+        self.scratchDirectory.cleanup()
+
+    def test_round_trip(self):
+
+        for line in ("20 PRINT 2", "10 PRINT 1", "30 A=3"):
+
+            EnterLine(line)
+
+        TinyBasic_Mk1_v1.L_programCodeMemoryPointer = TinyBasic_Mk1_v1.PROGRAM_CODE_MEMORY_WORKSPACE
+
+        with mock.patch("builtins.input", return_value="prog"):
+
+            TinyBasic_Mk1_v1.TinyBasic_Save()
+
+        # one line per record
+        with open("prog.txt") as programFile:
+
+            self.assertEqual(programFile.read(), "10 PRINT 1\n20 PRINT 2\n30 A=3\n")
+
+        savedLines = TinyBasic_Mk1_v1.programCode[TinyBasic_Mk1_v1.PROGRAM_CODE_MEMORY_START:]
+
+        TinyBasic_Mk1_v1.TinyBasic_New()
+
+        with mock.patch("builtins.input", return_value="prog"):
+
+            TinyBasic_Mk1_v1.TinyBasic_Load()
+
+        self.assertEqual(TinyBasic_Mk1_v1.programCode[TinyBasic_Mk1_v1.PROGRAM_CODE_MEMORY_START:], savedLines)
+
+        self.assertEqual(TinyBasic_Mk1_v1.errorMessage, TinyBasic_Mk1_v1.EMPTY_STRING)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
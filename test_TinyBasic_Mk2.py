@@ -0,0 +1,590 @@
+#
+# Tiny Basic Python Edition
+#
+# Mk2 interpreter tests
+#
+# EngineParityTest runs the benchmark workloads and a few short
+# programs through the tree walking interpreter and the bytecode
+# engine and checks both give the same result, the other cases
+# each cover one feature.
+#
+# python -m unittest test_TinyBasic_Mk2
+# ---------------------------------
+
+
+import hashlib
+import io
+import marshal
+import os
+import stat
+import sys
+import tempfile
+import unittest
+import zlib
+
+import benchmark
+import TinyBasic_Mk2_v1
+
+from TinyBasic_Mk2_v1 import BC_ADD, BC_DIVIDE, BC_LESS_THAN, BC_MULTIPLY, BC_PUSH_NUMBER, BC_PUSH_VARIABLE, BC_SUBTRACT, FoldExpression
+
+
+# short programs for the statements the workloads don't cover
+PARITY_PROGRAMS = (
+    ("cls", "10 CLS\n20 PRINT \"AFTER\"\n"),
+    ("folding", "10 A=2*3+4\n20 B=A*1+0\n30 C=0+A-0\n40 D=(1<2)+0\n50 PRINT A,B,C,D\n"),
+    ("gosub", "10 GOSUB 100\n20 PRINT \"BACK\"\n30 END\n100 PRINT \"SUB\"\n110 RETURN\n"),
+    ("return_without_gosub", "10 RETURN\n"),
+    ("division_by_zero", "10 A=0\n20 PRINT 1/A\n"),
+    ("constant_division_by_zero", "10 PRINT 1/0\n"),
+    ("missing_line", "10 GOTO 50\n")
+)
+
+
+def RunOnEngine(source, stdin, useBytecodeEngine):
+
+    interpreter = TinyBasic_Mk2_v1.Interpreter()
+
+    interpreter.useBytecodeEngine = useBytecodeEngine
+
+    return interpreter.run_program(source, stdin, max_steps=10000000)
+
+
+def EnterCommands(interpreter, commands):
+
+    # types each command at the prompt, returns what was printed
+    output = io.StringIO()
+
+    interpreter.outputSink = output.write
+
+    for command in commands:
+
+        interpreter.Zs_command = command + TinyBasic_Mk2_v1.CHR_END_OF_LINE
+
+        interpreter.MakeItSo()
+
+        while interpreter.subroutine != "Ready":
+
+            interpreter.stateHandlers[interpreter.subroutine]()
+
+        interpreter.ErrorHandler()
+
+    interpreter.FlushOutput()
+
+    return output.getvalue()
+
+
+def NewInterpreter():
+
+    interpreter = TinyBasic_Mk2_v1.Interpreter()
+
+    interpreter.ColdStart()
+
+    interpreter.WarmStart()
+
+    return interpreter
+
+
+class FileTestCase(unittest.TestCase):
+
+    # programs are saved in the working directory, a scratch one here
+    def setUp(self):
+
+        self.savedDirectory = os.getcwd()
+
+        self.scratchDirectory = tempfile.TemporaryDirectory()
+
+        os.chdir(self.scratchDirectory.name)
+
+    def tearDown(self):
+
+        os.chdir(self.savedDirectory)
+
+        self.scratchDirectory.cleanup()
+
+
+class EngineParityTest(unittest.TestCase):
+
+    def AssertSameResult(self, source, stdin=None):
+
+        treeResult = RunOnEngine(source, stdin, False)
+
+        bytecodeResult = RunOnEngine(source, stdin, True)
+
+        self.assertEqual(treeResult, bytecodeResult)
+
+        return treeResult
+
+    def test_workloads(self):
+
+        for workloadName, workload in benchmark.WORKLOADS:
+
+            with self.subTest(workload=workloadName):
+
+                result = self.AssertSameResult(workload())
+
+                self.assertEqual(result.status, TinyBasic_Mk2_v1.RUN_STATUS_OK)
+
+    def test_programs(self):
+
+        for programName, source in PARITY_PROGRAMS:
+
+            with self.subTest(program=programName):
+
+                self.AssertSameResult(source)
+
+    def test_cls(self):
+
+        result = self.AssertSameResult("10 CLS\n20 PRINT \"AFTER\"\n")
+
+        self.assertEqual(result.status, TinyBasic_Mk2_v1.RUN_STATUS_OK)
+
+        self.assertEqual(result.output, "AFTER\n")
+
+
+class SaveLoadTest(FileTestCase):
+
+    def test_round_trip(self):
+
+        interpreter = NewInterpreter()
+
+        EnterCommands(interpreter, ["20 PRINT \"B\"", "10 PRINT \"A\"", "SAVE 3", "NEW"])
+
+        with open("tinyBas3.txt") as programFile:
+
+            self.assertEqual(programFile.read(), "10 PRINT \"A\"\n20 PRINT \"B\"\n")
+
+        # the prompt puts blank lines around a run
+        self.assertEqual(EnterCommands(interpreter, ["LOAD 3", "RUN"]).strip("\n"), "A\nB")
+
+    def test_saved_file_mode(self):
+
+        # a new file gets what the umask allows, a replaced one keeps its mode
+        fileModeMask = os.umask(0o022)
+
+        try:
+
+            interpreter = NewInterpreter()
+
+            EnterCommands(interpreter, ["10 PRINT 1", "SAVE 4"])
+
+            self.assertEqual(stat.S_IMODE(os.stat("tinyBas4.txt").st_mode), 0o644)
+
+            os.chmod("tinyBas4.txt", 0o600)
+
+            EnterCommands(interpreter, ["SAVE 4"])
+
+            self.assertEqual(stat.S_IMODE(os.stat("tinyBas4.txt").st_mode), 0o600)
+
+        finally:
+
+            os.umask(fileModeMask)
+
+        self.assertEqual(os.listdir("."), ["tinyBas4.txt"])
+
+    def test_load_missing(self):
+
+        self.assertIn("FILE NOT FOUND", EnterCommands(NewInterpreter(), ["LOAD 9"]))
+
+
+class LazyLoadTest(FileTestCase):
+
+    def setUp(self):
+
+        super().setUp()
+
+        with open("tinyBas5.txt", "w") as programFile:
+
+            programFile.write("10 PRINT \"A\"\n20 PRINT \"B\"\n30 PRINT \"C\"\n")
+
+    def test_lines_read_when_needed(self):
+
+        interpreter = NewInterpreter()
+
+        EnterCommands(interpreter, ["LOAD 5"])
+
+        self.assertEqual(interpreter.programLineNumbers, [10, 20, 30])
+
+        self.assertIsNotNone(interpreter.programMapping)
+
+        self.assertEqual(interpreter.mappedLinesLeft, 3)
+
+        # running reads every line, which lets go of the file
+        self.assertEqual(EnterCommands(interpreter, ["RUN"]).strip("\n"), "A\nB\nC")
+
+        self.assertIsNone(interpreter.programMapping)
+
+    def test_edit_unread_lines(self):
+
+        interpreter = NewInterpreter()
+
+        EnterCommands(interpreter, ["LOAD 5", "20 PRINT \"X\"", "30"])
+
+        self.assertEqual(interpreter.mappedLinesLeft, 1)
+
+        self.assertEqual(EnterCommands(interpreter, ["RUN"]).strip("\n"), "A\nX")
+
+        self.assertIsNone(interpreter.programMapping)
+
+    def test_delete_every_line(self):
+
+        interpreter = NewInterpreter()
+
+        EnterCommands(interpreter, ["LOAD 5", "10", "20", "30"])
+
+        self.assertIsNone(interpreter.programMapping)
+
+        self.assertEqual(interpreter.programMemoryUsed, 0)
+
+    def test_save_over_mapped_file(self):
+
+        interpreter = NewInterpreter()
+
+        EnterCommands(interpreter, ["LOAD 5", "15 PRINT \"D\"", "SAVE 5"])
+
+        self.assertEqual(EnterCommands(NewInterpreter(), ["LOAD 5", "RUN"]).strip("\n"), "A\nD\nB\nC")
+
+        # SAVE writes the source only
+        self.assertEqual(os.listdir("."), ["tinyBas5.txt"])
+
+
+class ProgramImageTest(FileTestCase):
+
+    SOURCE = "10 A=2\n20 PRINT A*3\n"
+
+    def RunWithImage(self, source=SOURCE):
+
+        return TinyBasic_Mk2_v1.Interpreter().run_program(source, image_file="program.tbc")
+
+    def WriteImage(self, programLines):
+
+        imageBody = zlib.compress(marshal.dumps(programLines))
+
+        imageHeader = TinyBasic_Mk2_v1.PROGRAM_IMAGE_HEADER.pack(TinyBasic_Mk2_v1.PROGRAM_IMAGE_MAGIC, TinyBasic_Mk2_v1.PROGRAM_IMAGE_VERSION, marshal.version,
+                                                                TinyBasic_Mk2_v1.SourceHash(self.SOURCE), hashlib.sha256(imageBody).digest(), len(programLines), len(imageBody))
+
+        with open("program.tbc", "wb") as imageFile:
+
+            imageFile.write(imageHeader + imageBody)
+
+    def test_image_used(self):
+
+        firstResult = self.RunWithImage()
+
+        self.assertIsNotNone(TinyBasic_Mk2_v1.ReadProgramImage("program.tbc", TinyBasic_Mk2_v1.SourceHash(self.SOURCE)))
+
+        self.assertEqual(self.RunWithImage(), firstResult)
+
+    def test_stale_image(self):
+
+        self.RunWithImage()
+
+        self.assertEqual(self.RunWithImage("10 PRINT 5\n").output, "5\n")
+
+        self.assertIsNone(TinyBasic_Mk2_v1.ReadProgramImage("program.tbc", TinyBasic_Mk2_v1.SourceHash(self.SOURCE)))
+
+    def test_damaged_body(self):
+
+        firstResult = self.RunWithImage()
+
+        with open("program.tbc", "r+b") as imageFile:
+
+            imageFile.seek(TinyBasic_Mk2_v1.PROGRAM_IMAGE_HEADER.size + 4)
+
+            imageByte = imageFile.read(1)
+
+            imageFile.seek(-1, os.SEEK_CUR)
+
+            imageFile.write(bytes([imageByte[0] ^ 0xFF]))
+
+        self.assertIsNone(TinyBasic_Mk2_v1.ReadProgramImage("program.tbc", TinyBasic_Mk2_v1.SourceHash(self.SOURCE)))
+
+        self.assertEqual(self.RunWithImage(), firstResult)
+
+    def test_truncated_image(self):
+
+        firstResult = self.RunWithImage()
+
+        with open("program.tbc", "r+b") as imageFile:
+
+            imageFile.truncate(TinyBasic_Mk2_v1.PROGRAM_IMAGE_HEADER.size - 1)
+
+        self.assertEqual(self.RunWithImage(), firstResult)
+
+    def test_bad_structure(self):
+
+        # a body that checks out but isn't a program
+        self.WriteImage([("20 X\n", [(TinyBasic_Mk2_v1.TOKEN_NUMBER, 20, "")]), ("10 Y\n", [(TinyBasic_Mk2_v1.TOKEN_NUMBER, 10, "")])])
+
+        self.assertIsNone(TinyBasic_Mk2_v1.ReadProgramImage("program.tbc", TinyBasic_Mk2_v1.SourceHash(self.SOURCE)))
+
+        self.assertEqual(self.RunWithImage().output, "6\n")
+
+
+class ProfileTest(unittest.TestCase):
+
+    PROGRAM = ["10 I=0", "20 I=I+1", "30 IF I<5 THEN GOTO 20"]
+
+    def test_line_counts(self):
+
+        interpreter = NewInterpreter()
+
+        EnterCommands(interpreter, self.PROGRAM + ["PROFILE ON", "RUN", "PROFILE OFF"])
+
+        lineCounts = {lineNumber: executions for lineNumber, executions, seconds in interpreter.ProfileReport()}
+
+        self.assertEqual(lineCounts, {10: 1, 20: 5, 30: 5})
+
+        # hottest line first
+        lineSeconds = [seconds for lineNumber, executions, seconds in interpreter.ProfileReport()]
+
+        self.assertEqual(lineSeconds, sorted(lineSeconds, reverse=True))
+
+    def test_report(self):
+
+        interpreter = NewInterpreter()
+
+        profileOutput = EnterCommands(interpreter, self.PROGRAM + ["PROFILE ON", "RUN", "PROFILE"])
+
+        self.assertIn(" LINE      COUNT    SECONDS\n", profileOutput)
+
+        self.assertEqual(len([outputLine for outputLine in profileOutput.splitlines() if outputLine.startswith("   ")]), 3)
+
+    def test_off_by_default(self):
+
+        interpreter = NewInterpreter()
+
+        EnterCommands(interpreter, self.PROGRAM + ["RUN"])
+
+        self.assertEqual(interpreter.ProfileReport(), [])
+
+
+class InputTest(unittest.TestCase):
+
+    def test_parse(self):
+
+        for inputText, number in (("12", 12), (" -3 ", -3), ("3.5", 3.5), (".5", 0.5)):
+
+            self.assertEqual(TinyBasic_Mk2_v1.ParseInputNumber(inputText), number)
+
+        for inputText in ("ABC", "", "-", "1E5", "3-"):
+
+            self.assertIsNone(TinyBasic_Mk2_v1.ParseInputNumber(inputText))
+
+    def test_input(self):
+
+        for useBytecodeEngine in (False, True):
+
+            with self.subTest(useBytecodeEngine=useBytecodeEngine):
+
+                result = RunOnEngine("10 INPUT A\n20 PRINT A*2\n", "21\n", useBytecodeEngine)
+
+                self.assertEqual((result.status, result.variables[0]), (TinyBasic_Mk2_v1.RUN_STATUS_OK, 21))
+
+    def test_invalid_number(self):
+
+        # a reply that isn't a number is a BASIC error, not an exception
+        for useBytecodeEngine in (False, True):
+
+            with self.subTest(useBytecodeEngine=useBytecodeEngine):
+
+                result = RunOnEngine("10 INPUT A\n20 PRINT A\n", "ABC\n", useBytecodeEngine)
+
+                self.assertEqual((result.status, result.error), (TinyBasic_Mk2_v1.RUN_STATUS_ERROR, "ERROR IN LINE 10: INVALID NUMBER"))
+
+    def test_no_input(self):
+
+        self.assertEqual(RunOnEngine("10 INPUT A\n", None, False).status, TinyBasic_Mk2_v1.RUN_STATUS_NO_INPUT)
+
+    def test_own_input_source(self):
+
+        # each interpreter reads its own stdin, sys.stdin is left alone
+        savedStdin = sys.stdin
+
+        firstInterpreter = TinyBasic_Mk2_v1.Interpreter()
+
+        secondInterpreter = TinyBasic_Mk2_v1.Interpreter()
+
+        self.assertEqual(firstInterpreter.run_program("10 INPUT A\n", "1\n").variables[0], 1)
+
+        self.assertEqual(secondInterpreter.run_program("10 INPUT A\n", "2\n").variables[0], 2)
+
+        self.assertIs(sys.stdin, savedStdin)
+
+
+class OutputBufferTest(unittest.TestCase):
+
+    def test_flushed_between_slices(self):
+
+        interpreter = NewInterpreter()
+
+        output = io.StringIO()
+
+        interpreter.outputSink = output.write
+
+        interpreter.FlushOutput()
+
+        interpreter.WriteOutput("START\n")
+
+        self.assertEqual(output.getvalue(), "")
+
+        # held output goes out at the next slice once its time is up
+        interpreter.outputFlushTime = 0
+
+        interpreter.GrantSteps()
+
+        self.assertEqual(output.getvalue(), "START\n")
+
+    def test_flushed_when_full(self):
+
+        interpreter = NewInterpreter()
+
+        output = io.StringIO()
+
+        interpreter.outputSink = output.write
+
+        interpreter.WriteOutput("X" * interpreter.outputBufferLimit)
+
+        self.assertEqual(len(output.getvalue()), interpreter.outputBufferLimit)
+
+
+class NegativeNumberTest(unittest.TestCase):
+
+    def test_after_keyword(self):
+
+        # a - straight after a keyword is the sign of a number
+        for useBytecodeEngine in (False, True):
+
+            with self.subTest(useBytecodeEngine=useBytecodeEngine):
+
+                self.assertEqual(RunOnEngine("10 PRINT -5\n", None, useBytecodeEngine).output, "-5\n")
+
+                self.assertEqual(RunOnEngine("10 IF -1 THEN PRINT 1\n", None, useBytecodeEngine).output, "1\n")
+
+    def test_after_operand(self):
+
+        # after a variable or a number it is still a subtraction
+        for useBytecodeEngine in (False, True):
+
+            with self.subTest(useBytecodeEngine=useBytecodeEngine):
+
+                self.assertEqual(RunOnEngine("10 A=3\n20 PRINT A -5\n30 PRINT 7 -5\n", None, useBytecodeEngine).output, "-2\n2\n")
+
+
+class VariableStoreTest(unittest.TestCase):
+
+    def test_read_api(self):
+
+        interpreter = TinyBasic_Mk2_v1.Interpreter()
+
+        result = interpreter.run_program("10 A=5\n20 Z=-2\n")
+
+        self.assertIsInstance(result.variables, list)
+
+        self.assertEqual(result.variables, interpreter.SnapshotVariables())
+
+        variableValues = interpreter.VariableValues()
+
+        self.assertEqual((variableValues[0], variableValues[25], len(variableValues)), (5, -2, 26))
+
+        self.assertEqual(interpreter.ReadVariable("z"), -2)
+
+    def test_snapshot_restore(self):
+
+        interpreter = TinyBasic_Mk2_v1.Interpreter()
+
+        interpreter.run_program("10 B=3\n")
+
+        snapshot = interpreter.SnapshotVariables()
+
+        interpreter.ClearVariables()
+
+        self.assertEqual(interpreter.ReadVariable("B"), 0)
+
+        interpreter.RestoreVariables(snapshot)
+
+        self.assertEqual(interpreter.ReadVariable("B"), 3)
+
+    def test_large_integer(self):
+
+        result = RunOnEngine("10 A=9007199254740993\n20 PRINT A\n", None, False)
+
+        self.assertEqual(result.output, "9007199254740993\n")
+
+
+class MemoryUsageTest(unittest.TestCase):
+
+    def test_measured(self):
+
+        interpreter = TinyBasic_Mk2_v1.Interpreter()
+
+        interpreter.run_program("10 A=1\n")
+
+        emptyUsage = interpreter.GetMemoryUsage()
+
+        interpreter.run_program("10 A=1\n20 B=2\n30 C=3\n")
+
+        memoryUsage = interpreter.GetMemoryUsage()
+
+        self.assertGreater(memoryUsage.program, emptyUsage.program)
+
+        self.assertEqual(memoryUsage.used, memoryUsage.program + memoryUsage.variables + memoryUsage.mathStack + memoryUsage.gosubStack)
+
+        self.assertEqual((memoryUsage.lines, memoryUsage.lineLimit), (3, TinyBasic_Mk2_v1.PROGRAM_LINE_LIMIT))
+
+
+class FoldExpressionTest(unittest.TestCase):
+
+    def test_constants(self):
+
+        self.assertEqual(FoldExpression([BC_PUSH_NUMBER, 2, BC_PUSH_NUMBER, 3, BC_MULTIPLY, BC_PUSH_NUMBER, 4, BC_ADD]), [BC_PUSH_NUMBER, 10])
+
+    def test_identities(self):
+
+        # A+B is a number even when A and B hold comparison results
+        sumCode = [BC_PUSH_VARIABLE, 0, BC_PUSH_VARIABLE, 1, BC_ADD]
+
+        self.assertEqual(FoldExpression(sumCode + [BC_PUSH_NUMBER, 1, BC_MULTIPLY, BC_PUSH_NUMBER, 0, BC_ADD]), sumCode)
+
+        self.assertEqual(FoldExpression([BC_PUSH_NUMBER, 0] + sumCode + [BC_ADD]), sumCode)
+
+    def test_variable_identity_kept(self):
+
+        # A may hold True, A+0 has to turn it into 1
+        expressionCode = [BC_PUSH_VARIABLE, 0, BC_PUSH_NUMBER, 0, BC_ADD]
+
+        self.assertEqual(FoldExpression(expressionCode), expressionCode)
+
+        self.assertEqual(FoldExpression([BC_PUSH_VARIABLE, 0, BC_PUSH_NUMBER, 0, BC_ADD, BC_PUSH_NUMBER, 1, BC_MULTIPLY]), expressionCode)
+
+    def test_boolean_variable(self):
+
+        for useBytecodeEngine in (False, True):
+
+            with self.subTest(useBytecodeEngine=useBytecodeEngine):
+
+                self.assertEqual(RunOnEngine("10 A=1<2\n20 PRINT A+0,A*1\n", None, useBytecodeEngine).output, "11\n")
+
+    def test_zero_minus_kept(self):
+
+        # 0-A is not A
+        expressionCode = [BC_PUSH_NUMBER, 0, BC_PUSH_VARIABLE, 0, BC_SUBTRACT]
+
+        self.assertEqual(FoldExpression(expressionCode), expressionCode)
+
+    def test_division_by_zero_kept(self):
+
+        expressionCode = [BC_PUSH_NUMBER, 1, BC_PUSH_NUMBER, 0, BC_DIVIDE]
+
+        self.assertEqual(FoldExpression(expressionCode), expressionCode)
+
+    def test_relational_identity_kept(self):
+
+        # (A<B)+0 has to stay a comparison result
+        expressionCode = [BC_PUSH_VARIABLE, 0, BC_PUSH_VARIABLE, 1, BC_LESS_THAN, BC_PUSH_NUMBER, 0, BC_ADD]
+
+        self.assertEqual(FoldExpression(expressionCode), expressionCode)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
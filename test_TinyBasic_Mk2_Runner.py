@@ -0,0 +1,88 @@
+#
+# Tiny Basic Python Edition
+#
+# Batch runner tests
+#
+# python -m unittest test_TinyBasic_Mk2_Runner
+# ---------------------------------
+
+
+import os
+import tempfile
+import unittest
+
+import TinyBasic_Mk2_v1
+
+from TinyBasic_Mk2_Runner import run_programs
+
+
+ENDLESS_PROGRAM = "10 GOTO 10\n"
+
+
+class RunProgramsTest(unittest.TestCase):
+
+    def test_statuses(self):
+
+        programs = [
+            "10 PRINT 1\n",
+            "10 PRINT 1/0\n",
+            ENDLESS_PROGRAM,
+            ("10 INPUT A\n20 PRINT A+1\n", "41\n"),
+            "10 INPUT A\n"
+        ]
+
+        results = dict(run_programs(programs, max_steps=10000, max_workers=2))
+
+        self.assertEqual([results[jobIndex].status for jobIndex in range(len(programs))], [
+            TinyBasic_Mk2_v1.RUN_STATUS_OK,
+            TinyBasic_Mk2_v1.RUN_STATUS_ERROR,
+            TinyBasic_Mk2_v1.RUN_STATUS_STEP_LIMIT,
+            TinyBasic_Mk2_v1.RUN_STATUS_OK,
+            TinyBasic_Mk2_v1.RUN_STATUS_NO_INPUT
+        ])
+
+        self.assertEqual(results[1].errorLineNumber, 10)
+
+        self.assertEqual(results[3].output, "42\n")
+
+        self.assertEqual(results[3].variables[0], 41)
+
+    def test_time_limit(self):
+
+        results = dict(run_programs([ENDLESS_PROGRAM], max_steps=None, max_seconds=0.2, max_workers=1))
+
+        self.assertEqual(results[0].status, TinyBasic_Mk2_v1.RUN_STATUS_TIME_LIMIT)
+
+    def test_completion_order(self):
+
+        # the quick programs are not held back by the slow one
+        programs = [ENDLESS_PROGRAM] + ["10 PRINT " + str(programNumber) + "\n" for programNumber in range(1, 8)]
+
+        jobIndexes = [jobIndex for jobIndex, result in run_programs(programs, max_steps=None, max_seconds=2, max_workers=2)]
+
+        self.assertEqual(sorted(jobIndexes), list(range(len(programs))))
+
+        self.assertEqual(jobIndexes[-1], 0)
+
+    def test_bytecode_engine(self):
+
+        results = dict(run_programs(["10 A=2*3\n20 PRINT A\n"], max_workers=1, use_bytecode=True))
+
+        self.assertEqual(results[0].output, "6\n")
+
+    def test_image_directory(self):
+
+        with tempfile.TemporaryDirectory() as imageDirectory:
+
+            for attempt in range(2):
+
+                results = dict(run_programs(["10 PRINT 7\n"], max_workers=1, image_directory=imageDirectory))
+
+                self.assertEqual(results[0].output, "7\n")
+
+            self.assertEqual(len(os.listdir(imageDirectory)), 1)
+
+
+if __name__ == "__main__":
+
+    unittest.main()